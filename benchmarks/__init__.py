@@ -0,0 +1 @@
+# Performance benchmarks for the DSP core and the HTTP endpoints; see benchmarks/run.py.
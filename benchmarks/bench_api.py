@@ -0,0 +1,64 @@
+# End-to-end endpoint benchmarks through the TestClient at realistic payload sizes.
+from __future__ import annotations
+import io
+import os
+import tempfile
+import wave
+from typing import Any, Dict, List
+import numpy as np
+
+from .common import record, timeit
+
+def _wav_bytes(seconds: float, fs: int = 44100) -> bytes:
+    t = np.arange(int(seconds * fs)) / fs
+    x = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.05 * np.random.default_rng(0).standard_normal(t.size)
+    bio = io.BytesIO()
+    with wave.open(bio, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(fs)
+        wf.writeframes(np.clip(x * 32767, -32768, 32767).astype("<i2").tobytes())
+    return bio.getvalue()
+
+def _jpeg_bytes(w: int, h: int) -> bytes:
+    from PIL import Image
+    yy, xx = np.mgrid[0:h, 0:w]
+    rgb = np.stack([(xx * 255 // w), (yy * 255 // h), ((xx + yy) % 256)], axis=-1).astype(np.uint8)
+    bio = io.BytesIO()
+    Image.fromarray(rgb).save(bio, format="JPEG", quality=95)
+    return bio.getvalue()
+
+def run(quick: bool = False, min_time: float = 0.2) -> List[Dict[str, Any]]:
+    # isolate storage so runs neither read nor pollute a real STORAGE_DIR
+    os.environ.setdefault("STORAGE_DIR", tempfile.mkdtemp(prefix="fft-bench-"))
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    rows = []
+
+    seconds = 5 if quick else 30
+    wav = _wav_bytes(seconds)
+    counter = iter(range(1 << 30))
+    def upload():  # vary one byte so upload deduplication does not short-circuit
+        body = bytearray(wav); body[-1] = next(counter) % 256
+        r = client.post("/api/upload", files={"file": ("b.wav", bytes(body), "audio/wav")},
+                        headers={"Accept": "application/octet-stream"})
+        assert r.status_code == 200, r.text
+    rows.append(record("api", "upload_wav", len(wav), timeit(upload, min_time, max_repeat=10)))
+
+    sig = client.post("/api/upload", files={"file": ("ref.wav", wav, "audio/wav")}).json()
+    payload = {"signal_data": sig["time_domain"][:65536], "sampling_rate": 44100, "window_size": 4096,
+               "filter_type": "lowpass", "filter_cutoff": [3000]}
+    shift = iter(range(1 << 30))
+    def fft_json():  # perturb one sample so every call misses the result cache
+        payload["signal_data"][0] = next(shift) * 1e-9
+        assert client.post("/api/fft", json=payload).status_code == 200
+    rows.append(record("api", "fft_json_64k", 65536, timeit(fft_json, min_time, max_repeat=10)))
+    ref_payload = {"signal_id": sig["signal_id"], "window_size": 4096}
+    rows.append(record("api", "fft_signal_id_cached", sig["num_samples"],
+                       timeit(lambda: client.post("/api/fft", json=ref_payload), min_time)))
+
+    w, h = (640, 480) if quick else (1920, 1080)
+    jpg = _jpeg_bytes(w, h)
+    image_id = client.post("/api/image/upload", files={"file": ("b.jpg", jpg, "image/jpeg")}).json()["image_id"]
+    compress = lambda: client.post("/api/image/compress", json={"image_id": image_id, "quality": 60})
+    rows.append(record("api", "image_compress", w * h, timeit(compress, min_time, max_repeat=10)))
+    return rows
@@ -0,0 +1,68 @@
+# DSP core micro-benchmarks; numpy.fft is used only as the speed/accuracy baseline.
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+import numpy as np
+
+from .common import record, timeit
+from dsp.fft import fft_iterative, ifft_iterative, rfft_real, _bit_reverse_indices, get_window
+from dsp.filters import design_lowpass_fir, design_highpass_fir, design_bandpass_fir, apply_fir
+
+SIZES = [1 << k for k in range(8, 21, 2)]  # 256 .. 2^20
+QUICK_SIZES = [256, 4096, 65536]
+FS = 44100.0
+
+def _rel_error(ours: np.ndarray, ref: np.ndarray) -> float:
+    scale = float(np.max(np.abs(ref))) or 1.0
+    return float(np.max(np.abs(ours - ref))) / scale
+
+def bench_transforms(sizes: Sequence[int], min_time: float) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in sizes:
+        x = rng.standard_normal(n)
+        z = x + 1j * rng.standard_normal(n)
+        cases = [
+            ("fft_iterative", lambda: fft_iterative(z), lambda: np.fft.fft(z)),
+            ("ifft_iterative", lambda: ifft_iterative(z), lambda: np.fft.ifft(z)),
+            ("rfft_real", lambda: rfft_real(x), lambda: np.fft.rfft(x)),
+        ]
+        for name, ours, ref in cases:
+            err = _rel_error(ours(), ref())
+            rows.append(record("dsp", name, n, timeit(ours, min_time), timeit(ref, min_time), max_rel_error=err))
+        rows.append(record("dsp", "_bit_reverse_indices", n, timeit(lambda: _bit_reverse_indices(n), min_time)))
+    return rows
+
+def bench_windows(sizes: Sequence[int], min_time: float) -> List[Dict[str, Any]]:
+    rows = []
+    for n in sizes:
+        for name in ("hann", "hamming", "blackman"):
+            rows.append(record("dsp", f"window_{name}", n, timeit(lambda: get_window(name, n), min_time)))
+    return rows
+
+def bench_filters(sizes: Sequence[int], min_time: float) -> List[Dict[str, Any]]:
+    rows = []
+    # the designers are lru_cached: time the uncached design via __wrapped__
+    designs = {
+        "design_lowpass_fir": lambda t: design_lowpass_fir.__wrapped__(2000.0, FS, numtaps=t),
+        "design_highpass_fir": lambda t: design_highpass_fir.__wrapped__(2000.0, FS, numtaps=t),
+        "design_bandpass_fir": lambda t: design_bandpass_fir.__wrapped__(500.0, 4000.0, FS, numtaps=t),
+    }
+    for taps in (101, 401, 2001):
+        for name, fn in designs.items():
+            rows.append(record("dsp", name, taps, timeit(lambda: fn(taps), min_time)))
+    rng = np.random.default_rng(1)
+    for taps in (201, 2001):
+        h = design_lowpass_fir(2000.0, FS, numtaps=taps)
+        for n in sizes:
+            if n < taps:
+                continue
+            x = rng.standard_normal(n)
+            ref = lambda: np.convolve(x, h, mode="same")
+            err = _rel_error(apply_fir(x, h), ref())
+            rows.append(record("dsp", f"apply_fir[{taps}]", n, timeit(lambda: apply_fir(x, h), min_time),
+                               timeit(ref, min_time), max_rel_error=err))
+    return rows
+
+def run(quick: bool = False, min_time: float = 0.2) -> List[Dict[str, Any]]:
+    sizes = QUICK_SIZES if quick else SIZES
+    return bench_transforms(sizes, min_time) + bench_windows(sizes, min_time) + bench_filters(sizes, min_time)
@@ -0,0 +1,36 @@
+# Timing helpers shared by the benchmark modules.
+from __future__ import annotations
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "server")
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)  # main.py imports dsp.* as a top-level package
+
+def timeit(fn: Callable[[], Any], min_time: float = 0.2, max_repeat: int = 50) -> Dict[str, float]:
+    '''Best and mean wall time of fn() over repeats, stopping once min_time is spent
+    (after at least 3 runs, one of which is an untimed warm-up).'''
+    fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < 3 or (time.perf_counter() - start < min_time and len(times) < max_repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"seconds": min(times), "mean_seconds": sum(times) / len(times), "repeats": len(times)}
+
+def record(group: str, name: str, size: Optional[int], timing: Dict[str, float],
+           baseline: Optional[Dict[str, float]] = None, **extra: Any) -> Dict[str, Any]:
+    '''One result row; with a baseline timing, ratio is ours / baseline (lower is better).'''
+    row: Dict[str, Any] = {"group": group, "name": name, "size": size, **timing}
+    if baseline is not None:
+        row["baseline_seconds"] = baseline["seconds"]
+        row["ratio"] = timing["seconds"] / baseline["seconds"] if baseline["seconds"] > 0 else None
+    row.update(extra)
+    return row
+
+def key(row: Dict[str, Any]) -> str:
+    return f"{row['group']}/{row['name']}" + (f"@{row['size']}" if row.get("size") is not None else "")
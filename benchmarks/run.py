@@ -0,0 +1,97 @@
+# Run the benchmark suite and/or compare results against a saved baseline.
+#
+#   python -m benchmarks.run --out bench.json                  # full run
+#   python -m benchmarks.run --quick --only dsp                # smaller sizes, DSP only
+#   python -m benchmarks.run --compare base.json --threshold 0.25
+#   python -m benchmarks.run --current new.json --compare base.json   # no re-run
+#
+# The comparison exits with status 1 when any metric present in both files is worse
+# than the baseline by more than the threshold (0.25 = 25% slower). --metric ratio
+# compares our time relative to numpy.fft instead of wall time, which travels better
+# between machines; rows without a numpy baseline fall back to seconds.
+from __future__ import annotations
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .common import key
+
+def collect(only: str, quick: bool, min_time: float) -> Dict[str, Any]:
+    rows: List[Dict[str, Any]] = []
+    if only in ("all", "dsp"):
+        from . import bench_dsp
+        rows += bench_dsp.run(quick, min_time)
+    if only in ("all", "api"):
+        from . import bench_api
+        rows += bench_api.run(quick, min_time)
+    return {"meta": {"timestamp": datetime.utcnow().isoformat(), "python": platform.python_version(),
+                     "numpy": np.__version__, "machine": platform.machine(), "platform": platform.platform(),
+                     "quick": quick},
+            "results": rows}
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            metric: str = "seconds") -> List[Dict[str, Any]]:
+    '''Rows present in both runs with their change; "regressed" marks those whose
+    metric grew by more than threshold (as a fraction of the baseline).'''
+    base = {key(r): r for r in baseline["results"]}
+    out = []
+    for row in current["results"]:
+        old = base.get(key(row))
+        if old is None:
+            continue
+        both_ratio = row.get("ratio") is not None and old.get("ratio") is not None
+        used = "ratio" if metric == "ratio" and both_ratio else "seconds"
+        old_v, new_v = float(old[used]), float(row[used])
+        change = (new_v - old_v) / old_v if old_v > 0 else 0.0
+        out.append({"key": key(row), "metric": used, "baseline": old_v, "current": new_v,
+                    "change": change, "regressed": change > threshold})
+    return out
+
+def _print_results(rows: List[Dict[str, Any]]) -> None:
+    for r in rows:
+        extra = f"  x{r['ratio']:.2f} numpy" if r.get("ratio") is not None else ""
+        err = f"  err {r['max_rel_error']:.1e}" if "max_rel_error" in r else ""
+        print(f"{key(r):<40} {r['seconds'] * 1e3:10.3f} ms{extra}{err}")
+
+def main(argv: List[str] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--only", choices=("all", "dsp", "api"), default="all")
+    ap.add_argument("--quick", action="store_true", help="smaller sizes and payloads")
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--current", help="compare this results file instead of running the suite")
+    ap.add_argument("--compare", help="baseline results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction")
+    ap.add_argument("--metric", choices=("seconds", "ratio"), default="seconds")
+    args = ap.parse_args(argv)
+
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        current = collect(args.only, args.quick, args.min_time)
+        _print_results(current["results"])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if not args.compare:
+        return 0
+    with open(args.compare, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    diff = compare(baseline, current, args.threshold, args.metric)
+    for d in diff:
+        flag = "REGRESSED" if d["regressed"] else "ok"
+        print(f"{d['key']:<40} {d['metric']:<8} {d['baseline']:.4g} -> {d['current']:.4g} ({d['change']:+.1%}) {flag}")
+    regressed = [d for d in diff if d["regressed"]]
+    if regressed:
+        print(f"{len(regressed)} of {len(diff)} metrics regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
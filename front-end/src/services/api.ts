@@ -4,10 +4,31 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
 export const apiClient = axios.create({ baseURL: API_BASE_URL, headers: { 'Content-Type': 'application/json' } })
 
-export interface SignalData { signal_id: string; time_domain: number[]; sampling_rate: number; duration: number; num_samples: number; filename?: string }
-export interface FFTRequest { signal_data: number[]; sampling_rate: number; window_size: number; window_type: string; filter_type?: string; filter_cutoff?: number[] }
+export interface SignalData { signal_id: string; time_domain: number[]; sampling_rate: number; duration: number; num_samples: number; filename?: string; channels?: number }
+export type ChannelMode = 'mix' | 'per_channel' | 'mid_side' | 'cross'
+export type Precision = 'single' | 'double'
+export interface FFTRequest { signal_data?: number[] | number[][]; signal_id?: string; start_sample?: number; end_sample?: number; sampling_rate: number; window_size: number; window_type: string; filter_type?: string; filter_cutoff?: number[]; channel_mode?: ChannelMode; channels?: number[]; precision?: Precision }
 export interface FFTResult { analysis_id: string; frequencies: number[]; magnitudes: number[]; phases: number[]; window_size: number; sampling_rate: number }
-export interface AnalysisHistory { id: string; timestamp: string; sampling_rate: number; window_size: number }
+export interface ChannelSpectrum { label: string; magnitudes: number[]; phases: number[] }
+export interface MultiChannelFFTResult { analysis_id: string; frequencies: number[]; channel_mode: ChannelMode; channels: ChannelSpectrum[]; window_size: number; sampling_rate: number }
+export interface PSDRequest { signal_data?: number[]; signal_id?: string; start_sample?: number; end_sample?: number; sampling_rate?: number; window_size: number; overlap?: number; window_type?: string; detrend?: boolean; scale?: 'density' | 'db'; precision?: Precision }
+export interface BandRequest { signal_data?: number[]; signal_id?: string; start_sample?: number; end_sample?: number; sampling_rate?: number; window_type?: string; f_lo?: number; f_hi?: number; num_bins?: number; frequencies?: number[]; precision?: Precision }
+export interface BandResult { frequencies: number[]; magnitudes: number[]; phases: number[]; method: 'czt' | 'goertzel'; num_samples: number; sampling_rate: number; resolution_hz: number }
+export interface LODQuery { max_points?: number; start?: number; end?: number; fmin?: number; fmax?: number }
+export interface LODView { min: number[] | number[][]; max: number[] | number[][]; bucket_size: number; num_buckets: number; times?: number[]; frequencies?: number[] }
+export interface PSDResult { frequencies: number[]; psd: number[]; num_segments: number; window_size: number; overlap: number; sampling_rate: number; scale: string }
+export interface AnalysisHistory {
+  id: string; timestamp: string; filename?: string | null; signal_id?: string | null; sampling_rate: number
+  duration: number; num_samples: number; window_size: number; window_type?: string | null; filter_type?: string | null
+}
+export type RegisterMethod = 'orb' | 'phase'
+export interface CompressionPoint { quality: number; subsampling: number; size_bytes: number; psnr: number | null }
+export interface ExportOptions { columns?: string; fmin?: number; fmax?: number }
+export interface HistoryPage { items: AnalysisHistory[]; next_cursor: string | null }
+export interface HistoryQuery {
+  limit?: number; cursor?: string; since?: string; until?: string; filename?: string; signal_id?: string
+  sampling_rate?: number; window_size?: number; window_type?: string; filter_type?: string
+}
 export interface ImageUpload { image_id: string; filename: string; width: number; height: number }
 
 export const api = {
@@ -19,13 +40,28 @@ export const api = {
   async computeFFT(req: FFTRequest): Promise<FFTResult> {
     const { data } = await apiClient.post('/api/fft', req); return data
   },
-  async getHistory(): Promise<AnalysisHistory[]> {
-    const { data } = await apiClient.get('/api/history'); return data
+  async computeChannelFFT(req: FFTRequest & { channel_mode: Exclude<ChannelMode, 'mix'> }): Promise<MultiChannelFFTResult> {
+    const { data } = await apiClient.post('/api/fft', req); return data
+  },
+  async computeBand(req: BandRequest): Promise<BandResult> {
+    const { data } = await apiClient.post('/api/fft/band', req); return data
   },
-  async downloadAnalysis(analysisId: string, format: string = 'csv'): Promise<any> {
-    const { data } = await apiClient.get(`/api/download/${analysisId}?format=${format}`, { responseType: format === 'csv' ? 'blob' : 'json' })
+  async computePSD(req: PSDRequest): Promise<PSDResult> {
+    const { data } = await apiClient.post('/api/psd', req); return data
+  },
+  async getHistory(query: HistoryQuery = {}): Promise<HistoryPage> {
+    const { data } = await apiClient.get('/api/history', { params: query }); return data
+  },
+  async downloadAnalysis(analysisId: string, format: string = 'csv', options: ExportOptions = {}): Promise<any> {
+    const { data } = await apiClient.get(`/api/download/${analysisId}`, { params: { format, ...options }, responseType: format === 'json' ? 'json' : 'blob' })
     return data
   },
+  async getSignalLOD(signalId: string, query: LODQuery = {}): Promise<LODView> {
+    const { data } = await apiClient.get(`/api/signal/${signalId}/lod`, { params: query }); return data
+  },
+  async getSpectrumLOD(analysisId: string, query: LODQuery = {}): Promise<LODView> {
+    const { data } = await apiClient.get(`/api/analysis/${analysisId}/lod`, { params: query }); return data
+  },
   async uploadImage(file: File): Promise<ImageUpload> {
     const formData = new FormData(); formData.append('file', file)
     const { data } = await apiClient.post('/api/image/upload', formData, { headers: { 'Content-Type': 'multipart/form-data' } })
@@ -34,14 +70,38 @@ export const api = {
   async compressImage(image_id: string, quality: number, subsampling: number = 2): Promise<any> {
     const { data } = await apiClient.post('/api/image/compress', { image_id, quality, subsampling }); return data
   },
+  async compressImageToSize(image_id: string, target_bytes: number, subsampling: number = 2): Promise<any> {
+    const { data } = await apiClient.post('/api/image/compress', { image_id, target_bytes, subsampling }); return data
+  },
+  async compressionSweep(image_id: string, qualities?: number[], subsamplings?: number[]): Promise<{ results: CompressionPoint[] }> {
+    const { data } = await apiClient.post('/api/image/compress/sweep', { image_id, qualities, subsamplings }); return data
+  },
+  async fftCompressImage(image_id: string, opts: { keep_ratio?: number; cutoff?: number; tile_size?: number }): Promise<any> {
+    const { data } = await apiClient.post('/api/image/fft-compress', { image_id, ...opts }); return data
+  },
   async features(image_id: string): Promise<any> {
     const { data } = await apiClient.post('/api/image/features', null, { params: { image_id } }); return data
   },
-  async register(ref_image_id: string, mov_image_id: string, max_features = 800, good_match_percent = 0.15): Promise<any> {
-    const { data } = await apiClient.post('/api/image/register', { ref_image_id, mov_image_id, max_features, good_match_percent }); return data
+  async register(ref_image_id: string, mov_image_id: string, max_features = 800, good_match_percent = 0.15, method: RegisterMethod = 'orb'): Promise<any> {
+    const { data } = await apiClient.post('/api/image/register', { ref_image_id, mov_image_id, max_features, good_match_percent, method }); return data
+  },
+  async registerBatch(ref_image_id: string, mov_image_ids: string[], method: RegisterMethod = 'orb', max_features = 800, good_match_percent = 0.15): Promise<any> {
+    const { data } = await apiClient.post('/api/image/register/batch', { ref_image_id, mov_image_ids, method, max_features, good_match_percent }); return data
   },
   async makeMjpeg(image_ids: string[], fps: number = 10): Promise<any> {
     const { data } = await apiClient.post('/api/video/mjpeg', { image_ids, fps })
     return data
+  },
+  mjpegStreamUrl(image_ids: string[], fps: number = 10, quality: number = 85): string {
+    const params = new URLSearchParams({ fps: String(fps), quality: String(quality) })
+    image_ids.forEach(id => params.append('image_ids', id))
+    return `${API_BASE_URL}/api/video/mjpeg/stream?${params}`
   }
 }
+
+// Min/max buckets as one polyline: each bucket contributes its min then its max at the bucket position.
+export function interleaveLOD(x: number[], min: number[], max: number[]): { x: number[]; y: number[] } {
+  const xs: number[] = [], ys: number[] = []
+  x.forEach((v, i) => { xs.push(v, v); ys.push(min[i], max[i]) })
+  return { x: xs, y: ys }
+}
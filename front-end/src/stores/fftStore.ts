@@ -9,7 +9,7 @@ export const useFFTStore = defineStore('fft', () => {
   const error = ref<string | null>(null)
 
   const fftParams = ref<FFTRequest>({
-    signal_data: [], sampling_rate: 44100, window_size: 2048, window_type: 'hann',
+    sampling_rate: 44100, window_size: 2048, window_type: 'hann',
     filter_type: undefined, filter_cutoff: undefined
   })
 
@@ -0,0 +1,214 @@
+# Persistent analysis store: metadata in an indexed SQLite catalog, arrays as .npy
+# files next to it that are reopened memory-mapped. Replaces the in-process history
+# list and the pretty-printed per-analysis JSON dumps.
+from __future__ import annotations
+import base64
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from lod import Pyramid, build_pyramid
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id            TEXT PRIMARY KEY,
+    timestamp     TEXT NOT NULL,
+    filename      TEXT,
+    signal_id     TEXT,
+    sampling_rate INTEGER NOT NULL,
+    window_size   INTEGER NOT NULL,
+    window_type   TEXT,
+    filter_type   TEXT,
+    filter_cutoff TEXT,
+    num_samples   INTEGER NOT NULL,
+    duration      REAL NOT NULL,
+    content_hash  TEXT,
+    channel_labels TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_by_time ON analyses (timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analyses_by_filename ON analyses (filename, timestamp DESC);
+CREATE INDEX IF NOT EXISTS analyses_by_params ON analyses (sampling_rate, window_size, timestamp DESC);
+CREATE INDEX IF NOT EXISTS analyses_by_hash ON analyses (content_hash);
+"""
+
+_COLUMNS = ("id", "timestamp", "filename", "signal_id", "sampling_rate", "window_size", "window_type",
+            "filter_type", "filter_cutoff", "num_samples", "duration", "content_hash", "channel_labels")
+_JSON_COLUMNS = ("filter_cutoff", "channel_labels")
+
+# Equality filters accepted by history(), mapped to their column.
+FILTER_COLUMNS = ("filename", "signal_id", "sampling_rate", "window_size", "window_type", "filter_type")
+
+@dataclass
+class AnalysisRecord:
+    id: str
+    timestamp: str
+    filename: Optional[str]
+    signal_id: Optional[str]
+    sampling_rate: int
+    window_size: int
+    window_type: Optional[str]
+    filter_type: Optional[str]
+    filter_cutoff: Optional[List[float]]
+    num_samples: int
+    duration: float
+    content_hash: Optional[str]
+    channel_labels: Optional[List[str]] = None  # one per spectrum; None for a mono analysis
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "AnalysisRecord":
+        values = dict(zip(_COLUMNS, row))
+        for c in _JSON_COLUMNS:
+            values[c] = json.loads(values[c]) if values[c] else None
+        return cls(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+def encode_cursor(timestamp: str, analysis_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp}|{analysis_id}".encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        timestamp, analysis_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+    except Exception:
+        raise ValueError("invalid cursor")
+    return timestamp, analysis_id
+
+class AnalysisStore:
+    '''SQLite-indexed catalog of analyses plus their arrays on disk.
+
+    For each analysis `<id>.spectrum.npy` holds a (1 + 2k, bins) float64 array: the
+    frequencies, then the magnitudes and then the phases of its k spectra (k = 1 for
+    mono, one per channel label otherwise), and `<id>.signal.npy` the processed
+    signal as float32, and `<id>.lod.npy` the LOD pyramid of the magnitude rows; all
+    are read back with mmap_mode="r". Lookups by id are primary-key
+    hits and history() pages with a keyset cursor on (timestamp, id), so neither
+    depends on how many analyses are stored.'''
+
+    def __init__(self, directory: str, db_name: str = "catalog.sqlite3"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, db_name), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(analyses)")}
+        if "channel_labels" not in existing:  # catalogs created before multi-channel analyses
+            self._db.execute("ALTER TABLE analyses ADD COLUMN channel_labels TEXT")
+
+    def _path(self, analysis_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{analysis_id}.{kind}.npy")
+
+    def save(self, record: AnalysisRecord, frequencies: np.ndarray, magnitudes: np.ndarray,
+             phases: np.ndarray, processed: Optional[np.ndarray] = None) -> None:
+        bins = len(frequencies)
+        rows = [np.reshape(frequencies, (1, bins)), np.reshape(magnitudes, (-1, bins)), np.reshape(phases, (-1, bins))]
+        np.save(self._path(record.id, "spectrum"), np.concatenate(rows).astype(np.float64))
+        np.save(self._path(record.id, "lod"), build_pyramid(rows[1]))
+        if processed is not None:
+            np.save(self._path(record.id, "signal"), np.ascontiguousarray(processed, dtype=np.float32))
+        values = record.to_dict()
+        for c in _JSON_COLUMNS:
+            values[c] = json.dumps(values[c]) if values[c] is not None else None
+        with self._lock, self._db:
+            self._db.execute(f"INSERT OR REPLACE INTO analyses ({', '.join(_COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(_COLUMNS))})", [values[c] for c in _COLUMNS])
+
+    def get(self, analysis_id: str) -> Optional[AnalysisRecord]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM analyses WHERE id = ?",
+                                   (analysis_id,)).fetchone()
+        return AnalysisRecord.from_row(row) if row else None
+
+    def spectrum(self, analysis_id: str) -> Optional[np.ndarray]:
+        '''(1 + 2k, bins) memory-mapped frequencies, magnitudes, phases.'''
+        path = self._path(analysis_id, "spectrum")
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def pyramid(self, analysis_id: str) -> Optional[Pyramid]:
+        '''LOD pyramid over the (k, bins) magnitude rows; built on first use for
+        analyses saved before pyramids existed.'''
+        spectrum = self.spectrum(analysis_id)
+        if spectrum is None:
+            return None
+        magnitudes = spectrum[1: 1 + (spectrum.shape[0] - 1) // 2]
+        path = self._path(analysis_id, "lod")
+        if not os.path.exists(path):
+            np.save(path, build_pyramid(magnitudes))
+        return Pyramid(magnitudes, np.load(path, mmap_mode="r"))
+
+    def processed_signal(self, analysis_id: str) -> Optional[np.ndarray]:
+        path = self._path(analysis_id, "signal")
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0])
+
+    def history(self, limit: int = 100, cursor: Optional[str] = None, since: Optional[str] = None,
+                until: Optional[str] = None, filename_contains: Optional[str] = None,
+                **filters: Any) -> Tuple[List[AnalysisRecord], Optional[str]]:
+        '''Newest-first page of analyses and the cursor for the next page (None at the end).
+
+        since/until bound the ISO timestamp (inclusive/exclusive); keyword filters are
+        equality matches on FILTER_COLUMNS, None values being ignored.'''
+        where, args = [], []
+        if cursor:
+            ts, last_id = decode_cursor(cursor)
+            where.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            args += [ts, ts, last_id]
+        if since:
+            where.append("timestamp >= ?"); args.append(since)
+        if until:
+            where.append("timestamp < ?"); args.append(until)
+        if filename_contains:
+            where.append("filename LIKE ? ESCAPE '\\'")
+            args.append("%" + filename_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        for column, value in filters.items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f"cannot filter on {column}")
+            if value is not None:
+                where.append(f"{column} = ?"); args.append(value)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM analyses"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, args + [limit + 1]).fetchall()
+        records = [AnalysisRecord.from_row(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(records[-1].timestamp, records[-1].id) if len(rows) > limit else None
+        return records, next_cursor
+
+    def import_legacy_json(self, directory: str) -> int:
+        '''Move analyses saved as `<id>.json` (the old format) into the store; returns
+        how many were imported. Each file is then moved to `<directory>/legacy/`, so it
+        is not imported again and stays available as a backup. Files that fail to
+        parse are left where they are.'''
+        imported = 0
+        backup = os.path.join(directory, "legacy")
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    a = json.load(f)
+                fs = int(a["sampling_rate"])
+                processed = np.asarray(a.get("processed_signal") or [], dtype=np.float32)
+                record = AnalysisRecord(
+                    id=a["id"], timestamp=a["timestamp"], filename=a.get("filename"), signal_id=a.get("signal_id"),
+                    sampling_rate=fs, window_size=int(a["window_size"]), window_type=a.get("window_type"),
+                    filter_type=a.get("filter_type"), filter_cutoff=a.get("filter_cutoff"),
+                    num_samples=int(processed.size), duration=processed.size / float(fs), content_hash=None)
+                self.save(record, np.asarray(a["frequencies"]), np.asarray(a["magnitudes"]),
+                          np.asarray(a["phases"]), processed if processed.size else None)
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+            os.makedirs(backup, exist_ok=True)
+            os.replace(path, os.path.join(backup, name))
+            imported += 1
+        return imported
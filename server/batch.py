@@ -0,0 +1,275 @@
+# Offline batch analysis: the /api/fft pipeline (decode, FIR filter, window, rFFT)
+# run directly over whole directories of recordings on a process pool, without HTTP.
+#
+#   python -m server.batch recordings/ --out nightly/ --window-size 4096
+#   python -m server.batch "data/**/*.wav" --out nightly/ --resume --npz
+#
+# Results go to one output directory: magnitudes.npy and phases.npy hold one float32
+# row per analysed file (row i has bins k*fs_i/window_size, fs_i from the manifest),
+# and manifest.jsonl one JSON line per input, written as each file completes. The
+# .npy files are appended to in place and their headers rewritten at checkpoints, so
+# they can be memory-mapped while a run is going. After an interruption --resume
+# drops any row not yet recorded in the manifest and skips the files already in it.
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)  # the server modules import dsp.* as a top-level package
+
+import numpy as np
+
+from dsp.fft import PRECISIONS
+import workers
+
+# Every column file gets a header of exactly this size, so it can be rewritten in place.
+HEADER_BYTES = 128
+# Rows appended between header rewrites.
+CHECKPOINT_ROWS = 256
+# Files handed to a worker per task; amortises pickling and scheduling per file.
+DEFAULT_CHUNK = 16
+PROGRESS_SECONDS = 5.0
+SETTINGS = ("window_size", "window_type", "filter_type", "filter_cutoff", "precision")
+
+def find_inputs(inputs: Sequence[str], pattern: str = "*.wav") -> List[str]:
+    '''Sorted, de-duplicated files from directories (searched recursively for
+    pattern), glob expressions and plain paths.'''
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            found.update(glob.glob(os.path.join(item, "**", pattern), recursive=True))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(glob.glob(item, recursive=True))
+    return sorted(os.path.abspath(p) for p in found if os.path.isfile(p))
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+def analyse_file(path: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    '''Spectrum of one file as /api/fft computes it; failures are returned, not raised.'''
+    try:
+        fs, data = workers.decode_upload(path, os.path.basename(path))
+        signal = np.asarray(data, dtype=PRECISIONS[settings["precision"]][0])
+        freqs, mags, phases, _ = workers.fft_pipeline(signal, fs, settings["window_size"], settings["window_type"],
+                                                      settings["filter_type"], settings["filter_cutoff"])
+    except Exception as e:
+        return {"status": "error", "error": getattr(e, "detail", None) or str(e)}
+    return {"status": "ok", "sampling_rate": int(fs), "num_samples": int(signal.shape[-1]),
+            "peak_hz": float(freqs[int(np.argmax(mags))]),
+            "magnitudes": np.asarray(mags, dtype=np.float32), "phases": np.asarray(phases, dtype=np.float32)}
+
+def analyse_chunk(paths: Sequence[str], settings: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [(p, analyse_file(p, settings)) for p in paths]
+
+class RowFile:
+    '''A float32 (rows, width) .npy file grown one row at a time.
+
+    The header is padded to HEADER_BYTES whatever the row count, so sync() can
+    rewrite it in place; rows beyond the header's count are simply not visible to
+    readers yet. Opening an existing file truncates it to `rows` rows.'''
+
+    def __init__(self, path: str, width: int, rows: int = 0):
+        self.path, self.width, self.rows = path, int(width), int(rows)
+        self._f = open(path, "r+b" if os.path.exists(path) else "w+b")
+        self._f.truncate(HEADER_BYTES + self.rows * self.width * 4)
+        self.sync()
+
+    def _header(self) -> bytes:
+        d = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (self.rows, self.width)
+        size = HEADER_BYTES - 10  # magic, version and length field take 10 bytes
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", size) + (d.ljust(size - 1) + "\n").encode("latin1")
+
+    def append(self, row: np.ndarray) -> None:
+        self._f.write(np.ascontiguousarray(row, dtype="<f4").tobytes())
+        self.rows += 1
+
+    def sync(self) -> None:
+        self._f.seek(0)
+        self._f.write(self._header())
+        self._f.seek(0, os.SEEK_END)
+        self._f.flush()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self.sync()
+        self._f.close()
+
+class BatchOutput:
+    '''The output directory of a run: settings.json, manifest.jsonl and the
+    magnitude/phase row files.'''
+
+    def __init__(self, directory: str, settings: Dict[str, Any], resume: bool = False):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.jsonl")
+        settings_path = os.path.join(directory, "settings.json")
+        if os.path.exists(self.manifest_path) and not resume:
+            raise SystemExit(f"{directory} already holds a batch run; pass --resume or choose another --out")
+        if resume and os.path.exists(settings_path):
+            with open(settings_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+            if previous != settings:
+                raise SystemExit(f"--resume with different settings: {previous} vs {settings}")
+        with open(settings_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f)
+        self.done, rows = self._read_manifest() if resume else (set(), 0)
+        bins = int(settings["window_size"]) // 2 + 1
+        self.magnitudes = RowFile(os.path.join(directory, "magnitudes.npy"), bins, rows)
+        self.phases = RowFile(os.path.join(directory, "phases.npy"), bins, rows)
+        self._manifest = open(self.manifest_path, "a", encoding="utf-8")
+
+    def _read_manifest(self) -> Tuple[set, int]:
+        '''Files already handled and the number of rows written; a torn last line
+        (interrupted mid-write) is cut off.'''
+        done, rows, good = set(), 0, 0
+        if not os.path.exists(self.manifest_path):
+            return done, rows
+        with open(self.manifest_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+                if entry["status"] == "ok":
+                    rows = max(rows, entry["row"] + 1)
+        with open(self.manifest_path, "r+b") as f:
+            f.truncate(good)
+        return done, rows
+
+    def write(self, key: Tuple[str, int, int], result: Dict[str, Any]) -> None:
+        '''Append one file's rows, then its manifest line: a row counts as written
+        only once its line is in the manifest.'''
+        path, size, mtime_ns = key
+        entry = {"path": path, "size": size, "mtime_ns": mtime_ns, "status": result["status"]}
+        if result["status"] == "ok":
+            entry["row"] = self.magnitudes.rows
+            self.magnitudes.append(result["magnitudes"])
+            self.phases.append(result["phases"])
+            self.magnitudes.flush(); self.phases.flush()
+            entry.update({k: result[k] for k in ("sampling_rate", "num_samples", "peak_hz")})
+            if self.magnitudes.rows % CHECKPOINT_ROWS == 0:
+                self.magnitudes.sync(); self.phases.sync()
+        else:
+            entry["error"] = result["error"]
+        self._manifest.write(json.dumps(entry) + "\n")
+        self._manifest.flush()
+        self.done.add(key)
+
+    def close(self) -> None:
+        self.magnitudes.close()
+        self.phases.close()
+        self._manifest.close()
+
+    def pack_npz(self) -> str:
+        '''Everything in one results.npz: magnitudes, phases, and per-row path,
+        sampling_rate and num_samples taken from the manifest.'''
+        rows: Dict[int, Dict[str, Any]] = {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["status"] == "ok":
+                    rows[entry["row"]] = entry
+        order = [rows[i] for i in range(len(rows))]
+        out = os.path.join(self.directory, "results.npz")
+        tmp = out + ".tmp.npz"
+        np.savez(tmp, magnitudes=np.load(self.magnitudes.path, mmap_mode="r"),
+                 phases=np.load(self.phases.path, mmap_mode="r"),
+                 path=np.array([e["path"] for e in order]),
+                 sampling_rate=np.array([e["sampling_rate"] for e in order], dtype=np.int64),
+                 num_samples=np.array([e["num_samples"] for e in order], dtype=np.int64))
+        os.replace(tmp, out)
+        return out
+
+def _chunks(items: Sequence[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield list(items[i:i + size])
+
+def run(paths: Sequence[str], output: BatchOutput, settings: Dict[str, Any], workers_count: int = 1,
+        chunk: int = DEFAULT_CHUNK, log=sys.stderr) -> Dict[str, Any]:
+    '''Analyse every path not already in the output; returns the run's counts and
+    throughput. Chunks are fed to the pool a few at a time, so results are written
+    (and memory released) as they complete rather than when the run ends.'''
+    keys = {p: _file_key(p) for p in paths}
+    todo = [p for p in paths if keys[p] not in output.done]
+    stats = {"files": len(paths), "skipped": len(paths) - len(todo), "ok": 0, "failed": 0}
+    start = last = time.perf_counter()
+
+    def record(results):
+        nonlocal last
+        for p, result in results:
+            output.write(keys[p], result)
+            stats["ok" if result["status"] == "ok" else "failed"] += 1
+        now = time.perf_counter()
+        if log is not None and now - last >= PROGRESS_SECONDS:
+            last = now
+            n = stats["ok"] + stats["failed"]
+            print(f"{n}/{len(todo)} files, {n / (now - start):.1f} files/s", file=log)
+
+    if workers_count <= 1:
+        for group in _chunks(todo, chunk):
+            record(analyse_chunk(group, settings))
+    else:
+        with ProcessPoolExecutor(workers_count) as pool:
+            groups, pending = _chunks(todo, chunk), set()
+            while True:
+                while len(pending) < 2 * workers_count:
+                    group = next(groups, None)
+                    if group is None:
+                        break
+                    pending.add(pool.submit(analyse_chunk, group, settings))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    record(fut.result())
+    elapsed = time.perf_counter() - start
+    processed = stats["ok"] + stats["failed"]
+    stats.update(seconds=elapsed, files_per_second=processed / elapsed if elapsed > 0 else 0.0)
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Batch FFT analysis of audio files (same pipeline as /api/fft).")
+    ap.add_argument("inputs", nargs="+", help="directories, files or glob patterns")
+    ap.add_argument("--out", required=True, help="output directory")
+    ap.add_argument("--pattern", default="*.wav", help="file pattern searched in directories (default *.wav)")
+    ap.add_argument("--window-size", type=int, default=2048)
+    ap.add_argument("--window-type", default="hann")
+    ap.add_argument("--filter-type", choices=("lowpass", "highpass", "bandpass"))
+    ap.add_argument("--filter-cutoff", type=float, nargs="+", help="cutoff frequency (two for bandpass)")
+    ap.add_argument("--precision", choices=sorted(PRECISIONS), default="double")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes (1 runs inline)")
+    ap.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="files per worker task")
+    ap.add_argument("--resume", action="store_true", help="continue an interrupted run in --out")
+    ap.add_argument("--npz", action="store_true", help="also pack the results into results.npz at the end")
+    args = ap.parse_args(argv)
+
+    settings = {name: getattr(args, name) for name in SETTINGS}
+    paths = find_inputs(args.inputs, args.pattern)
+    output = BatchOutput(args.out, settings, resume=args.resume)
+    try:
+        stats = run(paths, output, settings, args.workers, max(1, args.chunk))
+    finally:
+        output.close()
+    print(f"{stats['ok']} analysed, {stats['failed']} failed, {stats['skipped']} already done "
+          f"in {stats['seconds']:.1f} s ({stats['files_per_second']:.1f} files/s)")
+    if args.npz:
+        print(f"wrote {output.pack_npz()}")
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
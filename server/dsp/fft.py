@@ -1,73 +1,349 @@
-
 # Manual FFT (Cooley-Tukey) + windows and helpers — NO numpy.fft usage
-# Works on Python complex numbers. Uses numpy only for arrays, math for trig.
+# Vectorized over NumPy arrays: each butterfly stage is one array operation, and
+# per-size FFTPlan objects (digit-reversal + exact twiddle tables) are cached.
+# Any length is supported: mixed radix 2/3/4/5/.../13, Bluestein chirp-z otherwise.
+# Plans come in two precisions, "double" (float64/complex128) and "single"
+# (float32/complex64); see PRECISIONS for the error bounds of the single path.
 from __future__ import annotations
 import math
-from typing import List, Tuple
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
 import numpy as np
 
+ArrayLike = Union[Sequence[complex], Sequence[float], np.ndarray]
+
+# Upper bound on the number of distinct transform sizes kept in the plan cache.
+PLAN_CACHE_SIZE = 32
+# Largest prime factor handled by a direct butterfly stage; bigger ones go to Bluestein.
+MAX_DIRECT_RADIX = 13
+# Complex elements per batch chunk inside FFTPlan.execute (~512 KiB, stays cache resident).
+_WORK_ELEMS = 1 << 15
+
+# (real dtype, complex dtype) per precision. Twiddle, chirp and post-twiddle tables are
+# computed in double and rounded once, so a single-precision transform only adds the
+# float32 rounding of its butterflies: the error relative to the largest bin stays below
+# about eps32*log2(n) (eps32 ~ 6e-8), i.e. ~1e-6 at n = 2**16, against ~1e-15 in double.
+# Bluestein lengths run three inner transforms and may lose a further factor of ~3.
+PRECISIONS = {"double": (np.float64, np.complex128), "single": (np.float32, np.complex64)}
+
+def precision_of(x: ArrayLike) -> str:
+    '''"single" for float32/complex64 arrays, "double" for anything else.'''
+    return "single" if getattr(x, "dtype", None) in (np.float32, np.complex64) else "double"
+
+def _check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {sorted(PRECISIONS)}, got {precision!r}")
+    return precision
+
 def next_pow_two(n: int) -> int:
     '''Return the next power of two >= n.'''
     if n <= 1:
         return 1
     return 1 << (n - 1).bit_length()
 
-def _bit_reverse_indices(n: int) -> List[int]:
+def next_fast_len(n: int) -> int:
+    '''Smallest 2^a * 3^b * 5^c >= n (sizes the mixed-radix engine handles without Bluestein).'''
+    if n <= 1:
+        return 1
+    best = next_pow_two(n)
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            # smallest power-of-two multiple of p35 that reaches n
+            m = p35 * next_pow_two(-(-n // p35))
+            if m < best:
+                best = m
+            p35 *= 3
+        p5 *= 5
+    return best
+
+def _factorize(n: int) -> List[int]:
+    '''Split n into butterfly radices (4s first, then 2, then odd primes up to
+    MAX_DIRECT_RADIX); any leftover factor is returned last and means the length
+    needs Bluestein.'''
+    radices: List[int] = []
+    while n % 4 == 0:
+        radices.append(4); n //= 4
+    if n % 2 == 0:
+        radices.append(2); n //= 2
+    for p in range(3, MAX_DIRECT_RADIX + 1, 2):
+        while n % p == 0:
+            radices.append(p); n //= p
+    if n > 1:
+        radices.append(n)
+    return radices
+
+def _digit_reverse_indices(radices: Sequence[int]) -> np.ndarray:
+    '''Mixed-radix digit-reversal permutation: after reordering, each first-stage block holds
+    the samples of one decimated sub-sequence, so stages can combine contiguous blocks.'''
+    n = int(np.prod(radices, dtype=np.int64)) if radices else 1
+    idx = np.arange(n, dtype=np.intp)
+    lead: tuple = ()
+    length = n
+    for r in reversed(radices):
+        length //= r
+        idx = idx.reshape(lead + (length, r)).swapaxes(-1, -2)
+        lead = lead + (r,)
+    return np.ascontiguousarray(idx).reshape(n)
+
+def _bit_reverse_indices(n: int) -> np.ndarray:
     '''Bit-reversal permutation indices for length n (n must be power of two).'''
-    bits = n.bit_length() - 1
-    rev = [0] * n
-    for i in range(n):
-        b = '{:0{w}b}'.format(i, w=bits)
-        br = int(b[::-1], 2)
-        rev[i] = br
-    return rev
-
-def fft_iterative(x: List[complex]) -> List[complex]:
-    '''Radix-2 Cooley-Tukey FFT (iterative). x length will be padded to power-of-two.'''
-    n_orig = len(x)
-    n = next_pow_two(n_orig)
-    if n != n_orig:
-        x = list(x) + [0j] * (n - n_orig)
-    else:
-        x = list(x)
-
-    # Bit-reversal permutation
-    rev = _bit_reverse_indices(n)
-    a = [x[rev[i]] for i in range(n)]
-
-    m = 2
-    while m <= n:
-        half = m // 2
-        # principal m-th root of unity: exp(-2πi/m)
-        w_m = complex(math.cos(-2*math.pi/m), math.sin(-2*math.pi/m))
-        for k in range(0, n, m):
-            w = 1+0j
-            for j in range(half):
-                t = w * a[k + j + half]
-                u = a[k + j]
-                a[k + j] = u + t
-                a[k + j + half] = u - t
-                w *= w_m
-        m *= 2
-    return a
-
-def ifft_iterative(X: List[complex]) -> List[complex]:
+    return _digit_reverse_indices([2] * (n.bit_length() - 1))
+
+def _butterfly(z: np.ndarray, r: int, out: np.ndarray) -> np.ndarray:
+    '''r-point DFTs across axis 1 of the twiddled stage inputs z, shaped (blocks, r, L, batch).
+
+    z and out are both scratch: the result lands in one of them and is returned.'''
+    if r == 2:
+        np.add(z[:, 0], z[:, 1], out=out[:, 0])
+        np.subtract(z[:, 0], z[:, 1], out=out[:, 1])
+        return out
+    if r == 4:
+        s02, s13, d02, d13 = out[:, 0], out[:, 1], out[:, 2], out[:, 3]
+        np.add(z[:, 0], z[:, 2], out=s02); np.subtract(z[:, 0], z[:, 2], out=d02)
+        np.add(z[:, 1], z[:, 3], out=s13); np.subtract(z[:, 1], z[:, 3], out=d13)
+        np.multiply(d13, -1j, out=d13)
+        np.add(s02, s13, out=z[:, 0]); np.subtract(s02, s13, out=z[:, 2])
+        np.add(d02, d13, out=z[:, 1]); np.subtract(d02, d13, out=z[:, 3])
+        return z
+    # Odd radix: pair inputs q and r-q so the kernel needs only real cos/sin coefficients.
+    z0 = z[:, 0]
+    half = (r - 1) // 2
+    sums = [z[:, q] + z[:, r - q] for q in range(1, half + 1)]
+    difs = [(z[:, q] - z[:, r - q]) * -1j for q in range(1, half + 1)]
+    out[:, 0] = z0 + sum(sums)
+    for s in range(1, half + 1):
+        re = z0.copy()
+        im = np.zeros_like(z0)
+        for q in range(1, half + 1):
+            ang = 2.0 * math.pi * ((q * s) % r) / r
+            re += math.cos(ang) * sums[q - 1]
+            im += math.sin(ang) * difs[q - 1]
+        np.add(re, im, out=out[:, s])
+        np.subtract(re, im, out=out[:, r - s])
+    return out
+
+class FFTPlan:
+    '''Precomputed transform for one length n.
+
+    Smooth lengths (factors 2, 3, 4, 5 and small odd primes up to MAX_DIRECT_RADIX) run
+    as mixed-radix Cooley-Tukey: a digit-reversal permutation followed by one vectorized
+    butterfly stage per radix, with twiddles taken from exact exp(-2πik/m) tables (no
+    accumulated error from repeated multiplication). Lengths with a larger prime factor
+    use Bluestein's chirp-z algorithm on top of a cached 2/3/5-smooth plan. With
+    precision="single" every table and intermediate is complex64. A plan is read-only
+    once built, so threads can share it.'''
+
+    def __init__(self, n: int, precision: str = "double"):
+        if n < 1:
+            raise ValueError(f"FFTPlan length must be positive, got {n}")
+        self.n = n
+        self.precision = _check_precision(precision)
+        self.dtype = PRECISIONS[precision][1]
+        radices = _factorize(n)
+        self.bluestein = bool(radices) and radices[-1] > MAX_DIRECT_RADIX
+        if self.bluestein:
+            self._init_bluestein(n)
+            return
+        self.radices = radices
+        self.rev = _digit_reverse_indices(radices)
+        self.rev.setflags(write=False)
+        self.twiddles: List[Optional[np.ndarray]] = []
+        L = 1
+        for r in radices:
+            m = L * r
+            if L == 1:
+                self.twiddles.append(None)  # w_m^0 == 1
+            else:
+                qj = np.outer(np.arange(r), np.arange(L)) % m
+                tw = np.exp(-2j * math.pi * qj / m).astype(self.dtype)[:, :, None]  # w_m^(q*j), shape (r, L, 1)
+                tw.setflags(write=False)
+                self.twiddles.append(tw)
+            L = m
+
+    def _init_bluestein(self, n: int) -> None:
+        self.radices = [n]
+        self.inner = get_plan(next_fast_len(2 * n - 1), self.precision)
+        M = self.inner.n
+        k = np.arange(n, dtype=np.int64)
+        # exp(-iπk²/n) with k² reduced mod 2n first so large k keeps full precision
+        chirp = np.exp(-1j * math.pi * ((k * k) % (2 * n)) / n)
+        b = np.zeros(M, dtype=np.complex128)
+        b[:n] = np.conj(chirp)
+        b[M - n + 1:] = np.conj(chirp[1:][::-1])
+        # the kernel is always transformed in double and rounded once
+        self.kernel = get_plan(M).execute(b).astype(self.dtype)
+        self.chirp = chirp.astype(self.dtype)
+        self.chirp.setflags(write=False)
+        self.kernel.setflags(write=False)
+
+    def execute(self, x: ArrayLike) -> np.ndarray:
+        '''Forward DFT along the last axis; leading axes are transformed as a batch.'''
+        a = np.asarray(x, dtype=self.dtype)
+        if a.shape[-1] != self.n:
+            raise ValueError(f"expected last axis of length {self.n}, got {a.shape[-1]}")
+        if self.bluestein:
+            return self._execute_bluestein(a)
+        lead = a.shape[:-1]
+        flat = a.reshape(-1, self.n)
+        out = np.empty(flat.shape, dtype=self.dtype)
+        step = max(1, _WORK_ELEMS // self.n)
+        for c in range(0, flat.shape[0], step):
+            out[c:c + step] = self._run(flat[c:c + step]).T
+        return out.reshape(lead + (self.n,))
+
+    def _run(self, rows: np.ndarray) -> np.ndarray:
+        '''Transform a (batch, n) block; returns the spectra as an (n, batch) array.'''
+        if self.bluestein:
+            return self._execute_bluestein(rows).T
+        batch = rows.shape[0]
+        # Work on an (n, batch) array so every stage slice has the batch as its
+        # contiguous inner run; the permuting gather doubles as the transpose.
+        work = rows.T[self.rev]
+        spare = np.empty_like(work)
+        L = 1
+        for r, tw in zip(self.radices, self.twiddles):
+            m = L * r
+            z = work.reshape(self.n // m, r, L, batch)
+            if tw is not None:
+                np.multiply(z, tw, out=z)
+            if _butterfly(z, r, spare.reshape(z.shape)) is not z:
+                work, spare = spare, work
+            L = m
+        return work
+
+    def _execute_bluestein(self, a: np.ndarray) -> np.ndarray:
+        M = self.inner.n
+        y = np.zeros(a.shape[:-1] + (M,), dtype=self.dtype)
+        np.multiply(a, self.chirp, out=y[..., : self.n])
+        Y = self.inner.execute(y)
+        Y *= self.kernel
+        # inverse of the inner transform via the conjugate trick
+        conv = np.conj(self.inner.execute(np.conj(Y)))[..., : self.n]
+        return conv * (self.chirp / M)
+
+def get_plan(n: int, precision: str = "double") -> FFTPlan:
+    '''Return the cached FFTPlan for length n (LRU-bounded by PLAN_CACHE_SIZE).'''
+    return _cached_plan(n, _check_precision(precision))
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_plan(n: int, precision: str) -> FFTPlan:
+    return FFTPlan(n, precision)
+
+def _pad_empty(x: ArrayLike) -> ArrayLike:
+    # an empty last axis is transformed as one zero sample, as the original
+    # power-of-two padding did, so callers get a single zero bin, not an error
+    if np.shape(x)[-1] > 0:
+        return x
+    a = np.asarray(x)
+    return np.zeros(a.shape[:-1] + (1,), dtype=a.dtype)
+
+def fft_iterative(x: ArrayLike) -> np.ndarray:
+    '''FFT of any length along the last axis (mixed-radix Cooley-Tukey or Bluestein);
+    float32/complex64 input runs in single precision.'''
+    x = _pad_empty(x)
+    return get_plan(np.shape(x)[-1], precision_of(x)).execute(x)
+
+class RealFFTPlan:
+    '''Real-input transform of even length n via one n/2-point complex FFT.
+
+    Even and odd samples are packed as the real and imaginary parts of a half-length
+    complex signal (a zero-copy view of the float64, or float32 for precision="single",
+    input), transformed, then split into the n/2+1 non-negative bins with a
+    precomputed post-twiddle. Odd lengths fall back to the full complex plan.'''
+
+    def __init__(self, n: int, precision: str = "double"):
+        if n < 1:
+            raise ValueError(f"RealFFTPlan length must be positive, got {n}")
+        self.n = n
+        self.precision = _check_precision(precision)
+        self.real_dtype, self.dtype = PRECISIONS[precision]
+        self.packed = n % 2 == 0 and n >= 2
+        if not self.packed:
+            self.full = get_plan(n, precision)
+            return
+        h = n // 2
+        self.half = get_plan(h, precision)
+        w = np.exp(-2j * math.pi * np.arange(h + 1) / n)
+        # X[k] = A[k]*Z[k] + B[k]*conj(Z[h-k]), with Z the packed half-length spectrum
+        self.fwd_a = 0.5 * (1.0 - 1j * w)
+        self.fwd_b = 0.5 * (1.0 + 1j * w)
+        # inverse split: Z[k] = C[k]*X[k] + D[k]*conj(X[h-k]), k < h
+        self.inv_c = 0.5 * (1.0 + 1j * np.conj(w[:h]))
+        self.inv_d = 0.5 * (1.0 - 1j * np.conj(w[:h]))
+        self.fwd_a, self.fwd_b, self.inv_c, self.inv_d = (
+            t.astype(self.dtype) for t in (self.fwd_a, self.fwd_b, self.inv_c, self.inv_d))
+        for t in (self.fwd_a, self.fwd_b, self.inv_c, self.inv_d):
+            t.setflags(write=False)
+
+    def execute(self, x: ArrayLike) -> np.ndarray:
+        '''Non-negative frequency bins (n//2+1) of real input along the last axis.'''
+        a = np.ascontiguousarray(x, dtype=self.real_dtype)
+        if a.shape[-1] != self.n:
+            raise ValueError(f"expected last axis of length {self.n}, got {a.shape[-1]}")
+        if not self.packed:
+            return self.full.execute(a)[..., : self.n//2 + 1]
+        h = self.n // 2
+        lead = a.shape[:-1]
+        flat = a.reshape(-1, self.n).view(self.dtype)
+        out = np.empty((flat.shape[0], h + 1), dtype=self.dtype)
+        fa, fb = self.fwd_a[:, None], self.fwd_b[:, None]
+        step = max(1, _WORK_ELEMS // h)
+        for c in range(0, flat.shape[0], step):
+            Z = self.half._run(flat[c:c + step])  # (h, batch)
+            Zext = np.concatenate((Z, Z[:1]), axis=0)
+            X = Zext * fa
+            Zr = np.conj(Zext[::-1])
+            Zr *= fb
+            X += Zr
+            out[c:c + step] = X.T
+        return out.reshape(lead + (h + 1,))
+
+    def inverse(self, X: ArrayLike) -> np.ndarray:
+        '''Real signal of length n from its n//2+1 non-negative frequency bins.'''
+        A = np.asarray(X, dtype=self.dtype)
+        if A.shape[-1] != self.n//2 + 1:
+            raise ValueError(f"expected last axis of length {self.n//2 + 1}, got {A.shape[-1]}")
+        if not self.packed:
+            full = np.concatenate((A, np.conj(A[..., 1:][..., ::-1])), axis=-1)
+            return np.conj(self.full.execute(np.conj(full))).real / self.n
+        h = self.n // 2
+        Z = A[..., :h] * self.inv_c
+        Z += np.conj(A[..., ::-1][..., :h]) * self.inv_d
+        z = np.conj(self.half.execute(np.conj(Z)))
+        z /= h
+        return np.ascontiguousarray(z).view(self.real_dtype)
+
+def get_real_plan(n: int, precision: str = "double") -> RealFFTPlan:
+    '''Return the cached RealFFTPlan for length n.'''
+    return _cached_real_plan(n, _check_precision(precision))
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_real_plan(n: int, precision: str) -> RealFFTPlan:
+    return RealFFTPlan(n, precision)
+
+def ifft_iterative(X: ArrayLike) -> np.ndarray:
     '''Inverse FFT via conjugate trick and scaling.'''
-    n = len(X)
-    conj = [complex(z.real, -z.imag) for z in X]
-    y = fft_iterative(conj)
-    inv = [complex(z.real/n, -z.imag/n) for z in y]
-    return inv
+    A = _pad_empty(np.asarray(X, dtype=PRECISIONS[precision_of(X)][1]))
+    n = A.shape[-1]
+    y = fft_iterative(np.conj(A))
+    return np.conj(y) / n
 
-def rfft_real(x: List[float]) -> List[complex]:
+def rfft_real(x: ArrayLike) -> np.ndarray:
     '''Compute the non-negative frequency half of FFT for real input.'''
-    X = fft_iterative([complex(v, 0.0) for v in x])
-    n = len(X)
-    return X[: n//2 + 1]
+    x = _pad_empty(x)
+    return get_real_plan(np.shape(x)[-1], precision_of(x)).execute(x)
 
-def rfftfreq(n: int, d: float) -> List[float]:
+def irfft_real(X: ArrayLike, n: Optional[int] = None) -> np.ndarray:
+    '''Inverse of rfft_real; n defaults to 2*(len(X)-1) like numpy's irfft.'''
+    if n is None:
+        n = 2 * (np.shape(X)[-1] - 1)
+    return get_real_plan(n, precision_of(X)).inverse(X)
+
+def rfftfreq(n: int, d: float) -> np.ndarray:
     '''Frequencies for rFFT bins: k/(n*d), k=0..n//2'''
-    return [(k/(n*d)) for k in range(n//2 + 1)]
+    return np.arange(n//2 + 1, dtype=np.float64) / (n*d)
 
 # Window functions (closed-form, no external DSP lib)
 def window_hann(N: int) -> np.ndarray:
@@ -91,15 +367,18 @@ def window_blackman(N: int) -> np.ndarray:
     a0, a1, a2 = 0.42, 0.5, 0.08
     return a0 - a1*np.cos(2.0*math.pi*n/(N-1)) + a2*np.cos(4.0*math.pi*n/(N-1))
 
-def get_window(name: str, N: int) -> np.ndarray:
+def get_window(name: str, N: int, precision: str = "double") -> np.ndarray:
+    '''Window coefficients, computed in double and returned in the precision's real dtype.'''
     key = (name or "rectangular").strip().lower()
     if key == "hann":
-        return window_hann(N)
-    if key == "hamming":
-        return window_hamming(N)
-    if key == "blackman":
-        return window_blackman(N)
-    return np.ones(N, dtype=np.float64)
+        w = window_hann(N)
+    elif key == "hamming":
+        w = window_hamming(N)
+    elif key == "blackman":
+        w = window_blackman(N)
+    else:
+        w = np.ones(N, dtype=np.float64)
+    return w.astype(PRECISIONS[_check_precision(precision)][0], copy=False)
 
 def complex_angle(z: complex) -> float:
     return math.atan2(z.imag, z.real)
@@ -0,0 +1,180 @@
+# 2D FFT by the row-column method on top of the cached 1D plans, plus the
+# frequency-domain image compression and phase-correlation registration built on it.
+from __future__ import annotations
+import math
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+from .fft import ArrayLike, get_plan, get_real_plan, get_window
+
+DEFAULT_TILE = 512
+TILE_AUTO_PIXELS = 1024 * 1024  # larger images are tiled unless a tile size is given
+PREVIEW_MAX_SIDE = 512
+PHASE_CORR_MAX_SIDE = 1024  # larger images are block-averaged down before correlating
+
+def _columns(X: np.ndarray, plan_fn) -> np.ndarray:
+    '''Apply a 1D transform down axis -2 by moving columns to the last axis, so every
+    column of every leading slice goes through the plan as one batch.'''
+    cols = np.ascontiguousarray(np.swapaxes(X, -1, -2))
+    return np.swapaxes(plan_fn(cols), -1, -2)
+
+def fft2(x: ArrayLike) -> np.ndarray:
+    '''Complex 2D FFT over the last two axes; leading axes (e.g. channels) are batched.'''
+    a = np.asarray(x)
+    rows = get_plan(a.shape[-1]).execute(a)
+    return np.ascontiguousarray(_columns(rows, get_plan(a.shape[-2]).execute))
+
+def ifft2(X: ArrayLike) -> np.ndarray:
+    A = np.asarray(X, dtype=np.complex128)
+    h, w = A.shape[-2:]
+    y = fft2(np.conj(A))
+    y = np.conj(y)
+    y /= h * w
+    return y
+
+def rfft2(x: ArrayLike) -> np.ndarray:
+    '''2D FFT of real input over the last two axes, keeping the w//2+1 non-negative
+    column frequencies (the rest follow from Hermitian symmetry). The row pass uses
+    the packed real plan, so the column pass only sees half the columns.'''
+    a = np.asarray(x, dtype=np.float64)
+    rows = get_real_plan(a.shape[-1]).execute(a)
+    return np.ascontiguousarray(_columns(rows, get_plan(a.shape[-2]).execute))
+
+def irfft2(X: ArrayLike, shape: Tuple[int, int]) -> np.ndarray:
+    '''Real inverse of rfft2 for an output of the given (h, w).'''
+    h, w = shape
+    A = np.asarray(X, dtype=np.complex128)
+    if A.shape[-2:] != (h, w//2 + 1):
+        raise ValueError(f"expected spectrum of shape (..., {h}, {w//2 + 1}), got {A.shape}")
+    plan = get_plan(h)
+    cols = _columns(np.conj(A), plan.execute)
+    cols = np.conj(cols)
+    cols /= h
+    return get_real_plan(w).inverse(cols)
+
+def fftshift2(X: np.ndarray) -> np.ndarray:
+    '''Move the zero frequency of the last two axes to the centre.'''
+    return np.roll(X, (X.shape[-2] // 2, X.shape[-1] // 2), axis=(-2, -1))
+
+def radial_mask(h: int, w: int, cutoff: float) -> np.ndarray:
+    '''Boolean (h, w//2+1) mask of rfft2 bins within `cutoff` of the origin, measured
+    as a fraction of the Nyquist radius on each axis (1.0 keeps the inscribed ellipse).'''
+    fy = np.minimum(np.arange(h), h - np.arange(h)) / max(h / 2.0, 1.0)
+    fx = np.arange(w//2 + 1) / max(w / 2.0, 1.0)
+    return fy[:, None]**2 + fx[None, :]**2 <= cutoff**2
+
+def _bin_weights(w: int) -> np.ndarray:
+    '''How many full-spectrum bins each rfft2 column stands for (1 for DC/Nyquist, else 2).'''
+    k = np.full(w//2 + 1, 2.0)
+    k[0] = 1.0
+    if w % 2 == 0:
+        k[-1] = 1.0
+    return k
+
+def keep_largest(X: np.ndarray, keep_ratio: float) -> np.ndarray:
+    '''Zero all but the largest-magnitude keep_ratio of the coefficients of each 2D
+    slice of an rfft2 spectrum (ties at the threshold are kept).'''
+    n = X.shape[-2] * X.shape[-1]
+    keep = max(1, int(round(keep_ratio * n)))
+    if keep >= n:
+        return X
+    mag = np.abs(X).reshape(X.shape[:-2] + (n,))
+    thresh = np.partition(mag, n - keep, axis=-1)[..., n - keep:n - keep + 1]
+    return np.where((mag >= thresh).reshape(X.shape), X, 0)
+
+def tiles(h: int, w: int, tile: int) -> Iterator[Tuple[slice, slice]]:
+    for y in range(0, h, tile):
+        for x in range(0, w, tile):
+            yield slice(y, min(y + tile, h)), slice(x, min(x + tile, w))
+
+def compress_fft(img: np.ndarray, keep_ratio: Optional[float] = None, cutoff: Optional[float] = None,
+                 tile: Optional[int] = None) -> Tuple[np.ndarray, float]:
+    '''Compress an (h, w, channels) image by discarding 2D frequency coefficients.
+
+    Each tile (tile=0 means the whole image; None picks DEFAULT_TILE for images over
+    TILE_AUTO_PIXELS and the whole image otherwise) is transformed with
+    rfft2 for all channels at once, then either the largest keep_ratio of its
+    coefficients or those inside the radial cutoff are kept before the inverse.
+    Tiling bounds peak memory to a few tile-sized spectra regardless of image size.
+    Returns (reconstruction as uint8, fraction of coefficients kept).'''
+    if (keep_ratio is None) == (cutoff is None):
+        raise ValueError("give exactly one of keep_ratio or cutoff")
+    h, w, c = img.shape
+    if tile is None:
+        tile = DEFAULT_TILE if h * w > TILE_AUTO_PIXELS else 0
+    tile = tile or max(h, w)
+    out = np.empty((h, w, c), dtype=np.uint8)
+    kept = 0.0
+    for ys, xs in tiles(h, w, tile):
+        block = np.moveaxis(img[ys, xs], -1, 0).astype(np.float64)  # (c, th, tw)
+        th, tw = block.shape[1:]
+        X = rfft2(block)
+        weights = _bin_weights(tw)
+        if keep_ratio is not None:
+            X = keep_largest(X, keep_ratio)
+            nz = X != 0
+        else:
+            nz = np.broadcast_to(radial_mask(th, tw, cutoff), X.shape)
+            X = np.where(nz, X, 0)
+        kept += float((nz * weights).sum())
+        rec = irfft2(X, (th, tw))
+        out[ys, xs] = np.moveaxis(np.clip(np.rint(rec), 0, 255), 0, -1).astype(np.uint8)
+    return out, kept / float(h * w * c)
+
+def log_magnitude_preview(gray: np.ndarray) -> np.ndarray:
+    '''Centred log(1+|F|) spectrum of a 2D image scaled to uint8 for display.'''
+    F = fftshift2(fft2(gray.astype(np.float64) - float(np.mean(gray))))
+    L = np.log1p(np.abs(F))
+    peak = float(L.max())
+    return (L * (255.0 / peak) if peak > 0 else L).astype(np.uint8)
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = float(np.mean((a.astype(np.float64) - b.astype(np.float64))**2))
+    return math.inf if mse == 0 else 10.0 * math.log10(255.0**2 / mse)
+
+def _downsample(a: np.ndarray, factor: int) -> np.ndarray:
+    if factor == 1:
+        return a
+    h, w = a.shape[-2] // factor * factor, a.shape[-1] // factor * factor
+    a = a[..., :h, :w]
+    return a.reshape(a.shape[:-2] + (h // factor, factor, w // factor, factor)).mean(axis=(-3, -1))
+
+def _parabolic(c_minus: np.ndarray, c0: np.ndarray, c_plus: np.ndarray) -> np.ndarray:
+    denom = c_minus - 2.0 * c0 + c_plus
+    with np.errstate(divide="ignore", invalid="ignore"):
+        off = np.where(np.abs(denom) > 1e-12, 0.5 * (c_minus - c_plus) / denom, 0.0)
+    return np.clip(off, -0.5, 0.5)
+
+def phase_correlate(ref: np.ndarray, mov: np.ndarray,
+                    max_side: int = PHASE_CORR_MAX_SIDE) -> Tuple[np.ndarray, np.ndarray]:
+    '''Translation (dy, dx) such that mov(y, x) ~ ref(y - dy, x - dx), by phase correlation.
+
+    ref is (h, w) grayscale; mov is (h, w) or a (n, h, w) stack, all moving images
+    being transformed in one batched rfft2. Edges are Hann-tapered, the peak refined to
+    sub-pixel by a parabola through its neighbours. Images with a side above max_side
+    are block-averaged first, so the shift resolution is then that block size.
+    Returns (shifts of shape (..., 2), peak heights in [0, 1] as a confidence).'''
+    ref = np.asarray(ref, dtype=np.float64)
+    mov = np.asarray(mov, dtype=np.float64)
+    if mov.shape[-2:] != ref.shape:
+        raise ValueError(f"moving images must have the reference shape {ref.shape}, got {mov.shape[-2:]}")
+    factor = max(1, math.ceil(max(ref.shape) / max_side))
+    ref, mov = _downsample(ref, factor), _downsample(mov, factor)
+    h, w = ref.shape
+    taper = np.outer(get_window("hann", h), get_window("hann", w))
+    F_ref = rfft2((ref - ref.mean()) * taper)
+    F_mov = rfft2((mov - mov.mean(axis=(-2, -1), keepdims=True)) * taper)
+    cross = F_mov * np.conj(F_ref)
+    cross /= np.maximum(np.abs(cross), 1e-12)
+    r = irfft2(cross, (h, w))
+    flat = r.reshape(r.shape[:-2] + (-1,))
+    peak = flat.argmax(axis=-1)
+    py, px = np.divmod(peak, w)
+    idx = np.indices(py.shape)
+    at = lambda y, x: r[tuple(idx) + (y % h, x % w)]
+    c0 = at(py, px)
+    dy = py + _parabolic(at(py - 1, px), c0, at(py + 1, px))
+    dx = px + _parabolic(at(py, px - 1), c0, at(py, px + 1))
+    dy = np.where(dy > h / 2, dy - h, dy)  # wrap to signed shifts
+    dx = np.where(dx > w / 2, dx - w, dx)
+    return np.stack([dy, dx], axis=-1) * factor, np.clip(c0, 0.0, 1.0)
@@ -1,12 +1,17 @@
-
 from __future__ import annotations
 import math
+from functools import lru_cache
 import numpy as np
 
-def _sinc(x: float) -> float:
-    if abs(x) < 1e-8:
-        return 1.0
-    return math.sin(math.pi*x)/(math.pi*x)
+from .fft import PRECISIONS, get_real_plan, next_pow_two, precision_of
+
+# Distinct (type, cutoffs, fs, numtaps) designs kept by the FIR design caches.
+FIR_CACHE_SIZE = 64
+# Measured cost of one overlap-save sample per log2(L), in units of one direct
+# multiply-accumulate of np.convolve; decides which convolution apply_fir runs.
+FFT_COST_RATIO = 60.0
+# Overlap-save blocks transformed per batch; bounds the (blocks x L) temporaries.
+_BLOCKS_PER_BATCH = 64
 
 def _hann(N: int) -> np.ndarray:
     if N <= 1: 
@@ -14,26 +19,34 @@ def _hann(N: int) -> np.ndarray:
     n = np.arange(N, dtype=np.float64)
     return 0.5 - 0.5*np.cos(2.0*math.pi*n/(N-1))
 
+def _frozen(h: np.ndarray) -> np.ndarray:
+    # cached designs are shared between callers, so hand them out read-only
+    h.setflags(write=False)
+    return h
+
+@lru_cache(maxsize=FIR_CACHE_SIZE)
 def design_lowpass_fir(cutoff_hz: float, fs: float, numtaps: int = 101) -> np.ndarray:
     if cutoff_hz <= 0:
-        h = np.zeros(numtaps, dtype=np.float64); h[numtaps//2] = 0.0; return h
+        h = np.zeros(numtaps, dtype=np.float64); h[numtaps//2] = 0.0; return _frozen(h)
     if cutoff_hz >= fs/2.0:
-        h = np.zeros(numtaps, dtype=np.float64); h[numtaps//2] = 1.0; return h
+        h = np.zeros(numtaps, dtype=np.float64); h[numtaps//2] = 1.0; return _frozen(h)
     fc = cutoff_hz / fs
     M = numtaps - 1
     n = np.arange(numtaps) - M/2.0
-    h = 2.0*fc * np.array([_sinc(2.0*fc*ni) for ni in n], dtype=np.float64)
+    h = 2.0*fc * np.sinc(2.0*fc*n)
     w = _hann(numtaps)
     h = h * w
     h = h / np.sum(h)
-    return h
+    return _frozen(h)
 
+@lru_cache(maxsize=FIR_CACHE_SIZE)
 def design_highpass_fir(cutoff_hz: float, fs: float, numtaps: int = 101) -> np.ndarray:
     lp = design_lowpass_fir(cutoff_hz, fs, numtaps=numtaps)
     hp = -lp
     hp[numtaps//2] += 1.0
-    return hp
+    return _frozen(hp)
 
+@lru_cache(maxsize=FIR_CACHE_SIZE)
 def design_bandpass_fir(low_hz: float, high_hz: float, fs: float, numtaps: int = 101) -> np.ndarray:
     if low_hz >= high_hz:
         raise ValueError("low_hz must be < high_hz")
@@ -43,8 +56,59 @@ def design_bandpass_fir(low_hz: float, high_hz: float, fs: float, numtaps: int =
     s = np.sum(bp)
     if abs(s) > 1e-8:
         bp = bp / s
-    return bp
+    return _frozen(bp)
+
+def _block_len(numtaps: int) -> int:
+    return next_pow_two(4 * numtaps)
+
+def _overlap_save_cheaper(n: int, numtaps: int) -> bool:
+    L = _block_len(numtaps)
+    if n < L:
+        return False
+    fft_cost = FFT_COST_RATIO * math.log2(L) * L / (L - numtaps + 1)
+    return fft_cost < numtaps
+
+def overlap_save_same(x: np.ndarray, h: np.ndarray) -> np.ndarray:
+    '''np.convolve(x, h, mode="same") along the last axis for x.shape[-1] >= len(h),
+    by block overlap-save through the project's real FFT. Blocks (of every row, for
+    multi-channel x) are transformed in batches; float32 x is filtered in single
+    precision.'''
+    precision = precision_of(x)
+    dtype = PRECISIONS[precision][0]
+    x = np.asarray(x, dtype=dtype)
+    h = np.asarray(h, dtype=np.float64)
+    N, M = x.shape[-1], len(h)
+    lead = x.shape[:-1]
+    L = _block_len(M)
+    step = L - (M - 1)
+    plan = get_real_plan(L, precision)
+    H = get_real_plan(L).execute(np.concatenate((h, np.zeros(L - M)))).astype(plan.dtype)
+    # "same" keeps full-convolution samples [start, start + N)
+    start = (M - 1) // 2
+    n_blocks = -(-(start + N) // step)
+    xp = np.zeros(lead + ((n_blocks - 1) * step + L,), dtype=dtype)
+    xp[..., M - 1: M - 1 + N] = x
+    frames = np.lib.stride_tricks.sliding_window_view(xp, L, axis=-1)[..., ::step, :]
+    full = np.empty(lead + (n_blocks * step,), dtype=dtype)
+    per_batch = max(1, _BLOCKS_PER_BATCH // max(1, int(np.prod(lead, dtype=np.int64))))
+    for b in range(0, n_blocks, per_batch):
+        Y = plan.execute(frames[..., b:b + per_batch, :])
+        Y *= H
+        y = plan.inverse(Y)[..., M - 1:]  # discard the wrapped-around prefix
+        full[..., b * step: b * step + y.shape[-2] * step] = y.reshape(lead + (-1,))
+    return full[..., start:start + N]
 
 def apply_fir(x: np.ndarray, h: np.ndarray) -> np.ndarray:
+    '''Zero-phase-aligned ("same") FIR filtering along the last axis; leading axes
+    (channels) are filtered together. float32 x stays float32 (taps are rounded to
+    float32 too); anything else is filtered in float64.'''
+    dtype = PRECISIONS[precision_of(x)][0]
+    x = np.asarray(x, dtype=dtype)
+    if _overlap_save_cheaper(x.shape[-1], len(h)):
+        return overlap_save_same(x, h)
+    h = np.asarray(h, dtype=dtype)
+    if x.ndim > 1:
+        rows = x.reshape(-1, x.shape[-1])
+        return np.stack([np.convolve(r, h, mode="same") for r in rows]).reshape(x.shape)
     y = np.convolve(x, h, mode="same")
-    return y.astype(np.float64, copy=False)
+    return y.astype(dtype, copy=False)
@@ -0,0 +1,76 @@
+# Welch power spectral density: the periodograms of overlapping windowed segments,
+# averaged. Segments are reduced into a running sum block by block, and the signal can
+# be split into segment ranges whose partial sums are combined afterwards, so work
+# can be spread over several workers without materialising all segment spectra.
+from __future__ import annotations
+import math
+from typing import List, Optional, Tuple
+import numpy as np
+
+from .fft import PRECISIONS, get_real_plan, get_window, rfftfreq
+from .stft import FRAMES_PER_BLOCK, frame_signal
+
+# A worker task covers at least this many segments; fewer is not worth the dispatch.
+MIN_SEGMENTS_PER_TASK = 256
+
+def num_segments(n: int, nperseg: int, hop: int) -> int:
+    return 1 if n <= nperseg else 1 + (n - nperseg) // hop
+
+def segment_ranges(n: int, nperseg: int, hop: int, parts: int) -> List[Tuple[int, int]]:
+    '''Split the segments of an n-sample signal into at most `parts` contiguous runs.
+
+    Returns (start_sample, end_sample) slices; each slice holds whole segments only
+    (neighbouring slices share their overlap samples) so the partial sums add up to
+    exactly the full-signal sum.'''
+    total = num_segments(n, nperseg, hop)
+    per = max(MIN_SEGMENTS_PER_TASK, math.ceil(total / max(1, parts)))
+    out = []
+    for first in range(0, total, per):
+        last = min(total, first + per)  # exclusive
+        out.append((first * hop, min(n, (last - 1) * hop + nperseg)))
+    return out
+
+def welch_partial(x: np.ndarray, nperseg: int, hop: int, window_type: str = "hann",
+                  detrend: bool = True, precision: str = "double") -> Tuple[np.ndarray, int]:
+    '''Sum of |rFFT|^2 over the windowed segments of x, and the segment count.
+
+    Only FRAMES_PER_BLOCK segments are materialised at a time, so memory is
+    O(nperseg) whatever the length of x. precision="single" windows and transforms
+    the segments in float32; the running sum is always float64.'''
+    w = get_window(window_type, nperseg, precision)
+    plan = get_real_plan(nperseg, precision)
+    frames = frame_signal(np.asarray(x), nperseg, hop)
+    acc = np.zeros(nperseg//2 + 1, dtype=np.float64)
+    for start in range(0, frames.shape[0], FRAMES_PER_BLOCK):
+        block = frames[start:start + FRAMES_PER_BLOCK].astype(PRECISIONS[precision][0])
+        if detrend:
+            block -= block.mean(axis=-1, keepdims=True)
+        block *= w
+        X = plan.execute(block)
+        acc += (X.real**2 + X.imag**2).sum(axis=0, dtype=np.float64)
+    return acc, int(frames.shape[0])
+
+def welch_finish(acc: np.ndarray, count: int, fs: float, nperseg: int,
+                 window_type: str = "hann") -> Tuple[np.ndarray, np.ndarray]:
+    '''One-sided PSD (power per Hz) from a summed periodogram.
+
+    Scaled by 1/(fs * sum(w^2)) so a white noise of variance s^2 reads s^2 / (fs/2)
+    per Hz one-sided; interior bins are doubled to fold in the negative frequencies.'''
+    w = get_window(window_type, nperseg)
+    psd = acc / (max(count, 1) * fs * float(np.sum(w * w)))
+    if nperseg % 2 == 0:
+        psd[1:-1] *= 2.0
+    else:
+        psd[1:] *= 2.0
+    return rfftfreq(nperseg, 1.0/fs), psd
+
+def welch(x: np.ndarray, fs: float, nperseg: int = 2048, noverlap: Optional[int] = None,
+          window_type: str = "hann", detrend: bool = True,
+          precision: str = "double") -> Tuple[np.ndarray, np.ndarray, int]:
+    '''Welch PSD of x in a single pass. Returns (frequencies, psd, n_segments).'''
+    hop = nperseg - (nperseg // 2 if noverlap is None else int(noverlap))
+    if hop < 1:
+        raise ValueError("noverlap must be smaller than nperseg")
+    acc, count = welch_partial(x, nperseg, hop, window_type, detrend, precision)
+    freqs, psd = welch_finish(acc, count, fs, nperseg, window_type)
+    return freqs, psd, count
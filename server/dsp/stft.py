@@ -0,0 +1,85 @@
+# Short-time Fourier transform over a whole signal — frames are a strided view of
+# the input and each block of frames goes through one batched real FFT.
+from __future__ import annotations
+from typing import Optional, Tuple
+import numpy as np
+
+from .fft import PRECISIONS, get_real_plan, get_window, precision_of, rfftfreq
+
+# Frames windowed + transformed per batch; bounds the temporary (frames x N) copy.
+FRAMES_PER_BLOCK = 128
+
+def frame_signal(x: np.ndarray, frame_len: int, hop: int) -> np.ndarray:
+    '''Zero-copy (n_frames, frame_len) strided view of x with the given hop.
+
+    Signals shorter than one frame are zero-padded to a single frame (that case copies).'''
+    if frame_len < 1 or hop < 1:
+        raise ValueError("frame_len and hop must be positive")
+    x = np.asarray(x)
+    if x.shape[-1] < frame_len:
+        pad = np.zeros(x.shape[:-1] + (frame_len,), dtype=x.dtype)
+        pad[..., : x.shape[-1]] = x
+        x = pad
+    return np.lib.stride_tricks.sliding_window_view(x, frame_len, axis=-1)[..., ::hop, :]
+
+def _frames_magnitude(frames: np.ndarray, w: np.ndarray, db: bool) -> np.ndarray:
+    '''|rFFT| of each windowed frame as float32, transformed FRAMES_PER_BLOCK at a time
+    in the precision of the frames.'''
+    n = frames.shape[-1]
+    plan = get_real_plan(n, precision_of(frames))
+    S = np.empty(frames.shape[:-1] + (n//2 + 1,), dtype=np.float32)
+    for start in range(0, frames.shape[0], FRAMES_PER_BLOCK):
+        block = frames[start:start + FRAMES_PER_BLOCK] * w
+        np.abs(plan.execute(block), out=S[start:start + FRAMES_PER_BLOCK], casting="same_kind")
+    if db:
+        np.maximum(S, np.float32(1e-10), out=S)
+        np.log10(S, out=S)
+        S *= 20.0
+    return S
+
+def stft_magnitude(x: np.ndarray, fs: float, window_size: int = 2048, hop: Optional[int] = None,
+                   window_type: str = "hann", db: bool = False,
+                   precision: str = "double") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Magnitude spectrogram of x.
+
+    Returns (frequencies, frame start times, S) where S is float32 with shape
+    (n_frames, window_size//2 + 1); db=True gives 20*log10(|X|) instead of |X|.
+    precision="single" windows and transforms the frames in float32/complex64.'''
+    hop = int(hop or max(1, window_size // 4))
+    frames = frame_signal(np.asarray(x, dtype=PRECISIONS[precision][0]), window_size, hop)
+    S = _frames_magnitude(frames, get_window(window_type, window_size, precision), db)
+    times = np.arange(frames.shape[0], dtype=np.float64) * (hop / float(fs))
+    return rfftfreq(window_size, 1.0/fs), times, S
+
+class StreamingSTFT:
+    '''Incremental STFT for live input: push() sample chunks as they arrive and get
+    back the spectra of every frame completed by that chunk.
+
+    Only the overlap (the samples from the next frame start onwards, fewer than
+    window_size) is carried between pushes, so memory stays constant however long
+    the stream runs and a frame is emitted as soon as its last hop arrives.'''
+
+    def __init__(self, fs: float, window_size: int = 2048, hop: Optional[int] = None,
+                 window_type: str = "hann", db: bool = False):
+        self.fs = float(fs)
+        self.window_size = int(window_size)
+        self.hop = int(hop or max(1, window_size // 4))
+        self.db = db
+        self.window = get_window(window_type, self.window_size)
+        self.frequencies = rfftfreq(self.window_size, 1.0/self.fs)
+        self.frames_emitted = 0
+        self._tail = np.zeros(0, dtype=np.float64)
+
+    def push(self, chunk: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''Append samples; returns (frame start times, S) for the frames completed.'''
+        data = np.concatenate((self._tail, np.asarray(chunk, dtype=np.float64).ravel()))
+        n_new = 0 if len(data) < self.window_size else 1 + (len(data) - self.window_size) // self.hop
+        if n_new:
+            frames = frame_signal(data, self.window_size, self.hop)[:n_new]
+            S = _frames_magnitude(frames, self.window, self.db)
+        else:
+            S = np.empty((0, self.window_size//2 + 1), dtype=np.float32)
+        times = (self.frames_emitted + np.arange(n_new)) * (self.hop / self.fs)
+        self.frames_emitted += n_new
+        self._tail = data[n_new * self.hop:].copy()
+        return times, S
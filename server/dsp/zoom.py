@@ -0,0 +1,89 @@
+# Band-limited spectra: the chirp-z transform evaluates M equally spaced bins over
+# any [f_lo, f_hi] (at any spacing, not just fs/N) with three FFTs of length
+# ~N+M, and Goertzel-style single-bin sums give a handful of arbitrary frequencies in
+# O(N) each. Neither computes the rest of the 0..fs/2 spectrum.
+from __future__ import annotations
+import math
+from typing import Sequence, Tuple
+import numpy as np
+
+from .fft import PRECISIONS, ArrayLike, get_plan, next_fast_len, precision_of
+
+# Largest bin count a zoom request may ask for.
+MAX_BAND_BINS = 1 << 16
+# Samples per block of the Goertzel sums; one (frequencies x block) phasor table is reused.
+GOERTZEL_BLOCK = 4096
+
+def band_frequencies(f_lo: float, f_hi: float, m: int) -> np.ndarray:
+    '''The m bin frequencies of a zoom over [f_lo, f_hi], both ends included.'''
+    if m == 1:
+        return np.array([float(f_lo)])
+    return f_lo + np.arange(m, dtype=np.float64) * ((f_hi - f_lo) / (m - 1))
+
+def _chirp(ratio: float, count: int) -> np.ndarray:
+    # exp(-iπ·ratio·k²); k² is exact in int64, and reducing ratio·k² mod 2 before
+    # scaling by π keeps the angle small even for long signals
+    k = np.arange(count, dtype=np.int64)
+    return np.exp(-1j * math.pi * np.mod(ratio * (k * k).astype(np.float64), 2.0))
+
+def czt(x: ArrayLike, m: int, f_lo: float, df: float, fs: float) -> np.ndarray:
+    '''X[k] = sum_n x[n] exp(-2πi (f_lo + k·df) n / fs) for k < m, along the last axis.
+
+    Bluestein's identity nk = (n² + k² - (k-n)²)/2 turns the sums into one
+    convolution with a chirp, done with the FFT engine at a 2/3/5-smooth length
+    >= N+M-1. float32/complex64 input runs in single precision.'''
+    precision = precision_of(x)
+    a = np.asarray(x, dtype=PRECISIONS[precision][1])
+    n = a.shape[-1]
+    if m < 1 or n < 1:
+        raise ValueError("czt needs at least one sample and one bin")
+    plan = get_plan(next_fast_len(n + m - 1), precision)
+    L, ratio = plan.n, df / fs
+    chirp = _chirp(ratio, max(n, m))
+    start = np.exp(-2j * math.pi * np.mod((f_lo / fs) * np.arange(n, dtype=np.float64), 1.0))
+    y = np.zeros(a.shape[:-1] + (L,), dtype=plan.dtype)
+    np.multiply(a, (start * chirp[:n]).astype(plan.dtype), out=y[..., :n])
+    v = np.zeros(L, dtype=np.complex128)
+    v[:m] = np.conj(chirp[:m])
+    v[L - n + 1:] = np.conj(chirp[1:n][::-1])
+    Y = plan.execute(y)
+    Y *= get_plan(L).execute(v).astype(plan.dtype)  # kernel transformed in double
+    g = np.conj(plan.execute(np.conj(Y)))[..., :m]
+    return g * (chirp[:m] / L).astype(plan.dtype)
+
+def zoom_fft(x: ArrayLike, fs: float, f_lo: float, f_hi: float, m: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''(frequencies, complex bins) for m bins spread evenly over [f_lo, f_hi].
+
+    The bins sample the signal's DTFT, so at frequencies k·fs/N they equal the FFT;
+    the frequency resolution is still set by the signal length, the zoom only
+    chooses where (and how densely) the spectrum is evaluated.'''
+    if not 0 <= f_lo <= f_hi <= fs / 2:
+        raise ValueError(f"band must satisfy 0 <= f_lo <= f_hi <= fs/2, got [{f_lo}, {f_hi}]")
+    if not 1 <= m <= MAX_BAND_BINS:
+        raise ValueError(f"bin count must be between 1 and {MAX_BAND_BINS}")
+    df = (f_hi - f_lo) / (m - 1) if m > 1 else 0.0
+    return band_frequencies(f_lo, f_hi, m), czt(x, m, f_lo, df, fs)
+
+def goertzel(x: ArrayLike, fs: float, freqs: Sequence[float]) -> np.ndarray:
+    '''The DTFT of x at each of a few frequencies (any value, not only bin centres),
+    i.e. what a Goertzel filter tuned to each one reports, along the last axis.
+
+    Rather than the per-sample Goertzel recurrence, each block of GOERTZEL_BLOCK
+    samples is multiplied by one shared (frequencies x block) phasor table, and the
+    block offsets are folded in afterwards, so the work is a few matrix products and
+    costs O(N) per frequency. Angles are reduced mod 2π, which keeps long signals
+    exact.'''
+    precision = precision_of(x)
+    real, cdtype = PRECISIONS[precision]
+    a = np.asarray(x)
+    a = a.astype(cdtype if np.iscomplexobj(a) else real, copy=False)
+    cycles = np.asarray(freqs, dtype=np.float64) / fs  # cycles per sample
+    n = a.shape[-1]
+    B = min(GOERTZEL_BLOCK, max(n, 1))
+    table = np.exp(-2j * math.pi * np.mod(np.outer(np.arange(B), cycles), 1.0)).astype(cdtype)  # (B, K)
+    out = np.zeros(a.shape[:-1] + (len(cycles),), dtype=np.complex128)
+    for s in range(0, n, B):
+        block = a[..., s:s + B]
+        part = block @ table[: block.shape[-1]]
+        out += part * np.exp(-2j * math.pi * np.mod(s * cycles, 1.0))
+    return out.astype(cdtype, copy=False)
@@ -0,0 +1,92 @@
+# Streaming exports of a stored spectrum. The (3, bins) array is memory-mapped and
+# written out block by block, so an export of any size holds only one block of rows
+# in memory; callers can narrow it to some columns and a frequency range.
+from __future__ import annotations
+import io
+import json
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+from wire import MAGIC
+
+COLUMNS = ("frequency", "magnitude", "phase")  # row order of a stored mono spectrum
+CSV_LABELS = {"frequency": "Frequency (Hz)", "magnitude": "Magnitude", "phase": "Phase"}
+ROWS_PER_BLOCK = 8192
+
+FORMATS = {
+    "csv": "text/csv",
+    "npy": "application/x-npy",
+    "columnar": "application/octet-stream",
+}
+
+def spectrum_columns(labels: Optional[Sequence[str]] = None) -> List[str]:
+    '''Row names of a stored spectrum: COLUMNS for mono, else frequency followed by
+    magnitude_<label> and phase_<label> for each channel label.'''
+    if not labels:
+        return list(COLUMNS)
+    return ["frequency"] + [f"magnitude_{l}" for l in labels] + [f"phase_{l}" for l in labels]
+
+def parse_columns(columns: Optional[str], available: Sequence[str] = COLUMNS) -> List[str]:
+    '''Comma-separated column names (any order, default all) in `available` order;
+    "magnitude"/"phase" also select every per-channel column of that kind.'''
+    if not columns:
+        return list(available)
+    names = [c.strip().lower() for c in columns.split(",") if c.strip()]
+    chosen = {a for a in available for n in names if a == n or a.startswith(n + "_")}
+    unknown = sorted(n for n in names if not any(a == n or a.startswith(n + "_") for a in available))
+    if unknown or not names:
+        raise ValueError(f"unknown columns {unknown}; choose from {', '.join(available)}")
+    return [a for a in available if a in chosen]
+
+def _csv_label(name: str) -> str:
+    base, _, label = name.partition("_")
+    return f"{CSV_LABELS[base]} [{label}]" if label else CSV_LABELS[base]
+
+def select(spectrum: np.ndarray, fmin: Optional[float] = None, fmax: Optional[float] = None) -> Tuple[int, int]:
+    '''[lo, hi) bin range with fmin <= frequency <= fmax; frequencies are ascending,
+    so this is a binary search on the mapped frequency row.'''
+    freqs = spectrum[0]
+    lo = 0 if fmin is None else int(np.searchsorted(freqs, fmin, side="left"))
+    hi = len(freqs) if fmax is None else int(np.searchsorted(freqs, fmax, side="right"))
+    return lo, max(lo, hi)
+
+def _blocks(lo: int, hi: int, rows: int) -> Iterator[Tuple[int, int]]:
+    for start in range(lo, hi, rows):
+        yield start, min(hi, start + rows)
+
+def iter_csv(spectrum: np.ndarray, columns: Sequence[str], lo: int, hi: int,
+             rows: int = ROWS_PER_BLOCK, names: Sequence[str] = COLUMNS) -> Iterator[bytes]:
+    '''CSV text, one header line then one line per bin. Each block is formatted with a
+    single %-operation over its values; %r keeps the shortest round-trip repr.'''
+    idx = [list(names).index(c) for c in columns]
+    yield (",".join(_csv_label(c) for c in columns) + "\n").encode("utf-8")
+    line = ",".join(["%r"] * len(idx)) + "\n"
+    for start, stop in _blocks(lo, hi, rows):
+        block = np.asarray(spectrum[idx, start:stop], dtype=np.float64)
+        yield ((line * (stop - start)) % tuple(block.T.ravel().tolist())).encode("ascii")
+
+def iter_npy(spectrum: np.ndarray, columns: Sequence[str], lo: int, hi: int,
+             rows: int = ROWS_PER_BLOCK, names: Sequence[str] = COLUMNS) -> Iterator[bytes]:
+    '''A (len(columns), bins) float64 .npy file, written column after column.'''
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        header, {"descr": "<f8", "fortran_order": False, "shape": (len(columns), hi - lo)})
+    yield header.getvalue()
+    yield from _iter_columns(spectrum, columns, lo, hi, rows, names)
+
+def iter_columnar(spectrum: np.ndarray, columns: Sequence[str], lo: int, hi: int, meta: Dict,
+                  rows: int = ROWS_PER_BLOCK, names: Sequence[str] = COLUMNS) -> Iterator[bytes]:
+    '''The FFTB framing of wire.py with float64 columns: b"FFTB" | uint32 LE header
+    length | JSON header (meta, "dtype" and the "arrays" list) | each column's values.'''
+    header = json.dumps({**meta, "dtype": "<f8",
+                         "arrays": [{"name": c, "shape": [hi - lo]} for c in columns]}).encode("utf-8")
+    yield MAGIC + struct.pack("<I", len(header)) + header
+    yield from _iter_columns(spectrum, columns, lo, hi, rows, names)
+
+def _iter_columns(spectrum: np.ndarray, columns: Sequence[str], lo: int, hi: int, rows: int,
+                  names: Sequence[str]) -> Iterator[bytes]:
+    for c in columns:
+        row = spectrum[list(names).index(c)]
+        for start, stop in _blocks(lo, hi, rows):
+            yield np.ascontiguousarray(row[start:stop], dtype="<f8").tobytes()
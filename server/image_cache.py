@@ -0,0 +1,127 @@
+# Byte-budgeted LRU caches for the image endpoints: decoded RGB pixels of uploaded
+# images (so repeated compress calls skip the JPEG decode), ORB features per image and
+# feature count, and the compressed variants written to IMAGE_DIR (evicting one
+# deletes its file).
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import numpy as np
+
+DECODED_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_MB", "256")) * 1024 * 1024
+FEATURE_MAX_BYTES = int(os.environ.get("FEATURE_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+class ByteLRU:
+    '''Values with an `nbytes` size (arrays, feature sets) under hashable keys, least
+    recently used evicted first once they exceed max_bytes.'''
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        '''Cached value for key, else load() stored and returned. Concurrent misses on
+        one key may both load; the second result simply replaces the first.'''
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+            self._counters["misses"] += 1
+        value = self._prepare(load())
+        with self._lock:
+            self._insert(key, value)
+        return value
+
+    def _prepare(self, value: Any) -> Any:
+        return value
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "entries": len(self._items), "resident_bytes": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+    def _insert(self, key: Hashable, value: Any) -> None:
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if value.nbytes > self.max_bytes:
+            return
+        self._items[key] = value
+        self._bytes += value.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._counters["evictions"] += 1
+
+class DecodedImageCache(ByteLRU):
+    '''Decoded images keyed by their stored path; arrays are shared, so they are
+    returned read-only.'''
+
+    def __init__(self, max_bytes: int = DECODED_MAX_BYTES):
+        super().__init__(max_bytes)
+
+    def _prepare(self, arr: np.ndarray) -> np.ndarray:
+        arr.flags.writeable = False
+        return arr
+
+class CompressedCache:
+    '''Metadata of compressed variants by compressed_id; each entry's "path" and
+    "size_bytes" describe its file. When the files exceed max_bytes the least
+    recently used entries are dropped and their files deleted.'''
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, comp_id: str) -> bool:
+        return comp_id in self._items
+
+    def get(self, comp_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            meta = self._items.get(comp_id)
+            if meta is not None:
+                self._items.move_to_end(comp_id)
+            return meta
+
+    def put(self, comp_id: str, meta: Dict[str, Any]) -> None:
+        with self._lock:
+            old = self._items.pop(comp_id, None)
+            if old is not None:
+                self._bytes -= old["size_bytes"]
+            self._items[comp_id] = meta
+            self._bytes += meta["size_bytes"]
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted["size_bytes"]
+                self.evictions += 1
+                if evicted["path"] != meta["path"]:
+                    try:
+                        os.remove(evicted["path"])
+                    except OSError:
+                        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "evictions": self.evictions}
+
+decoded_images = DecodedImageCache()
+features = ByteLRU(FEATURE_MAX_BYTES)
@@ -0,0 +1,206 @@
+# Streaming decoders for uploaded recordings. The source is read in fixed-size
+# chunks and decoded straight into one float32 output array (mono, or one row per
+# channel), so peak memory is about the size of the decoded signal however large the
+# file. WAV: 8/16/24/32-bit PCM and 32/64-bit float (plain or WAVE_FORMAT_EXTENSIBLE).
+# CSV: one value per line, or time,value pairs; parsed vectorised per chunk.
+from __future__ import annotations
+import re
+import struct
+import warnings
+from typing import BinaryIO, List, Optional, Tuple
+import numpy as np
+
+CHUNK_BYTES = 1 << 20
+DEFAULT_CSV_RATE = 44100
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class IngestError(ValueError):
+    '''The upload is malformed or in an unsupported format.'''
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    buf = f.read(n)
+    if len(buf) != n:
+        raise IngestError("Truncated WAV header")
+    return buf
+
+def _pcm_to_float32(raw: bytes, fmt: int, bits: int) -> np.ndarray:
+    '''Interleaved samples of one chunk as float32 in [-1, 1).'''
+    if fmt == WAVE_FORMAT_IEEE_FLOAT:
+        return np.frombuffer(raw, dtype="<f4" if bits == 32 else "<f8").astype(np.float32)
+    if bits == 8:  # 8-bit PCM is unsigned
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) * np.float32(1 / 128.0)
+    if bits == 16:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) * np.float32(1 / 32768.0)
+    if bits == 24:  # widen to int32 with the 3 bytes in the top of each word
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        wide = np.zeros((b.shape[0], 4), dtype=np.uint8)
+        wide[:, 1:] = b
+        return wide.view("<i4")[:, 0].astype(np.float32) * np.float32(1 / 2147483648.0)
+    return np.frombuffer(raw, dtype="<i4").astype(np.float32) * np.float32(1 / 2147483648.0)
+
+def _downmix(x: np.ndarray, channels: int) -> np.ndarray:
+    if channels == 1:
+        return x
+    return x.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+def _deinterleave(x: np.ndarray, channels: int) -> np.ndarray:
+    return x.reshape(-1, channels).T
+
+def _parse_fmt(body: bytes) -> Tuple[int, int, int, int]:
+    '''(format tag, channels, sample rate, bits per sample) of a fmt chunk.'''
+    if len(body) < 16:
+        raise IngestError("Malformed fmt chunk")
+    fmt, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+    if fmt == WAVE_FORMAT_EXTENSIBLE:
+        if len(body) < 26:
+            raise IngestError("Malformed WAVE_FORMAT_EXTENSIBLE fmt chunk")
+        fmt = struct.unpack("<H", body[24:26])[0]  # first field of the subformat GUID
+    supported = {WAVE_FORMAT_PCM: (8, 16, 24, 32), WAVE_FORMAT_IEEE_FLOAT: (32, 64)}
+    if fmt not in supported or bits not in supported[fmt]:
+        raise IngestError(f"Unsupported WAV encoding (format {fmt:#06x}, {bits}-bit); "
+                          "use 8/16/24/32-bit PCM or 32/64-bit float")
+    if channels < 1 or rate < 1:
+        raise IngestError("WAV header declares no channels or a zero sample rate")
+    return fmt, channels, rate, bits
+
+def decode_wav_stream(f: BinaryIO, chunk_bytes: int = CHUNK_BYTES, mono: bool = True) -> Tuple[int, np.ndarray]:
+    '''(sampling_rate, float32 samples) of a WAV file object: a 1-D mono mix, or with
+    mono=False a (channels, frames) array for multi-channel files.
+
+    The output is preallocated from the data chunk size and filled chunk by chunk; a
+    file shorter than its header claims is returned truncated to the frames present.'''
+    riff = _read_exact(f, 12)
+    if riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+        raise IngestError("Not a RIFF/WAVE file")
+    header = None
+    while True:
+        ck = f.read(8)
+        if len(ck) < 8:
+            raise IngestError("WAV file has no data chunk")
+        ck_id, ck_size = ck[:4], struct.unpack("<I", ck[4:])[0]
+        if ck_id == b"fmt ":
+            header = _parse_fmt(_read_exact(f, ck_size + (ck_size & 1)))
+        elif ck_id == b"data":
+            break
+        else:
+            f.seek(ck_size + (ck_size & 1), 1)  # chunks are word aligned
+    if header is None:
+        raise IngestError("WAV data chunk precedes its fmt chunk")
+    fmt, channels, rate, bits = header
+    frame = channels * bits // 8
+    # streaming writers leave the size at 0 or 0xFFFFFFFF: then grow chunk by chunk
+    known = 0 < ck_size < 0xFFFFFFFF
+    rows = () if mono or channels == 1 else (channels,)
+    out = np.empty(rows + (ck_size // frame,), dtype=np.float32) if known else None
+    parts: List[np.ndarray] = []
+    remaining = ck_size if known else None
+    step = max(frame, chunk_bytes - chunk_bytes % frame)
+    filled, carry = 0, b""
+    while remaining is None or remaining > 0:
+        raw = f.read(step if remaining is None else min(step, remaining))
+        if not raw:
+            break
+        if remaining is not None:
+            remaining -= len(raw)
+        raw = carry + raw
+        whole = len(raw) - len(raw) % frame
+        raw, carry = raw[:whole], raw[whole:]
+        if not raw:
+            continue
+        samples = _pcm_to_float32(raw, fmt, bits)
+        block = _deinterleave(samples, channels) if rows else _downmix(samples, channels)
+        if out is not None:
+            out[..., filled:filled + block.shape[-1]] = block
+        else:
+            parts.append(np.ascontiguousarray(block))
+        filled += block.shape[-1]
+    if out is None:
+        out = np.concatenate(parts, axis=-1) if parts else np.zeros(rows + (0,), dtype=np.float32)
+    return rate, out[..., :filled]
+
+_NEWLINES = re.compile(rb"[\r\n]+")  # also swallows blank lines
+
+def _parse_csv_block(block: bytes) -> np.ndarray:
+    text = _NEWLINES.sub(b",", block).decode("ascii", errors="replace")
+    expected = text.count(",") + 1 - text.endswith(",")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(text, dtype=np.float64, sep=",")
+        except (DeprecationWarning, ValueError):
+            values = None
+    if values is None or values.size != expected:
+        raise IngestError("CSV contains non-numeric values")
+    return values
+
+def decode_csv_stream(f: BinaryIO, chunk_bytes: int = CHUNK_BYTES) -> Tuple[int, np.ndarray]:
+    '''(sampling_rate, float32 samples) of a CSV file object.
+
+    One column is taken as samples at DEFAULT_CSV_RATE; two columns as time,value,
+    with the rate derived from the mean time step. A non-numeric first line is
+    skipped as a header. Each chunk (cut at its last newline) is parsed in one
+    vectorised call.'''
+    parts: List[np.ndarray] = []
+    columns: Optional[int] = None
+    header_checked = False
+    t_first = t_last = None
+    carry = b""
+    while True:
+        raw = f.read(chunk_bytes)
+        block = carry + raw
+        if raw:
+            cut = block.rfind(b"\n")
+            if cut < 0:
+                carry = block
+                continue
+            block, carry = block[:cut], block[cut + 1:]
+        else:
+            carry = b""
+        block = block.strip()
+        if block and not header_checked:
+            header_checked = True
+            first, _, rest = block.partition(b"\n")
+            try:
+                _parse_csv_block(first)
+            except IngestError:
+                block = rest.strip()  # header line
+        if block:
+            if columns is None:
+                columns = block.partition(b"\n")[0].strip().count(b",") + 1
+                if columns > 2:
+                    raise IngestError("CSV must have one column (samples) or two (time,value)")
+            values = _parse_csv_block(block)
+            if values.size % columns:
+                raise IngestError("CSV rows have inconsistent column counts")
+            if columns == 2:
+                pairs = values.reshape(-1, 2)
+                if t_first is None:
+                    t_first = float(pairs[0, 0])
+                t_last = float(pairs[-1, 0])
+                values = pairs[:, 1]
+            parts.append(values.astype(np.float32))
+        if not raw:
+            break
+    data = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    rate = DEFAULT_CSV_RATE
+    if columns == 2 and data.size > 1:
+        dt = (t_last - t_first) / (data.size - 1)
+        rate = int(1.0 / dt) if dt > 0 else DEFAULT_CSV_RATE
+    return rate, data
+
+def decode_stream(f: BinaryIO, filename: str, mono: bool = True) -> Tuple[int, np.ndarray]:
+    '''Dispatch on the file extension; raises IngestError for bad or unsupported input.
+    With mono=False multi-channel WAVs come back as (channels, samples); CSV is mono.'''
+    name = (filename or "").lower()
+    if name.endswith(".wav"):
+        rate, data = decode_wav_stream(f, mono=mono)
+    elif name.endswith(".csv"):
+        rate, data = decode_csv_stream(f)
+    else:
+        raise IngestError("Unsupported file format (use .wav or .csv)")
+    if data.size == 0:
+        raise IngestError("The file contains no samples")
+    return rate, data
@@ -0,0 +1,126 @@
+# Executor for CPU-bound DSP/image work plus an in-memory job registry, so heavy
+# requests never run on the asyncio event loop.
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+class QueueFullError(Exception):
+    '''Raised when the executor or job queue is at capacity (mapped to HTTP 429).'''
+
+class DSPExecutor:
+    '''Thread or process pool with a bound on in-flight submissions.
+
+    Threads suit most of the work here (NumPy, PIL and OpenCV release the GIL in
+    their kernels); processes isolate pure-Python hot spots at the cost of pickling
+    arguments. Functions submitted must be module-level when kind == "process".'''
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None, max_pending: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"executor kind must be 'thread' or 'process', got {kind!r}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:  # created lazily so the app can be restarted after shutdown()
+                self._pool = (ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor)(self.workers)
+            return self._pool
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("DSP executor queue is full")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "pending"  # pending -> running -> done | failed
+    created: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished: Optional[str] = None
+    result: Any = None
+    status_code: int = 200
+    error: Optional[str] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "kind": self.kind, "status": self.status, "created": self.created,
+                "finished": self.finished, "error": self.error, "status_code": self.status_code}
+
+class JobManager:
+    '''Runs submitted coroutines as background tasks and keeps their results.
+
+    At most max_active jobs may be unfinished at once (submit raises QueueFullError
+    beyond that); the newest keep_finished completed jobs are retained for polling.'''
+
+    def __init__(self, max_active: int = 32, keep_finished: int = 256):
+        self.max_active = max_active
+        self.keep_finished = keep_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def submit(self, kind: str, coro: Coroutine) -> Job:
+        if self._active >= self.max_active:
+            coro.close()
+            raise QueueFullError("Job queue is full")
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        self._jobs[job.id] = job
+        self._active += 1
+        self._tasks[job.id] = asyncio.get_running_loop().create_task(self._run(job, coro))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: Job, coro: Coroutine) -> None:
+        job.status = "running"
+        try:
+            job.result = await coro
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.status_code = int(getattr(e, "status_code", 500))
+            job.error = str(getattr(e, "detail", e))
+        finally:
+            job.finished = datetime.utcnow().isoformat()
+            self._active -= 1
+            self._tasks.pop(job.id, None)
+            self._trim()
+
+    def _trim(self) -> None:
+        finished = [j.id for j in self._jobs.values() if j.finished is not None]
+        for job_id in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
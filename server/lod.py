@@ -0,0 +1,100 @@
+# Min/max level-of-detail pyramids for plotting long signals and spectra. Level k
+# holds the minimum and maximum of every block of LOD_FACTOR**k samples, so any
+# [start, end) view can be drawn with at most max_points values by reading
+# O(max_points) entries of one level, while keeping every peak visible.
+from __future__ import annotations
+import math
+from dataclasses import dataclass
+from typing import List, Tuple
+import numpy as np
+
+LOD_FACTOR = 4
+# Levels stop once they are this short; wider buckets are grouped from the top level.
+LOD_TOP_LENGTH = 256
+# Each bucket is drawn as two points (its min and max).
+POINTS_PER_BUCKET = 2
+
+def level_lengths(n: int) -> List[int]:
+    '''Lengths of levels 1.. of the pyramid of an n-sample series (level 0 is the data).'''
+    lengths, size = [], n
+    while size > LOD_TOP_LENGTH:
+        size = -(-size // LOD_FACTOR)
+        lengths.append(size)
+    return lengths
+
+def build_pyramid(x: np.ndarray) -> np.ndarray:
+    '''(2, ..., sum(level_lengths(n))) float32 array: the min row then the max row of
+    levels 1.. concatenated along the last axis, each built from the one below.'''
+    x = np.asarray(x, dtype=np.float32)
+    lo = hi = x
+    mins, maxs = [], []
+    for size in level_lengths(x.shape[-1]):
+        pad = size * LOD_FACTOR - lo.shape[-1]
+        if pad:
+            lo = np.concatenate((lo, np.repeat(lo[..., -1:], pad, axis=-1)), axis=-1)
+            hi = np.concatenate((hi, np.repeat(hi[..., -1:], pad, axis=-1)), axis=-1)
+        lo = lo.reshape(lo.shape[:-1] + (size, LOD_FACTOR)).min(axis=-1)
+        hi = hi.reshape(hi.shape[:-1] + (size, LOD_FACTOR)).max(axis=-1)
+        mins.append(lo); maxs.append(hi)
+    if not mins:
+        return np.zeros((2,) + x.shape[:-1] + (0,), dtype=np.float32)
+    return np.stack((np.concatenate(mins, axis=-1), np.concatenate(maxs, axis=-1)))
+
+@dataclass
+class LODView:
+    '''One viewport: bucket i covers samples [positions[i], positions[i] + bucket_size)
+    (clipped to the view) with extremes mins[..., i] and maxs[..., i]. At
+    bucket_size 1 the buckets are the samples themselves.'''
+    positions: np.ndarray
+    mins: np.ndarray
+    maxs: np.ndarray
+    bucket_size: int
+
+class Pyramid:
+    '''Queries over a series (last axis of data) and its build_pyramid() levels;
+    both may be memory-mapped, only the entries a view needs are read.'''
+
+    def __init__(self, data: np.ndarray, levels: np.ndarray):
+        self.data = data
+        self.n = int(data.shape[-1])
+        self.lengths = level_lengths(self.n)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths))).astype(int)
+        self.levels = levels
+
+    def _level(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        a, b = self.offsets[k - 1], self.offsets[k]
+        return self.levels[0, ..., a:b], self.levels[1, ..., a:b]
+
+    def view(self, start: int = 0, end: int = None, max_points: int = 2000) -> LODView:
+        '''Buckets covering [start, end) with at most max_points values per row.
+        Buckets are aligned to multiples of bucket_size, so panning at one zoom
+        keeps the same bucket edges; the edge buckets may also cover up to one
+        level block just outside the view.'''
+        end = self.n if end is None else min(int(end), self.n)
+        start = max(0, min(int(start), end))
+        span = end - start
+        if span <= max_points or not self.lengths:
+            vals = np.asarray(self.data[..., start:end], dtype=np.float32)
+            return LODView(np.arange(start, end), vals, vals, 1)
+        # two spare buckets absorb the partial ones at either edge of the view
+        buckets = max(1, max_points // POINTS_PER_BUCKET - 2)
+        want = -(-span // buckets)  # samples per bucket
+        k = min(len(self.lengths), int(math.log(want, LOD_FACTOR) + 1e-9))
+        if k == 0:
+            vals = np.asarray(self.data[..., start:end], dtype=np.float32)
+            lo_all, hi_all, block, first = vals, vals, 1, start
+            stop = end
+        else:
+            lo_all, hi_all = self._level(k)
+            block = LOD_FACTOR ** k
+            first, stop = start // block, -(-end // block)
+            lo_all, hi_all = lo_all[..., first:stop], hi_all[..., first:stop]
+        group = -(-want // block)
+        size = block * group
+        # bucket edges at multiples of `group` blocks, the first one clipped to the view
+        edges = np.arange(first // group * group, stop, group)
+        idx = np.maximum(edges, first) - first
+        mins = np.minimum.reduceat(np.asarray(lo_all, dtype=np.float32), idx, axis=-1)
+        maxs = np.maximum.reduceat(np.asarray(hi_all, dtype=np.float32), idx, axis=-1)
+        positions = np.maximum(edges * block, start)
+        return LODView(positions, mins, maxs, size)
@@ -1,21 +1,33 @@
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, WebSocket, WebSocketDisconnect, Request, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Optional, List, Dict, Any, Union
 import numpy as np
 from datetime import datetime
-import uuid, os, io
-from PIL import Image
-try:
-    import cv2
-    OPENCV_AVAILABLE = True
-except Exception:
-    OPENCV_AVAILABLE = False
+import asyncio
+from contextlib import asynccontextmanager
+import uuid, os, time, hashlib, json
 
-from dsp.fft import rfft_real, rfftfreq, get_window, complex_angle
-from dsp.filters import design_lowpass_fir, design_highpass_fir, design_bandpass_fir, apply_fir
+from dsp.fft import PRECISIONS
+from dsp.zoom import MAX_BAND_BINS
+from dsp.stft import stft_magnitude, StreamingSTFT
+from dsp import psd as dsp_psd
+from signal_store import SignalStore
+from result_cache import ResultCache, CachedSpectrum, fft_cache_key, stored_signal_key
+from analysis_store import AnalysisStore, AnalysisRecord
+from image_cache import CompressedCache, decoded_images, features as feature_cache
+import export
+import ingest
+from jobs import DSPExecutor, JobManager, QueueFullError
+import wire
+import workers
+import metrics
+from metrics import span
+from workers import OPENCV_AVAILABLE, TaskError, save_wav_int16
 
 APP_VERSION = "1.2.0"
 
@@ -23,16 +35,69 @@ STORAGE_DIR = os.environ.get("STORAGE_DIR", os.path.join(os.path.dirname(__file_
 AUDIO_DIR = os.path.join(STORAGE_DIR, "audio")
 IMAGE_DIR = os.path.join(STORAGE_DIR, "images")
 ANALYSIS_DIR = os.path.join(STORAGE_DIR, "analyses")
+FFT_CACHE_DIR = os.path.join(STORAGE_DIR, "fft_cache")
+UPLOAD_TMP_DIR = os.path.join(STORAGE_DIR, "tmp")
 
-for p in [STORAGE_DIR, AUDIO_DIR, IMAGE_DIR, ANALYSIS_DIR]:
+for p in [STORAGE_DIR, AUDIO_DIR, IMAGE_DIR, ANALYSIS_DIR, FFT_CACHE_DIR, UPLOAD_TMP_DIR]:
     os.makedirs(p, exist_ok=True)
 
+SIGNAL_STORE_MAX_BYTES = int(os.environ.get("SIGNAL_STORE_MAX_MB", "256")) * 1024 * 1024
+FFT_CACHE_MAX_BYTES = int(os.environ.get("FFT_CACHE_MAX_MB", "64")) * 1024 * 1024
+FFT_CACHE_DISK_BYTES = int(os.environ.get("FFT_CACHE_DISK_MB", "1024")) * 1024 * 1024
+COMPRESSED_CACHE_MAX_BYTES = int(os.environ.get("COMPRESSED_CACHE_MAX_MB", "256")) * 1024 * 1024
+DSP_EXECUTOR = os.environ.get("DSP_EXECUTOR", "thread")
+DSP_WORKERS = int(os.environ.get("DSP_WORKERS", "0")) or None
+DSP_MAX_PENDING = int(os.environ.get("DSP_MAX_PENDING", "64"))
+JOB_MAX_ACTIVE = int(os.environ.get("JOB_MAX_ACTIVE", "32"))
+# "double" (float64/complex128) or "single" (float32/complex64, ~1e-6 relative error; see dsp/fft.py)
+DSP_PRECISION = os.environ.get("DSP_PRECISION", "double")
+if DSP_PRECISION not in PRECISIONS:
+    raise RuntimeError(f"DSP_PRECISION must be one of {sorted(PRECISIONS)}, got {DSP_PRECISION!r}")
+
+dsp_executor = DSPExecutor(DSP_EXECUTOR, DSP_WORKERS, max_pending=DSP_MAX_PENDING)
+job_manager = JobManager(max_active=JOB_MAX_ACTIVE)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    dsp_executor.shutdown()
+
 app = FastAPI(
     title="FFT Signal & Image Analyzer API",
     description="Manual FFT, audio processing, and image compression/registration",
-    version=APP_VERSION
+    version=APP_VERSION,
+    lifespan=lifespan
 )
 
+if metrics.ENABLED:
+    _route_paths: Dict[Any, str] = {}
+
+    @app.middleware("http")
+    async def timing_middleware(request: Request, call_next):
+        sink = metrics.start_request()
+        metrics.registry.add_gauge("fft_http_requests_in_flight", 1, "Requests currently being served")
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            total = time.perf_counter() - t0
+            metrics.registry.add_gauge("fft_http_requests_in_flight", -1)
+            endpoint = request.scope.get("endpoint")
+            if endpoint is not None and endpoint not in _route_paths:
+                _route_paths.update({r.endpoint: r.path for r in app.routes if hasattr(r, "endpoint")})
+            route = _route_paths.get(endpoint, "unmatched")
+            metrics.registry.observe("fft_http_request_duration_seconds", total, "Request latency",
+                                     method=request.method, route=route)
+            metrics.registry.inc("fft_http_requests_total", "Requests served", method=request.method,
+                                 route=route, status=str(status))
+            for name, seconds in sink:
+                metrics.registry.observe("fft_stage_duration_seconds", seconds, "Time spent per processing stage",
+                                         route=route, stage=name)
+        response.headers["Server-Timing"] = metrics.server_timing(sink, total)
+        return response
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -42,12 +107,63 @@ app.add_middleware(
 )
 
 class FFTRequest(BaseModel):
-    signal_data: List[float] = Field(..., description="Signal amplitude values")
+    signal_data: Optional[Union[List[float], List[List[float]]]] = Field(
+        None, description="Signal amplitude values, or one list per channel (or use signal_id)")
+    signal_id: Optional[str] = Field(None, description="ID of an uploaded signal to analyse instead of signal_data")
+    start_sample: Optional[int] = Field(None, ge=0, description="First sample of the stored signal to use")
+    end_sample: Optional[int] = Field(None, ge=0, description="End (exclusive) sample of the stored signal to use")
     sampling_rate: int = Field(44100, description="Sampling rate in Hz")
-    window_size: int = Field(2048, ge=256, le=8192, description="FFT window size")
+    window_size: int = Field(2048, ge=256, le=8192, description="FFT window size (any length, transformed without padding)")
     window_type: str = Field("hann", description="Window function type")
     filter_type: Optional[str] = Field(None, description="Filter type: lowpass, highpass, bandpass")
     filter_cutoff: Optional[List[float]] = Field(None, description="Filter cutoff frequency/frequencies")
+    channel_mode: str = Field("mix", pattern="^(mix|per_channel|mid_side|cross)$",
+                              description="mix: mono downmix; per_channel, mid_side (2 channels) or cross: one spectrum per output channel")
+    channels: Optional[List[int]] = Field(None, description="Channel indices of a multi-channel signal to use (default all)")
+    precision: Optional[str] = Field(None, pattern="^(single|double)$",
+                                     description="Arithmetic precision: single (float32) or double (float64); default DSP_PRECISION")
+
+class SpectrogramRequest(BaseModel):
+    signal_data: Optional[List[float]] = Field(None, description="Signal amplitude values (or use signal_id)")
+    signal_id: Optional[str] = Field(None, description="ID of an uploaded signal to analyse instead of signal_data")
+    start_sample: Optional[int] = Field(None, ge=0, description="First sample of the stored signal to use")
+    end_sample: Optional[int] = Field(None, ge=0, description="End (exclusive) sample of the stored signal to use")
+    sampling_rate: int = Field(44100, description="Sampling rate in Hz")
+    window_size: int = Field(2048, ge=256, le=8192, description="Frame length in samples")
+    hop_size: Optional[int] = Field(None, ge=1, description="Hop between frames (default window_size // 4)")
+    window_type: str = Field("hann", description="Window function type")
+    scale: str = Field("magnitude", description="Output scale: magnitude or db")
+    precision: Optional[str] = Field(None, pattern="^(single|double)$",
+                                     description="Arithmetic precision: single (float32) or double (float64); default DSP_PRECISION")
+
+class PSDRequest(BaseModel):
+    signal_data: Optional[List[float]] = Field(None, description="Signal amplitude values (or use signal_id)")
+    signal_id: Optional[str] = Field(None, description="ID of an uploaded signal to analyse instead of signal_data")
+    start_sample: Optional[int] = Field(None, ge=0, description="First sample of the stored signal to use")
+    end_sample: Optional[int] = Field(None, ge=0, description="End (exclusive) sample of the stored signal to use")
+    sampling_rate: int = Field(44100, description="Sampling rate in Hz")
+    window_size: int = Field(2048, ge=16, le=65536, description="Segment length in samples")
+    overlap: Optional[int] = Field(None, ge=0, description="Samples shared by consecutive segments (default window_size // 2)")
+    window_type: str = Field("hann", description="Window function type")
+    detrend: bool = Field(True, description="Subtract each segment's mean before windowing")
+    scale: str = Field("density", description="Output scale: density (power/Hz) or db (10*log10 of it)")
+    precision: Optional[str] = Field(None, pattern="^(single|double)$",
+                                     description="Arithmetic precision: single (float32) or double (float64); default DSP_PRECISION")
+
+class BandRequest(BaseModel):
+    signal_data: Optional[List[float]] = Field(None, description="Signal amplitude values (or use signal_id)")
+    signal_id: Optional[str] = Field(None, description="ID of an uploaded signal to analyse instead of signal_data")
+    start_sample: Optional[int] = Field(None, ge=0, description="First sample of the stored signal to use")
+    end_sample: Optional[int] = Field(None, ge=0, description="End (exclusive) sample of the stored signal to use")
+    sampling_rate: int = Field(44100, description="Sampling rate in Hz")
+    window_type: str = Field("hann", description="Window function type, applied over the whole selected range")
+    f_lo: Optional[float] = Field(None, ge=0, description="Lower edge of the zoom band in Hz")
+    f_hi: Optional[float] = Field(None, ge=0, description="Upper edge of the zoom band in Hz")
+    num_bins: int = Field(512, ge=1, le=MAX_BAND_BINS, description="Bins spread evenly over [f_lo, f_hi], both ends included")
+    frequencies: Optional[List[float]] = Field(None, min_length=1, max_length=256,
+                                               description="Evaluate just these frequencies (Goertzel) instead of a band")
+    precision: Optional[str] = Field(None, pattern="^(single|double)$",
+                                     description="Arithmetic precision: single (float32) or double (float64); default DSP_PRECISION")
 
 class SignalResponse(BaseModel):
     signal_id: str
@@ -56,6 +172,7 @@ class SignalResponse(BaseModel):
     duration: float
     num_samples: int
     filename: Optional[str]
+    channels: int = Field(1, description="Channels stored; time_domain is their mono mix")
 
 class FFTResponse(BaseModel):
     analysis_id: str
@@ -65,13 +182,37 @@ class FFTResponse(BaseModel):
     window_size: int
     sampling_rate: int
 
+class ChannelSpectrum(BaseModel):
+    label: str
+    magnitudes: List[float]
+    phases: List[float]
+
+class MultiChannelFFTResponse(BaseModel):
+    analysis_id: str
+    frequencies: List[float]
+    channel_mode: str
+    channels: List[ChannelSpectrum]
+    window_size: int
+    sampling_rate: int
+
 class AnalysisMetadata(BaseModel):
     id: str
     timestamp: str
     filename: Optional[str]
+    signal_id: Optional[str] = None
     sampling_rate: int
     duration: float
+    num_samples: int
     window_size: int
+    window_type: Optional[str] = None
+    filter_type: Optional[str] = None
+    filter_cutoff: Optional[List[float]] = None
+    content_hash: Optional[str] = None
+    channel_labels: Optional[List[str]] = None
+
+class HistoryPage(BaseModel):
+    items: List[AnalysisMetadata]
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to get the next page; null on the last page")
 
 class ImageUploadResponse(BaseModel):
     image_id: str
@@ -84,133 +225,402 @@ class ImageCompressRequest(BaseModel):
     quality: int = Field(75, ge=1, le=95)
     subsampling: int = Field(2, ge=0, le=2)
 
+class ImageFFTCompressRequest(BaseModel):
+    image_id: str
+    keep_ratio: Optional[float] = Field(None, gt=0, le=1, description="Fraction of largest coefficients to keep")
+    cutoff: Optional[float] = Field(None, gt=0, le=1.5, description="Radial cutoff as a fraction of Nyquist")
+    tile_size: Optional[int] = Field(None, ge=0, description="Tile edge in pixels (0 = whole image, default auto)")
+
+class ImageSweepRequest(BaseModel):
+    image_id: str
+    qualities: List[int] = Field([20, 40, 60, 75, 85, 95], min_length=1, max_length=32, description="JPEG qualities (1-95)")
+    subsamplings: List[int] = Field([0, 2], min_length=1, max_length=3, description="Chroma subsampling: 0=4:4:4, 1=4:2:2, 2=4:2:0")
+
 class ImageRegisterRequest(BaseModel):
     ref_image_id: str
     mov_image_id: str
     max_features: int = 800
     good_match_percent: float = Field(0.15, ge=0.02, le=0.9)
 
-analysis_history: List[Dict[str, Any]] = []
-stored_analyses: Dict[str, Dict[str, Any]] = {}
+class ImageBatchRegisterRequest(BaseModel):
+    ref_image_id: str
+    mov_image_ids: List[str] = Field(..., min_length=1, max_length=512)
+    method: str = Field("orb", pattern="^(orb|phase)$", description="orb (homography) or phase (translation only, FFT)")
+    max_features: int = Field(800, ge=10, le=20000)
+    good_match_percent: float = Field(0.15, ge=0.02, le=0.9)
+
+analysis_store = AnalysisStore(ANALYSIS_DIR)
+analysis_store.import_legacy_json(ANALYSIS_DIR)
 stored_images: Dict[str, Dict[str, Any]] = {}
-compressed_cache: Dict[str, Dict[str, Any]] = {}
-
-def _save_wav_int16(path: str, samples: np.ndarray, fs: int):
-    import wave
-    max_abs = float(np.max(np.abs(samples))) if samples.size else 0.0
-    sig = samples.copy().astype(np.float64)
-    if max_abs > 1e-12:
-        sig = sig / max_abs
-    sig_i16 = np.clip(sig * 32767.0, -32768, 32767).astype(np.int16)
-    with wave.open(path, 'wb') as wf:
-        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(fs)
-        wf.writeframes(sig_i16.tobytes())
-
-def _read_wav_any(file_bytes: bytes):
-    import wave
-    with io.BytesIO(file_bytes) as bio:
-        with wave.open(bio, 'rb') as wf:
-            n_channels = wf.getnchannels()
-            sampwidth = wf.getsampwidth()
-            fr = wf.getframerate()
-            n_frames = wf.getnframes()
-            if sampwidth != 2:
-                raise HTTPException(status_code=400, detail="Only 16-bit PCM WAV is supported")
-            pcm = wf.readframes(n_frames)
-    data = np.frombuffer(pcm, dtype=np.int16)
-    if n_channels == 2:
-        data = data.reshape(-1, 2).mean(axis=1).astype(np.int16)
-    x = (data.astype(np.float32) / 32768.0).astype(np.float64)
-    return fr, x
+compressed_cache = CompressedCache(COMPRESSED_CACHE_MAX_BYTES)
+signal_store = SignalStore(AUDIO_DIR, max_bytes=SIGNAL_STORE_MAX_BYTES)
+fft_cache = ResultCache(FFT_CACHE_DIR, max_bytes=FFT_CACHE_MAX_BYTES, max_disk_bytes=FFT_CACHE_DISK_BYTES)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": "1"})
+
+async def _offload(fn, *args):
+    '''Run a workers.* function on the DSP executor, mapping TaskError to HTTPException.
+    With metrics on, the spans it records in the worker join the current request.'''
+    try:
+        if not metrics.ENABLED:
+            return await dsp_executor.run(fn, *args)
+        result, spans = await dsp_executor.run(metrics.collect_spans, fn, *args)
+        metrics.add_spans(spans)
+        return result
+    except TaskError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def _submit_job(kind: str, coro) -> JSONResponse:
+    job = job_manager.submit(kind, coro)
+    return JSONResponse({**job.describe(), "status_url": f"/api/jobs/{job.id}",
+                         "result_url": f"/api/jobs/{job.id}/result"}, status_code=202)
+
+# Query-string fields that are lists in the request models (binary requests only).
+_LIST_QUERY_FIELDS = {"filter_cutoff", "frequencies"}
+
+async def _parse_request(http_request: Request, model):
+    '''(params, samples) for a JSON or binary (octet-stream / x-npy) request body.
+
+    JSON bodies validate as `model`; binary bodies carry only the samples, which are
+    decoded without per-element validation, and the other fields come from the query.'''
+    media = wire.binary_media(http_request.headers.get("content-type"))
+    with span("receive"):
+        body = await http_request.body()
+    try:
+        with span("parse"):
+            if media is None:
+                return model.model_validate_json(body or b"{}"), None
+            query = http_request.query_params
+            params = {k: query.getlist(k) if k in _LIST_QUERY_FIELDS else query[k] for k in query.keys()}
+            return model.model_validate(params), wire.decode_samples(body, media)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid binary payload: {e}")
+
+def _body_docs(model) -> Dict[str, Any]:
+    # request bodies are parsed by hand (see _parse_request), so describe them for /docs
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": model.model_json_schema()},
+        wire.MEDIA_OCTET: binary, wire.MEDIA_NPY: binary}}}
+
+def _binary_response(media: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any], npy_array: np.ndarray) -> Response:
+    body, headers = wire.encode(media, arrays, meta, npy_array)
+    return Response(content=body, media_type=media, headers=headers)
+
+def _precision(request) -> str:
+    return request.precision or DSP_PRECISION
+
+def _stored_rate(request, entry) -> int:
+    return request.sampling_rate if "sampling_rate" in request.model_fields_set else entry.sampling_rate
+
+def _resolve_signal(request, samples: Optional[np.ndarray] = None, dtype: Optional[type] = np.float64,
+                    keep_channels: bool = False) -> tuple:
+    '''Signal samples and sampling rate for an FFT/spectrogram request, taken from a
+    binary body, signal_data or, by reference, from the signal store, as dtype. Stored
+    signals are float32, so dtype=np.float32 or None returns their (memory-mapped)
+    slice instead of a copy; None leaves other inputs as they are. Multi-channel signals are mixed down to mono
+    unless keep_channels, which returns them (channels, samples), narrowed to
+    request.channels if given.'''
+    if samples is not None:
+        data, fs = samples, float(request.sampling_rate)
+    elif request.signal_id is None:
+        if request.signal_data is None:
+            raise HTTPException(status_code=422, detail="Provide signal_data or signal_id")
+        try:
+            data, fs = np.asarray(request.signal_data, dtype=np.float64), float(request.sampling_rate)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Channels of signal_data must have equal lengths")
+    else:
+        entry = signal_store.get(request.signal_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Signal not found: {request.signal_id}")
+        data = entry.data[..., request.start_sample:request.end_sample]
+        fs = _stored_rate(request, entry)
+    if data.shape[-1] == 0:
+        raise HTTPException(status_code=400, detail="Selected sample range is empty")
+    channels = getattr(request, "channels", None)
+    if data.ndim == 2 and channels:
+        if any(not 0 <= c < data.shape[0] for c in channels):
+            raise HTTPException(status_code=400, detail=f"Channel index out of range (signal has {data.shape[0]})")
+        data = data[channels]
+    if keep_channels:
+        data = data.reshape(-1, data.shape[-1])
+    elif data.ndim == 2:
+        data = data.mean(axis=0, dtype=dtype or np.float32)
+    return (data if dtype is None else np.asarray(data, dtype=dtype)), float(fs)
 
 @app.get("/")
 def read_root():
     return { "message": "FFT Signal & Image Analyzer API", "version": APP_VERSION, "docs": "/docs" }
 
 @app.post("/api/upload", response_model=SignalResponse)
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), accept: Optional[str] = Header(None), as_job: bool = False):
+    filename = file.filename or "upload"
+    with span("receive"):
+        spool_path, digest = await _spool_upload(file, filename)
+    if as_job:
+        try:
+            return _submit_job("upload", _ingest_upload(spool_path, digest, filename, accept))
+        except QueueFullError:
+            os.remove(spool_path)  # the job never started, so its cleanup never runs
+            raise
+    return await _ingest_upload(spool_path, digest, filename, accept)
+
+async def _spool_upload(file: UploadFile, filename: str) -> tuple:
+    '''Copy an upload to a temporary file chunk by chunk, hashing it on the way, so
+    the body is never held in memory and workers (even in other processes) can
+    decode it from a path. The digest covers the extension too: identical bytes
+    with the same extension decode to the same signal.'''
+    # the salt also versions the decoding: signals stored as a mono mix must not be
+    # reused for uploads that are now kept multi-channel
+    h = hashlib.blake2b(os.path.splitext(filename)[1].lower().encode("utf-8") + b"\0ch", digest_size=20)
+    path = os.path.join(UPLOAD_TMP_DIR, f"{uuid.uuid4().hex}.part")
     try:
-        contents = await file.read()
-        signal_id = str(uuid.uuid4())
-        filename = file.filename or "upload"
-        if filename.lower().endswith('.wav'):
-            sampling_rate, data = _read_wav_any(contents)
-        elif filename.lower().endswith('.csv'):
-            arr = np.loadtxt(io.BytesIO(contents), delimiter=',')
-            if arr.ndim == 2 and arr.shape[1] == 2:
-                data = arr[:, 1].astype(np.float64)
-                dt = float(np.mean(np.diff(arr[:, 0])))
-                sampling_rate = int(1.0 / dt) if dt > 0 else 44100
-            else:
-                data = arr.astype(np.float64); sampling_rate = 44100
+        with open(path, "wb") as out:
+            while chunk := await file.read(ingest.CHUNK_BYTES):
+                h.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:  # client gone, disk full, or the request was cancelled
+        os.remove(path)
+        raise
+    return path, h.hexdigest()
+
+async def _ingest_upload(spool_path: str, digest: str, filename: str, accept: Optional[str]):
+    try:
+        existing = signal_store.find_digest(digest)
+        if existing is not None:
+            signal_id, sampling_rate, data = existing.signal_id, existing.sampling_rate, existing.data
+            filename = existing.filename or filename
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format (use .wav 16-bit or .csv)")
-        duration = len(data) / float(sampling_rate)
-        stored_analyses[signal_id] = {
-            "data": data.tolist(), "sampling_rate": sampling_rate, "filename": filename,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-        wav_path = os.path.join(AUDIO_DIR, f"{signal_id}.wav")
-        _save_wav_int16(wav_path, data, sampling_rate)
-        return SignalResponse(signal_id=signal_id, time_domain=data.tolist(), sampling_rate=int(sampling_rate),
-                              duration=float(duration), num_samples=int(len(data)), filename=filename)
-    except HTTPException:
+            signal_id = str(uuid.uuid4())
+            sampling_rate, data = await _offload(workers.decode_upload, spool_path, filename, False)
+            with span("store"):
+                await run_in_threadpool(signal_store.put, signal_id, data, sampling_rate, filename,
+                                        datetime.utcnow().isoformat(), digest)
+                wav_path = os.path.join(AUDIO_DIR, f"{signal_id}.wav")
+                await run_in_threadpool(save_wav_int16, wav_path, data, sampling_rate)
+        channels = 1 if data.ndim == 1 else int(data.shape[0])
+        mix = data if data.ndim == 1 else data.mean(axis=0, dtype=np.float32)
+        duration = mix.shape[-1] / float(sampling_rate)
+        media = wire.negotiate(accept)
+        if media:
+            meta = {"signal_id": signal_id, "sampling_rate": int(sampling_rate), "duration": float(duration),
+                    "num_samples": int(len(mix)), "filename": filename, "channels": channels}
+            return _binary_response(media, {"time_domain": mix}, meta, mix)
+        return SignalResponse(signal_id=signal_id, time_domain=mix.tolist(), sampling_rate=int(sampling_rate),
+                              duration=float(duration), num_samples=int(len(mix)), filename=filename, channels=channels)
+    except (HTTPException, QueueFullError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    finally:
+        os.remove(spool_path)
+
+@app.post("/api/fft", response_model=Union[FFTResponse, MultiChannelFFTResponse], openapi_extra=_body_docs(FFTRequest))
+async def compute_fft(http_request: Request, as_job: bool = False):
+    request, samples = await _parse_request(http_request, FFTRequest)
+    accept = http_request.headers.get("accept")
+    if as_job:
+        return _submit_job("fft", _run_fft(request, samples, accept))
+    return await _run_fft(request, samples, accept)
+
+def _fft_params(request: FFTRequest, fs: float, precision: str) -> Dict[str, Any]:
+    params = {"sampling_rate": int(fs), "window_size": request.window_size, "window_type": request.window_type,
+              "filter_type": request.filter_type, "filter_cutoff": request.filter_cutoff}
+    if request.channel_mode != "mix":
+        params["channel_mode"] = request.channel_mode
+    if precision != "double":
+        params["precision"] = precision
+    return params
 
-@app.post("/api/fft", response_model=FFTResponse)
-async def compute_fft(request: FFTRequest):
+async def _run_fft(request: FFTRequest, samples: Optional[np.ndarray], accept: Optional[str]):
+    multi = request.channel_mode != "mix"
+    precision = _precision(request)
+    entry = signal_store.get(request.signal_id) if samples is None and request.signal_id is not None else None
+    if entry is not None:
+        # stored signals never change, so they are keyed by reference and a hit reads no samples
+        fs = _stored_rate(request, entry)
+        key = stored_signal_key(entry.digest or f"id:{entry.signal_id}", {
+            **_fft_params(request, fs, precision), "start_sample": request.start_sample,
+            "end_sample": request.end_sample, "channels": request.channels})
+        cached = fft_cache.get(key)
+        if cached is not None:
+            rows = len(np.reshape(cached.magnitudes, (-1, len(cached.frequencies))))
+            channels = {"cross": (rows + 1) // 2, "mid_side": 2}.get(request.channel_mode, rows)
+            labels = workers.channel_labels(request.channel_mode, channels) if multi else None
+            return _fft_response(accept, cached.analysis_id, cached.frequencies, cached.magnitudes,
+                                 cached.phases, request.window_size, int(fs), labels, request.channel_mode)
+    with span("resolve"):
+        signal_data, fs = _resolve_signal(request, samples, PRECISIONS[precision][0], keep_channels=multi)
+    if multi and request.channel_mode != "per_channel" and signal_data.shape[0] < 2:
+        raise HTTPException(status_code=400, detail=f"channel_mode {request.channel_mode} needs at least two channels")
+    if request.channel_mode == "mid_side" and signal_data.shape[0] != 2:
+        raise HTTPException(status_code=400, detail="mid_side needs exactly two channels (select them with channels)")
     try:
-        signal_data = np.array(request.signal_data, dtype=np.float64)
-        fs = float(request.sampling_rate)
-        Nw = int(request.window_size)
-        if request.filter_type and request.filter_cutoff:
-            if request.filter_type == "lowpass":
-                h = design_lowpass_fir(request.filter_cutoff[0], fs, numtaps=201)
-            elif request.filter_type == "highpass":
-                h = design_highpass_fir(request.filter_cutoff[0], fs, numtaps=201)
-            elif request.filter_type == "bandpass" and len(request.filter_cutoff) == 2:
-                h = design_bandpass_fir(float(request.filter_cutoff[0]), float(request.filter_cutoff[1]), fs, numtaps=401)
-            else:
-                h = None
-            if h is not None:
-                signal_data = apply_fir(signal_data, h)
-        w = get_window(request.window_type, Nw)
-        if len(signal_data) < Nw:
-            pad = np.zeros(Nw, dtype=np.float64)
-            pad[: len(signal_data)] = signal_data
-            seg = pad * w
+        if entry is None:
+            with span("cache"):
+                key = await _offload(fft_cache_key, signal_data, _fft_params(request, fs, precision))
+                cached = fft_cache.get(key)
+        labels = workers.channel_labels(request.channel_mode, signal_data.shape[0]) if multi else None
+        if cached is not None:
+            return _fft_response(accept, cached.analysis_id, cached.frequencies, cached.magnitudes,
+                                 cached.phases, request.window_size, int(fs), labels, request.channel_mode)
+        if multi:
+            freqs, labels, magnitudes, phases, signal_data = await _offload(
+                workers.fft_channels, signal_data, fs, request.window_size, request.window_type,
+                request.filter_type, request.filter_cutoff, request.channel_mode)
         else:
-            seg = signal_data[:Nw] * w
-        X_pos = rfft_real(seg.tolist())
-        magnitudes = [abs(z) for z in X_pos]
-        phases = [complex_angle(z) for z in X_pos]
-        freqs = rfftfreq(len(seg), 1.0/fs)
-        analysis_id = str(uuid.uuid4())
-        analysis_metadata = {
-            "id": analysis_id, "timestamp": datetime.utcnow().isoformat(),
-            "sampling_rate": request.sampling_rate, "window_size": request.window_size,
-            "frequencies": list(map(float, freqs)),
-            "magnitudes": list(map(float, magnitudes)),
-            "phases": list(map(float, phases)),
-            "processed_signal": signal_data.tolist(),
-            "filter_type": request.filter_type, "filter_cutoff": request.filter_cutoff
-        }
-        stored_analyses[analysis_id] = analysis_metadata
-        analysis_history.append({
-            "id": analysis_id, "timestamp": analysis_metadata["timestamp"],
-            "sampling_rate": request.sampling_rate, "window_size": request.window_size
-        })
-        os.makedirs(ANALYSIS_DIR, exist_ok=True)
-        with open(os.path.join(ANALYSIS_DIR, f"{analysis_id}.json"), "w", encoding="utf-8") as f:
-            import json; json.dump(analysis_metadata, f, ensure_ascii=False, indent=2)
-        return FFTResponse(analysis_id=analysis_id, frequencies=analysis_metadata["frequencies"],
-                           magnitudes=analysis_metadata["magnitudes"], phases=analysis_metadata["phases"],
-                           window_size=request.window_size, sampling_rate=request.sampling_rate)
+            freqs, magnitudes, phases, signal_data = await _offload(
+                workers.fft_pipeline, signal_data, fs, request.window_size, request.window_type,
+                request.filter_type, request.filter_cutoff)
+        n = int(signal_data.shape[-1])
+        record = AnalysisRecord(
+            id=str(uuid.uuid4()), timestamp=datetime.utcnow().isoformat(), filename=entry.filename if entry else None,
+            signal_id=request.signal_id, sampling_rate=int(fs), window_size=request.window_size,
+            window_type=request.window_type, filter_type=request.filter_type, filter_cutoff=request.filter_cutoff,
+            num_samples=n, duration=n / float(fs), content_hash=key, channel_labels=labels)
+        analysis_id = record.id
+        with span("persist"):
+            await run_in_threadpool(analysis_store.save, record, freqs, magnitudes, phases, signal_data)
+            await run_in_threadpool(fft_cache.put, key, CachedSpectrum(analysis_id, freqs, magnitudes, phases))
+        return _fft_response(accept, analysis_id, freqs, magnitudes, phases, request.window_size, int(fs),
+                             labels, request.channel_mode)
+    except (HTTPException, QueueFullError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"FFT computation error: {str(e)}")
 
+def _fft_response(accept: Optional[str], analysis_id: str, freqs: np.ndarray, magnitudes: np.ndarray,
+                  phases: np.ndarray, window_size: int, fs: int, labels: Optional[List[str]] = None,
+                  channel_mode: str = "mix"):
+    with span("encode"):
+        media = wire.negotiate(accept)
+        if media:
+            meta = {"analysis_id": analysis_id, "window_size": window_size, "sampling_rate": fs}
+            if labels is not None:
+                meta.update(channel_mode=channel_mode, channels=labels)
+            arrays = {"frequencies": freqs, "magnitudes": magnitudes, "phases": phases}
+            npy = np.concatenate([freqs[None], np.reshape(magnitudes, (-1, len(freqs))), np.reshape(phases, (-1, len(freqs)))])
+            return _binary_response(media, arrays, meta, npy)
+        if labels is not None:
+            spectra = [ChannelSpectrum(label=l, magnitudes=m.tolist(), phases=p.tolist())
+                       for l, m, p in zip(labels, magnitudes, phases)]
+            return JSONResponse(MultiChannelFFTResponse(
+                analysis_id=analysis_id, frequencies=freqs.tolist(), channel_mode=channel_mode, channels=spectra,
+                window_size=window_size, sampling_rate=fs).model_dump())
+        return FFTResponse(analysis_id=analysis_id, frequencies=freqs.tolist(), magnitudes=magnitudes.tolist(),
+                           phases=phases.tolist(), window_size=window_size, sampling_rate=fs)
+
+@app.post("/api/fft/band", openapi_extra=_body_docs(BandRequest))
+async def compute_band(http_request: Request, as_job: bool = False):
+    request, samples = await _parse_request(http_request, BandRequest)
+    if request.frequencies is None and (request.f_lo is None or request.f_hi is None):
+        raise HTTPException(status_code=400, detail="Provide f_lo and f_hi, or frequencies")
+    accept = http_request.headers.get("accept")
+    if as_job:
+        return _submit_job("band", _run_band(request, samples, accept))
+    return await _run_band(request, samples, accept)
+
+async def _run_band(request: BandRequest, samples: Optional[np.ndarray], accept: Optional[str]):
+    signal_data, fs = _resolve_signal(request, samples, PRECISIONS[_precision(request)][0])
+    try:
+        freqs, magnitudes, phases = await _offload(workers.band_spectrum, signal_data, fs, request.window_type,
+                                                   request.f_lo, request.f_hi, request.num_bins, request.frequencies)
+        n = int(signal_data.shape[-1])
+        meta = {"method": "goertzel" if request.frequencies is not None else "czt", "num_samples": n,
+                "sampling_rate": int(fs), "resolution_hz": fs / n}
+        media = wire.negotiate(accept)
+        if media:
+            return _binary_response(media, {"frequencies": freqs, "magnitudes": magnitudes, "phases": phases},
+                                    meta, np.stack([freqs, magnitudes, phases]))
+        return JSONResponse({"frequencies": freqs.tolist(), "magnitudes": magnitudes.tolist(),
+                             "phases": phases.tolist(), **meta})
+    except (HTTPException, QueueFullError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Band analysis error: {str(e)}")
+
+@app.post("/api/spectrogram", openapi_extra=_body_docs(SpectrogramRequest))
+async def compute_spectrogram(http_request: Request, as_job: bool = False):
+    request, samples = await _parse_request(http_request, SpectrogramRequest)
+    if request.scale not in ("magnitude", "db"):
+        raise HTTPException(status_code=400, detail="scale must be 'magnitude' or 'db'")
+    accept = http_request.headers.get("accept")
+    if as_job:
+        return _submit_job("spectrogram", _run_spectrogram(request, samples, accept))
+    return await _run_spectrogram(request, samples, accept)
+
+async def _run_spectrogram(request: SpectrogramRequest, samples: Optional[np.ndarray], accept: Optional[str]):
+    precision = _precision(request)
+    signal_data, fs = _resolve_signal(request, samples, PRECISIONS[precision][0])
+    try:
+        hop = int(request.hop_size or request.window_size // 4)
+        with span("stft"):
+            freqs, times, S = await _offload(stft_magnitude, signal_data, fs, request.window_size,
+                                             hop, request.window_type, request.scale == "db", precision)
+        media = wire.negotiate(accept)
+        if media:
+            meta = {"num_frames": int(S.shape[0]), "window_size": request.window_size, "hop_size": hop,
+                    "sampling_rate": int(fs), "scale": request.scale}
+            return _binary_response(media, {"frequencies": freqs, "times": times, "magnitudes": S}, meta, S)
+        return JSONResponse({
+            "frequencies": freqs.tolist(), "times": times.tolist(), "magnitudes": S.tolist(),
+            "num_frames": int(S.shape[0]), "window_size": request.window_size, "hop_size": hop,
+            "sampling_rate": int(fs), "scale": request.scale
+        })
+    except (HTTPException, QueueFullError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Spectrogram computation error: {str(e)}")
+
+@app.post("/api/psd", openapi_extra=_body_docs(PSDRequest))
+async def compute_psd(http_request: Request, as_job: bool = False):
+    request, samples = await _parse_request(http_request, PSDRequest)
+    if request.scale not in ("density", "db"):
+        raise HTTPException(status_code=400, detail="scale must be 'density' or 'db'")
+    overlap = request.window_size // 2 if request.overlap is None else request.overlap
+    if overlap >= request.window_size:
+        raise HTTPException(status_code=400, detail="overlap must be smaller than window_size")
+    accept = http_request.headers.get("accept")
+    if as_job:
+        return _submit_job("psd", _run_psd(request, samples, overlap, accept))
+    return await _run_psd(request, samples, overlap, accept)
+
+async def _run_psd(request: PSDRequest, samples: Optional[np.ndarray], overlap: int, accept: Optional[str]):
+    signal_data, fs = _resolve_signal(request, samples, dtype=None)
+    try:
+        nperseg, hop = request.window_size, request.window_size - overlap
+        # one task per worker over contiguous segment runs; partial sums are folded in
+        # as they finish, so only O(window_size) state is held per task
+        tasks = [asyncio.ensure_future(_offload(dsp_psd.welch_partial, signal_data[a:b], nperseg, hop,
+                                                request.window_type, request.detrend, _precision(request)))
+                 for a, b in dsp_psd.segment_ranges(len(signal_data), nperseg, hop, dsp_executor.workers)]
+        acc, count = np.zeros(nperseg//2 + 1), 0
+        try:
+            with span("welch"):
+                for fut in asyncio.as_completed(tasks):
+                    part, n = await fut
+                    acc += part; count += n
+        finally:
+            for t in tasks: t.cancel()
+        freqs, psd = dsp_psd.welch_finish(acc, count, fs, nperseg, request.window_type)
+        if request.scale == "db":
+            psd = 10.0 * np.log10(np.maximum(psd, 1e-20))
+        meta = {"num_segments": count, "window_size": nperseg, "overlap": overlap,
+                "sampling_rate": int(fs), "scale": request.scale}
+        media = wire.negotiate(accept)
+        if media:
+            return _binary_response(media, {"frequencies": freqs, "psd": psd}, meta, np.stack([freqs, psd]))
+        return JSONResponse({"frequencies": freqs.tolist(), "psd": psd.tolist(), **meta})
+    except (HTTPException, QueueFullError):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PSD computation error: {str(e)}")
+
 @app.get("/api/audio/original/{signal_id}")
 async def get_original_audio(signal_id: str):
     wav_path = os.path.join(AUDIO_DIR, f"{signal_id}.wav")
@@ -220,58 +630,116 @@ async def get_original_audio(signal_id: str):
 
 @app.get("/api/audio/processed/{analysis_id}")
 async def get_processed_audio(analysis_id: str):
-    if analysis_id not in stored_analyses:
+    record = analysis_store.get(analysis_id)
+    if record is None:
         raise HTTPException(status_code=404, detail=f"Analysis not found: {analysis_id}")
-    analysis = stored_analyses[analysis_id]
-    if "processed_signal" not in analysis:
+    y = analysis_store.processed_signal(analysis_id)
+    if y is None:
         raise HTTPException(status_code=404, detail="Processed signal not found")
-    fs = int(analysis["sampling_rate"])
-    y = np.array(analysis["processed_signal"], dtype=np.float64)
+    fs = record.sampling_rate
     wav_path = os.path.join(AUDIO_DIR, f"processed_{analysis_id}.wav")
-    _save_wav_int16(wav_path, y, fs)
+    await run_in_threadpool(save_wav_int16, wav_path, y, fs)
     return FileResponse(wav_path, media_type="audio/wav", filename=f"processed_{analysis_id[:8]}.wav")
 
-@app.get("/api/history", response_model=List[AnalysisMetadata])
-def get_history():
-    return analysis_history[-100:]
+@app.get("/api/history", response_model=HistoryPage)
+def get_history(limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None,
+                since: Optional[str] = None, until: Optional[str] = None, filename: Optional[str] = None,
+                signal_id: Optional[str] = None, sampling_rate: Optional[int] = None, window_size: Optional[int] = None,
+                window_type: Optional[str] = None, filter_type: Optional[str] = None):
+    '''Newest-first analyses; since/until are ISO timestamps, filename matches a substring.'''
+    try:
+        records, next_cursor = analysis_store.history(
+            limit, cursor, since, until, filename, signal_id=signal_id, sampling_rate=sampling_rate,
+            window_size=window_size, window_type=window_type, filter_type=filter_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return HistoryPage(items=[AnalysisMetadata(**r.to_dict()) for r in records], next_cursor=next_cursor)
 
 @app.get("/api/download/{analysis_id}")
-async def download_analysis(analysis_id: str, format: str = "csv"):
-    if analysis_id not in stored_analyses:
-        path = os.path.join(ANALYSIS_DIR, f"{analysis_id}.json")
-        if os.path.exists(path):
-            import json
-            with open(path, "r", encoding="utf-8") as f:
-                analysis = json.load(f)
-        else:
-            raise HTTPException(status_code=404, detail="Analysis not found")
-    else:
-        analysis = stored_analyses[analysis_id]
+async def download_analysis(analysis_id: str, format: str = "csv", columns: Optional[str] = None,
+                            fmin: Optional[float] = None, fmax: Optional[float] = None):
+    '''Export a stored spectrum as csv, npy, columnar (FFTB framing, float64) or json.
+    columns picks any of frequency,magnitude,phase; fmin/fmax bound the frequency (Hz).
+    Non-JSON formats are streamed block by block from the memory-mapped arrays.'''
+    record = analysis_store.get(analysis_id)
+    spectrum = analysis_store.spectrum(analysis_id) if record else None
+    if spectrum is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    names = export.spectrum_columns(record.channel_labels)
+    try:
+        cols = export.parse_columns(columns, names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lo, hi = export.select(spectrum, fmin, fmax)
+    if format == "json":
+        plural = {"frequency": "frequencies", "magnitude": "magnitudes", "phase": "phases"}
+        return JSONResponse(content={**record.to_dict(), **{plural.get(c, c): spectrum[names.index(c), lo:hi].tolist() for c in cols}})
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of json, {', '.join(export.FORMATS)}")
     if format == "csv":
-        lines = ["Frequency (Hz),Magnitude,Phase"]
-        for f0, mag, ph in zip(analysis["frequencies"], analysis["magnitudes"], analysis["phases"]):
-            lines.append(f"{f0},{mag},{ph}")
-        csv_content = "\\n".join(lines)
-        filename = f"fft_analysis_{analysis_id}.csv"
-        return Response(content=csv_content, media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
+        body = export.iter_csv(spectrum, cols, lo, hi, names=names)
+    elif format == "npy":
+        body = export.iter_npy(spectrum, cols, lo, hi, names=names)
     else:
-        return JSONResponse(content=analysis)
+        meta = {"analysis_id": analysis_id, "sampling_rate": record.sampling_rate, "window_size": record.window_size}
+        body = export.iter_columnar(spectrum, cols, lo, hi, meta, names=names)
+    ext = {"csv": "csv", "npy": "npy", "columnar": "fftb"}[format]
+    headers = {"Content-Disposition": f"attachment; filename=fft_analysis_{analysis_id}.{ext}", "X-Export-Rows": str(hi - lo)}
+    return StreamingResponse(body, media_type=export.FORMATS[format], headers=headers)
+
+def _lod_response(accept: Optional[str], x_name: str, x: np.ndarray, view, meta: Dict[str, Any]):
+    media = wire.negotiate(accept)
+    meta = {**meta, "bucket_size": int(view.bucket_size), "num_buckets": int(len(x))}
+    if media:
+        rows = np.concatenate([x[None], np.reshape(view.mins, (-1, len(x))), np.reshape(view.maxs, (-1, len(x)))])
+        return _binary_response(media, {x_name: x, "min": view.mins, "max": view.maxs}, meta, rows)
+    return JSONResponse({x_name: x.tolist(), "min": view.mins.tolist(), "max": view.maxs.tolist(), **meta})
+
+@app.get("/api/signal/{signal_id}/lod")
+async def get_signal_lod(signal_id: str, max_points: int = Query(2000, ge=16, le=100000), start: int = Query(0, ge=0),
+                         end: Optional[int] = Query(None, ge=0), accept: Optional[str] = Header(None)):
+    '''Peak-preserving view of samples [start, end) in at most max_points values per
+    channel: per-bucket min and max from the signal's LOD pyramid (raw samples when
+    they fit). Cost depends on max_points, not on the signal length.'''
+    pyramid = await run_in_threadpool(signal_store.pyramid, signal_id)
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail=f"Signal not found: {signal_id}")
+    entry = signal_store.get(signal_id)
+    view = await run_in_threadpool(pyramid.view, start, end, max_points)
+    times = view.positions / float(entry.sampling_rate)
+    meta = {"signal_id": signal_id, "sampling_rate": entry.sampling_rate, "channels": entry.channels,
+            "start": int(min(start, pyramid.n)), "end": int(pyramid.n if end is None else min(end, pyramid.n))}
+    return _lod_response(accept, "times", times, view, meta)
+
+@app.get("/api/analysis/{analysis_id}/lod")
+async def get_spectrum_lod(analysis_id: str, max_points: int = Query(2000, ge=16, le=100000),
+                           fmin: Optional[float] = None, fmax: Optional[float] = None,
+                           accept: Optional[str] = Header(None)):
+    '''Peak-preserving view of the magnitudes between fmin and fmax (Hz) in at most
+    max_points values per spectrum, from the analysis' LOD pyramid.'''
+    record = analysis_store.get(analysis_id)
+    pyramid = await run_in_threadpool(analysis_store.pyramid, analysis_id) if record else None
+    if pyramid is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    spectrum = analysis_store.spectrum(analysis_id)
+    lo, hi = export.select(spectrum, fmin, fmax)
+    view = await run_in_threadpool(pyramid.view, lo, hi, max_points)
+    if record.channel_labels is None:
+        view.mins, view.maxs = view.mins[0], view.maxs[0]
+    meta = {"analysis_id": analysis_id, "sampling_rate": record.sampling_rate, "channels": record.channel_labels}
+    return _lod_response(accept, "frequencies", np.asarray(spectrum[0][view.positions]), view, meta)
 
 @app.post("/api/image/upload")
 async def upload_image(file: UploadFile = File(...)):
     contents = await file.read()
-    try:
-        im = Image.open(io.BytesIO(contents)).convert("RGB")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
     image_id = str(uuid.uuid4())
     orig_path = os.path.join(IMAGE_DIR, f"{image_id}_orig.jpg")
-    im.save(orig_path, format="JPEG", quality=95, subsampling=0)
+    width, height = await _offload(workers.normalize_image, contents, orig_path)
     stored_images[image_id] = {
         "id": image_id, "filename": file.filename or "image", "orig_path": orig_path,
-        "width": im.width, "height": im.height, "timestamp": datetime.utcnow().isoformat()
+        "width": width, "height": height, "timestamp": datetime.utcnow().isoformat()
     }
-    return JSONResponse({"image_id": image_id, "filename": file.filename or "image", "width": im.width, "height": im.height})
+    return JSONResponse({"image_id": image_id, "filename": file.filename or "image", "width": width, "height": height})
 
 @app.get("/api/image/view/{image_id}")
 async def view_image(image_id: str):
@@ -280,42 +748,103 @@ async def view_image(image_id: str):
     return FileResponse(meta["orig_path"], media_type="image/jpeg", filename=os.path.basename(meta["orig_path"]))
 
 @app.post("/api/image/compress")
-async def compress_image(payload: dict):
-    image_id = payload.get("image_id"); quality = int(payload.get("quality", 75)); subsampling = int(payload.get("subsampling", 2))
+async def compress_image(payload: dict, as_job: bool = False):
+    '''JPEG-compress a stored image at one quality, or with "target_bytes" at the
+    highest quality whose output fits (binary search on the server).'''
+    image_id = payload.get("image_id")
+    try:
+        quality = int(payload.get("quality", 75)); subsampling = int(payload.get("subsampling", 2))
+        target_bytes = int(payload["target_bytes"]) if payload.get("target_bytes") is not None else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="quality, subsampling and target_bytes must be integers")
+    if subsampling not in (0, 1, 2) or not 1 <= quality <= 100 or (target_bytes is not None and target_bytes < 1):
+        raise HTTPException(status_code=400, detail="Need 1 <= quality <= 100, subsampling in 0/1/2 and target_bytes >= 1")
     meta = stored_images.get(image_id)
     if not meta: raise HTTPException(status_code=404, detail="Image not found")
-    im = Image.open(meta["orig_path"]).convert("RGB")
-    buf = io.BytesIO()
-    im.save(buf, format="JPEG", quality=quality, subsampling=subsampling, optimize=True)
-    buf.seek(0)
+    if as_job:
+        return _submit_job("image_compress", _run_compress(image_id, meta, quality, subsampling, target_bytes))
+    return await _run_compress(image_id, meta, quality, subsampling, target_bytes)
+
+async def _run_compress(image_id: str, meta: Dict[str, Any], quality: int, subsampling: int, target_bytes: Optional[int] = None):
+    extra: Dict[str, Any] = {}
+    if target_bytes is None:
+        encoded = await _offload(workers.jpeg_compress, meta["orig_path"], quality, subsampling)
+    else:
+        found = await _offload(workers.jpeg_target_size, meta["orig_path"], target_bytes, subsampling)
+        encoded, quality = found.pop("encoded"), found["quality"]
+        extra = {**found, "target_bytes": target_bytes}
     comp_id = f"{image_id}_q{quality}_s{subsampling}"
     comp_path = os.path.join(IMAGE_DIR, f"{comp_id}.jpg")
-    with open(comp_path, "wb") as f: f.write(buf.getvalue())
-    compressed_cache[comp_id] = { "image_id": image_id, "path": comp_path, "size_bytes": os.path.getsize(comp_path), "quality": quality, "subsampling": subsampling }
-    return JSONResponse({ "compressed_id": comp_id, "url": f"/api/image/get/{comp_id}", "size_bytes": compressed_cache[comp_id]["size_bytes"], "width": meta["width"], "height": meta["height"] })
+    await run_in_threadpool(_write_bytes, comp_path, encoded)
+    compressed_cache.put(comp_id, { "image_id": image_id, "path": comp_path, "size_bytes": len(encoded), "quality": quality, "subsampling": subsampling })
+    return JSONResponse({ "compressed_id": comp_id, "url": f"/api/image/get/{comp_id}", "size_bytes": len(encoded), "width": meta["width"], "height": meta["height"],
+                          "quality": quality, "subsampling": subsampling, **extra })
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, "wb") as f: f.write(data)
+
+@app.post("/api/image/compress/sweep")
+async def sweep_image_compression(request: ImageSweepRequest, as_job: bool = False):
+    '''Encode every (quality, subsampling) pair in parallel and report sizes and PSNR
+    without storing anything; pick one and call /api/image/compress with it.'''
+    if any(not 1 <= q <= 95 for q in request.qualities) or any(s not in (0, 1, 2) for s in request.subsamplings):
+        raise HTTPException(status_code=400, detail="qualities must be in 1..95 and subsamplings in 0/1/2")
+    meta = stored_images.get(request.image_id)
+    if not meta: raise HTTPException(status_code=404, detail="Image not found")
+    if as_job:
+        return _submit_job("image_sweep", _run_sweep(request, meta))
+    return await _run_sweep(request, meta)
+
+async def _run_sweep(request: ImageSweepRequest, meta: Dict[str, Any]):
+    results = await _offload(workers.jpeg_sweep, meta["orig_path"], sorted(set(request.qualities)), sorted(set(request.subsamplings)))
+    return JSONResponse({"image_id": request.image_id, "width": meta["width"], "height": meta["height"], "results": results})
+
+@app.post("/api/image/fft-compress")
+async def fft_compress_image(request: ImageFFTCompressRequest, as_job: bool = False):
+    if (request.keep_ratio is None) == (request.cutoff is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of keep_ratio or cutoff")
+    meta = stored_images.get(request.image_id)
+    if not meta: raise HTTPException(status_code=404, detail="Image not found")
+    if as_job:
+        return _submit_job("image_fft_compress", _run_fft_compress(request, meta))
+    return await _run_fft_compress(request, meta)
+
+async def _run_fft_compress(request: ImageFFTCompressRequest, meta: Dict[str, Any]):
+    mode = f"k{request.keep_ratio}" if request.keep_ratio is not None else f"r{request.cutoff}"
+    comp_id = f"{request.image_id}_fft_{mode}_t{request.tile_size if request.tile_size is not None else 'auto'}"
+    comp_path = os.path.join(IMAGE_DIR, f"{comp_id}.png")
+    preview_path = os.path.join(IMAGE_DIR, f"{request.image_id}_spectrum.png")
+    stats = await _offload(workers.fft_compress_image, meta["orig_path"], request.keep_ratio, request.cutoff,
+                           request.tile_size, comp_path, preview_path)
+    size_bytes = os.path.getsize(comp_path)
+    compressed_cache.put(comp_id, { "image_id": request.image_id, "path": comp_path, "size_bytes": size_bytes, **stats })
+    return JSONResponse({ "compressed_id": comp_id, "url": f"/api/image/get/{comp_id}",
+                          "spectrum_url": f"/api/image/spectrum/{request.image_id}",
+                          "size_bytes": size_bytes, "width": meta["width"], "height": meta["height"], **stats })
+
+@app.get("/api/image/spectrum/{image_id}")
+async def get_spectrum_preview(image_id: str):
+    path = os.path.join(IMAGE_DIR, f"{image_id}_spectrum.png")
+    if not os.path.exists(path): raise HTTPException(status_code=404, detail="No spectrum preview for this image")
+    return FileResponse(path, media_type="image/png")
 
 @app.get("/api/image/get/{comp_id}")
 async def get_compressed(comp_id: str):
     meta = compressed_cache.get(comp_id)
     if not meta:
-        path = os.path.join(IMAGE_DIR, f"{comp_id}.jpg")
-        if not os.path.exists(path): raise HTTPException(status_code=404, detail="Compressed image not found")
-        return FileResponse(path, media_type="image/jpeg")
-    return FileResponse(meta["path"], media_type="image/jpeg")
+        for ext, media_type in ((".jpg", "image/jpeg"), (".png", "image/png")):
+            path = os.path.join(IMAGE_DIR, f"{comp_id}{ext}")
+            if os.path.exists(path): return FileResponse(path, media_type=media_type)
+        raise HTTPException(status_code=404, detail="Compressed image not found")
+    return FileResponse(meta["path"], media_type="image/png" if meta["path"].endswith(".png") else "image/jpeg")
 
 @app.post("/api/image/features")
 async def image_features(image_id: str):
     meta = stored_images.get(image_id)
     if not meta: raise HTTPException(status_code=404, detail="Image not found")
     if not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
-    img = cv2.imread(meta["orig_path"], cv2.IMREAD_COLOR)
-    if img is None: raise HTTPException(status_code=400, detail="Failed to open image")
-    orb = cv2.ORB_create(nfeatures=800)
-    kps, des = orb.detectAndCompute(img, None)
-    out = cv2.drawKeypoints(img, kps, None, flags=cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS)
     out_path = os.path.join(IMAGE_DIR, f"{image_id}_features.jpg")
-    cv2.imwrite(out_path, out)
-    pts = [{"x": float(k.pt[0]), "y": float(k.pt[1])} for k in kps]
+    pts = await _offload(workers.detect_features, meta["orig_path"], out_path)
     return JSONResponse({"keypoints": pts, "count": len(pts), "overlay_url": f"/api/image/overlay/{image_id}"})
 
 @app.get("/api/image/overlay/{image_id}")
@@ -325,32 +854,51 @@ async def image_overlay(image_id: str):
     return FileResponse(path, media_type="image/jpeg")
 
 @app.post("/api/image/register")
-async def image_register(payload: dict):
-    if not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
+async def image_register(payload: dict, as_job: bool = False):
+    method = payload.get("method", "orb")
+    if method not in ("orb", "phase"): raise HTTPException(status_code=400, detail="method must be orb or phase")
+    if method == "orb" and not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
     ref_image_id = payload.get("ref_image_id"); mov_image_id = payload.get("mov_image_id")
     max_features = int(payload.get("max_features", 800))
     good_match_percent = float(payload.get("good_match_percent", 0.15))
     m_ref = stored_images.get(ref_image_id); m_mov = stored_images.get(mov_image_id)
     if not m_ref or not m_mov: raise HTTPException(status_code=404, detail="One of the images was not found")
-    img1 = cv2.imread(m_ref["orig_path"], cv2.IMREAD_COLOR)
-    img2 = cv2.imread(m_mov["orig_path"], cv2.IMREAD_COLOR)
-    if img1 is None or img2 is None: raise HTTPException(status_code=400, detail="Failed to open images")
-    orb = cv2.ORB_create(nfeatures=max_features)
-    k1, d1 = orb.detectAndCompute(img1, None); k2, d2 = orb.detectAndCompute(img2, None)
-    if d1 is None or d2 is None: raise HTTPException(status_code=400, detail="Could not compute descriptors")
-    matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-    matches = matcher.match(d1, d2); matches = sorted(matches, key=lambda m: m.distance)
-    num_good = max(4, int(len(matches) * good_match_percent)); matches = matches[:num_good]
-    import numpy as np
-    pts1 = np.float32([k1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-    pts2 = np.float32([k2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
-    H, mask = cv2.findHomography(pts2, pts1, cv2.RANSAC)
-    if H is None: raise HTTPException(status_code=400, detail="Homography estimation failed")
-    h, w = img1.shape[:2]
-    aligned = cv2.warpPerspective(img2, H, (w, h))
     out_id = f"{mov_image_id}_aligned_to_{ref_image_id}"
-    out_path = os.path.join(IMAGE_DIR, f"{out_id}.jpg"); cv2.imwrite(out_path, aligned)
-    return JSONResponse({"registered_id": out_id, "url": f"/api/image/aligned/{out_id}"})
+    out_path = os.path.join(IMAGE_DIR, f"{out_id}.jpg")
+    args = (m_ref["orig_path"], m_mov["orig_path"], max_features, good_match_percent, out_path, method)
+    if as_job:
+        return _submit_job("image_register", _run_register(out_id, args))
+    return await _run_register(out_id, args)
+
+async def _run_register(out_id: str, args: tuple):
+    info = await _offload(workers.register_images, *args)
+    return JSONResponse({"registered_id": out_id, "url": f"/api/image/aligned/{out_id}", **info})
+
+@app.post("/api/image/register/batch")
+async def image_register_batch(request: ImageBatchRegisterRequest, as_job: bool = False):
+    '''Register many moving images onto one reference in a single task; the reference
+    is described once and per-image failures are returned inline.'''
+    if request.method == "orb" and not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
+    m_ref = stored_images.get(request.ref_image_id)
+    missing = [i for i in request.mov_image_ids if i not in stored_images]
+    if not m_ref or missing: raise HTTPException(status_code=404, detail=f"Images not found: {missing or [request.ref_image_id]}")
+    if as_job:
+        return _submit_job("image_register_batch", _run_register_batch(request, m_ref))
+    return await _run_register_batch(request, m_ref)
+
+async def _run_register_batch(request: ImageBatchRegisterRequest, m_ref: Dict[str, Any]):
+    out_ids = [f"{mov_id}_aligned_to_{request.ref_image_id}" for mov_id in request.mov_image_ids]
+    results = await _offload(workers.register_batch, m_ref["orig_path"],
+                             [stored_images[i]["orig_path"] for i in request.mov_image_ids],
+                             [os.path.join(IMAGE_DIR, f"{o}.jpg") for o in out_ids],
+                             request.max_features, request.good_match_percent, request.method)
+    items = []
+    for mov_id, out_id, info in zip(request.mov_image_ids, out_ids, results):
+        item = {"mov_image_id": mov_id, **info}
+        if "error" not in info:
+            item.update(registered_id=out_id, url=f"/api/image/aligned/{out_id}")
+        items.append(item)
+    return JSONResponse({"ref_image_id": request.ref_image_id, "method": request.method, "results": items})
 
 @app.get("/api/image/aligned/{out_id}")
 async def get_aligned(out_id: str):
@@ -358,35 +906,40 @@ async def get_aligned(out_id: str):
     if not os.path.exists(path): raise HTTPException(status_code=404, detail="Aligned image not found")
     return FileResponse(path, media_type="image/jpeg")
 
-
-@app.post("/api/video/mjpeg")
-async def video_mjpeg(payload: dict):
-
-    try:
-        import cv2, numpy as np, os, uuid
-    except Exception:
-        raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
-    image_ids = payload.get("image_ids") or []
-    fps = float(payload.get("fps", 10))
+def _video_frames(image_ids: List[str]) -> List[tuple]:
     if len(image_ids) < 2: raise HTTPException(status_code=400, detail="Provide at least two images")
     frames = []
     for iid in image_ids:
         meta = stored_images.get(iid)
         if not meta: raise HTTPException(status_code=404, detail=f"Image not found: {iid}")
-        img = cv2.imread(meta["orig_path"], cv2.IMREAD_COLOR)
-        if img is None: raise HTTPException(status_code=400, detail=f"Could not read image: {iid}")
-        frames.append(img)
-    h, w = frames[0].shape[:2]
+        frames.append((iid, meta["orig_path"]))
+    return frames
+
+@app.post("/api/video/mjpeg")
+async def video_mjpeg(payload: dict, as_job: bool = False):
+    if not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
+    fps = float(payload.get("fps", 10))
+    if fps <= 0: raise HTTPException(status_code=400, detail="fps must be positive")
+    frames = _video_frames(payload.get("image_ids") or [])
+    if as_job:
+        return _submit_job("video_mjpeg", _run_mjpeg(frames, fps))
+    return await _run_mjpeg(frames, fps)
+
+async def _run_mjpeg(frames: List[tuple], fps: float):
     out_id = f"vid_{uuid.uuid4().hex[:8]}"
     out_path = os.path.join(IMAGE_DIR, f"{out_id}.avi")
-    fourcc = cv2.VideoWriter_fourcc(*"MJPG")
-    vw = cv2.VideoWriter(out_path, fourcc, fps, (w, h))
-    for fr in frames:
-        if fr.shape[:2] != (h, w):
-            fr = cv2.resize(fr, (w, h))
-        vw.write(fr)
-    vw.release()
-    return JSONResponse({ "video_id": out_id, "url": f"/api/video/get/{out_id}", "codec": "MJPG", "fps": fps, "ext": ".avi" })
+    count = await _offload(workers.write_mjpeg, frames, fps, out_path)
+    return JSONResponse({ "video_id": out_id, "url": f"/api/video/get/{out_id}", "codec": "MJPG", "fps": fps, "ext": ".avi", "frames": count })
+
+@app.get("/api/video/mjpeg/stream")
+async def video_mjpeg_stream(image_ids: List[str] = Query(...), fps: float = Query(10, gt=0, le=120),
+                             quality: Optional[int] = Query(None, ge=1, le=100), pace: bool = True):
+    '''Play the images as a multipart/x-mixed-replace MJPEG stream (usable as an <img>
+    src); frames are sent as they are decoded, at most fps per second when paced.'''
+    if not OPENCV_AVAILABLE: raise HTTPException(status_code=503, detail="OpenCV is not installed on the server")
+    frames = _video_frames(image_ids)
+    return StreamingResponse(workers.iter_mjpeg_parts(frames, fps, quality, pace),
+                             media_type=f"multipart/x-mixed-replace; boundary={workers.MJPEG_BOUNDARY}")
 
 @app.get("/api/video/get/{vid_id}")
 async def get_video(vid_id: str):
@@ -398,16 +951,116 @@ async def get_video(vid_id: str):
 def get_api_info():
     return {
         "server": "FFT & Image Analyzer API", "version": APP_VERSION,
-        "supported_formats": [".wav (16-bit PCM)", ".csv", ".jpg", ".png"],
+        "supported_formats": [".wav (8/16/24/32-bit PCM, 32/64-bit float)", ".csv", ".jpg", ".png"],
         "max_window_size": 8192, "min_window_size": 256,
         "supported_filters": ["lowpass", "highpass", "bandpass"],
         "window_types": ["hann", "hamming", "blackman", "rectangular"],
-        "opencv_available": OPENCV_AVAILABLE
+        "opencv_available": OPENCV_AVAILABLE,
+        "executor": {"kind": dsp_executor.kind, "workers": dsp_executor.workers, "pending": dsp_executor.pending,
+                     "max_pending": dsp_executor.max_pending},
+        "jobs_active": job_manager.active
     }
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return {"fft": fft_cache.stats(), "signals": signal_store.stats(),
+            "decoded_images": decoded_images.stats(), "image_features": feature_cache.stats(),
+            "compressed_images": compressed_cache.stats()}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    if not metrics.ENABLED: raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    reg = metrics.registry
+    store, cache = signal_store.stats(), fft_cache.stats()
+    reg.set_gauge("fft_signal_store_resident_bytes", store["resident_bytes"], "Bytes of signals held in memory")
+    reg.set_gauge("fft_signal_store_resident_signals", store["resident_signals"], "Signals held in memory")
+    reg.set_gauge("fft_result_cache_resident_bytes", cache["resident_bytes"], "Bytes of cached spectra in memory")
+    reg.set_gauge("fft_result_cache_entries", cache["entries"], "Cached spectra in memory")
+    reg.set_gauge("fft_result_cache_disk_bytes", cache["disk_bytes"], "Bytes of cached spectra on disk")
+    reg.set_gauge("fft_result_cache_disk_evictions", cache["disk_evictions"], "Cached spectrum files deleted to stay within FFT_CACHE_DISK_MB")
+    for kind in ("memory_hits", "disk_hits", "misses", "evictions"):
+        reg.set_gauge("fft_result_cache_lookups", cache[kind], "Result cache lookups by outcome", outcome=kind)
+    reg.set_gauge("fft_upload_dedup", store["dedup_hits"], "Upload dedup lookups by outcome", outcome="hit")
+    reg.set_gauge("fft_upload_dedup", store["dedup_misses"], outcome="miss")
+    reg.set_gauge("fft_executor_pending", dsp_executor.pending, "Tasks submitted to the DSP executor and not finished")
+    reg.set_gauge("fft_jobs_active", job_manager.active, "Background jobs not finished")
+    reg.set_gauge("fft_stored_images", len(stored_images), "Uploaded images tracked in memory")
+    reg.set_gauge("fft_compressed_images", len(compressed_cache), "Compressed variants tracked in memory")
+    reg.set_gauge("fft_stored_analyses", analysis_store.count(), "Analyses in the catalog")
+    return PlainTextResponse(reg.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    return job.describe()
+
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code, detail=job.error)
+    if job.status != "done":
+        return JSONResponse(job.describe(), status_code=202)
+    return job.result
+
 @app.post("/api/mic/record")
-async def handle_microphone_recording(file: UploadFile = File(...)):
-    return await upload_file(file)
+async def handle_microphone_recording(file: UploadFile = File(...), accept: Optional[str] = Header(None)):
+    return await upload_file(file, accept)
+
+STREAM_DTYPES = {"int16": (np.dtype("<i2"), 1.0 / 32768.0), "float32": (np.dtype("<f4"), 1.0)}
+
+def _stream_frames(stream: StreamingSTFT, pcm: bytes, sample_dtype: np.dtype, scale: float) -> List[str]:
+    '''Feed whole PCM samples to the stream; returns the JSON text of each completed frame.'''
+    chunk = np.frombuffer(pcm, dtype=sample_dtype).astype(np.float64) * scale
+    times, S = stream.push(chunk)
+    first = stream.frames_emitted - S.shape[0]
+    return [json.dumps({"type": "frame", "index": first + i, "time": float(times[i]), "magnitudes": S[i].tolist()},
+                       separators=(",", ":")) for i in range(S.shape[0])]
+
+@app.websocket("/api/mic/stream")
+async def stream_microphone(websocket: WebSocket, sampling_rate: int = 44100, window_size: int = 2048,
+                            hop_size: Optional[int] = None, window_type: str = "hann", dtype: str = "int16"):
+    """Live spectrum over a WebSocket.
+
+    The client sends mono little-endian PCM (int16 or float32) as binary messages; the
+    server answers with one JSON message describing the bins, then one JSON frame per
+    completed hop. Sending the text message "stop" ends the stream.
+    """
+    await websocket.accept()
+    if dtype not in STREAM_DTYPES or not 256 <= window_size <= 8192 or sampling_rate <= 0 \
+            or (hop_size is not None and not 1 <= hop_size <= window_size):
+        await websocket.close(code=1008, reason="Invalid stream parameters")
+        return
+    sample_dtype, scale = STREAM_DTYPES[dtype]
+    stream = StreamingSTFT(sampling_rate, window_size, hop_size, window_type)
+    await websocket.send_json({
+        "type": "config", "frequencies": stream.frequencies.tolist(), "sampling_rate": sampling_rate,
+        "window_size": window_size, "hop_size": stream.hop, "window_type": window_type, "dtype": dtype
+    })
+    # the STFT keeps state between messages, so each socket gets its own one-thread executor
+    pipe = DSPExecutor("thread", 1)
+    leftover = b""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                if message["text"].strip().lower() == "stop":
+                    await websocket.close()
+                    break
+                continue
+            raw = leftover + (message.get("bytes") or b"")
+            usable = len(raw) - len(raw) % sample_dtype.itemsize
+            leftover = raw[usable:]
+            for text in await pipe.run(_stream_frames, stream, raw[:usable], sample_dtype, scale):
+                await websocket.send_text(text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pipe.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,153 @@
+# Lightweight request instrumentation: named timing spans per request (reported in a
+# Server-Timing header) plus process-wide counters, gauges and histograms rendered in
+# the Prometheus text format. Set METRICS_ENABLED=0 to turn it all off; span() then
+# returns a shared no-op context manager.
+from __future__ import annotations
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+ENABLED = os.environ.get("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Span = Tuple[str, float]  # (stage name, seconds)
+
+_spans: ContextVar[Optional[List[Span]]] = ContextVar("spans", default=None)
+_NULL = nullcontext()
+
+class _Timer:
+    __slots__ = ("name", "sink", "t0")
+
+    def __init__(self, name: str, sink: List[Span]):
+        self.name = name
+        self.sink = sink
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.sink.append((self.name, time.perf_counter() - self.t0))
+        return False
+
+def span(name: str):
+    '''Context manager timing one stage of the current request (no-op outside a
+    request or when metrics are disabled).'''
+    if not ENABLED:
+        return _NULL
+    sink = _spans.get()
+    return _NULL if sink is None else _Timer(name, sink)
+
+def start_request() -> List[Span]:
+    '''Begin collecting spans for the current context; returns the span list.'''
+    sink: List[Span] = []
+    _spans.set(sink)
+    return sink
+
+def add_spans(spans: Iterable[Span]) -> None:
+    '''Merge spans recorded elsewhere (e.g. in an executor worker) into the current request.'''
+    sink = _spans.get()
+    if sink is not None:
+        sink.extend(spans)
+
+def collect_spans(fn: Callable, *args, **kwargs) -> Tuple[Any, List[Span]]:
+    '''Run fn with a fresh span collector and return (result, spans).
+
+    Executor threads do not inherit the request's context and worker processes
+    cannot share it, so offloaded functions are wrapped in this (module-level, hence
+    picklable) helper and their spans handed back with the result.'''
+    sink = start_request()
+    try:
+        return fn(*args, **kwargs), sink
+    finally:
+        _spans.set(None)
+
+def server_timing(spans: Sequence[Span], total: Optional[float] = None) -> str:
+    '''Server-Timing header value; repeated stage names are summed, in first-seen order.'''
+    merged: Dict[str, float] = {}
+    for name, seconds in spans:
+        merged[name] = merged.get(name, 0.0) + seconds
+    if total is not None:
+        merged["total"] = total
+    return ", ".join(f"{name};dur={seconds * 1e3:.3f}" for name, seconds in merged.items())
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{" + body + "}"
+
+class Registry:
+    '''Counters, gauges and histograms keyed by sorted label tuples.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._gauges: Dict[str, Dict[tuple, float]] = {}
+        self._hist: Dict[str, Tuple[Sequence[float], Dict[tuple, List[float]]]] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+
+    def _declare(self, name: str, kind: str, help_text: str) -> None:
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, help_text: str = "", amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, help_text: str = "", **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._gauges.setdefault(name, {})[key] = float(value)
+
+    def add_gauge(self, name: str, amount: float, help_text: str = "", **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, help_text: str = "",
+                buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            bounds, series = self._hist.setdefault(name, (tuple(buckets), {}))
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0.0] * (len(bounds) + 2)  # per-bucket, +Inf, sum
+            counts[bisect.bisect_left(bounds, value)] += 1
+            counts[-1] += value
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    bounds, series = self._hist[name]
+                    for key, counts in series.items():
+                        cum = 0.0
+                        for le, c in zip(list(bounds) + ["+Inf"], counts[:-1]):
+                            cum += c
+                            lines.append(f"{name}_bucket{_fmt_labels(key + (('le', str(le)),))} {cum:g}")
+                        lines.append(f"{name}_sum{_fmt_labels(key)} {counts[-1]:.6f}")
+                        lines.append(f"{name}_count{_fmt_labels(key)} {cum:g}")
+                else:
+                    series = (self._counters if kind == "counter" else self._gauges)[name]
+                    for key, value in series.items():
+                        lines.append(f"{name}{_fmt_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
@@ -0,0 +1,151 @@
+# Content-addressed cache of FFT results: identical signal bytes + parameters map to
+# one stored spectrum, served from memory or disk instead of being recomputed.
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import numpy as np
+
+def fft_cache_key(signal: np.ndarray, params: Dict[str, Any]) -> str:
+    '''Hash of the samples (as float64, so list and binary inputs agree) plus the
+    analysis parameters; params must be JSON-serialisable.'''
+    h = hashlib.blake2b(digest_size=20)
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    h.update(np.ascontiguousarray(signal, dtype=np.float64).data)
+    return h.hexdigest()
+
+def stored_signal_key(source: str, params: Dict[str, Any]) -> str:
+    '''Key for an analysis of a stored signal, which never changes once written:
+    its upload digest (or signal_id) plus the slice and analysis parameters in
+    params. Costs O(1) whatever the signal length, as no sample is read.'''
+    h = hashlib.blake2b(b"stored\0" + source.encode("utf-8"), digest_size=20)
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+@dataclass
+class CachedSpectrum:
+    analysis_id: str
+    frequencies: np.ndarray
+    magnitudes: np.ndarray
+    phases: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return self.frequencies.nbytes + self.magnitudes.nbytes + self.phases.nbytes
+
+class ResultCache:
+    '''Two-tier spectrum cache keyed by fft_cache_key().
+
+    The memory tier is an LRU bounded by max_bytes; every entry is also written to
+    `<directory>/<key>.npz`, so evicted entries and entries from earlier runs are
+    promoted back from disk on their next hit. The files are an LRU of their own,
+    bounded by max_disk_bytes: the least recently used are deleted once the total
+    exceeds it. Their order is rebuilt from the file mtimes at startup.'''
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.max_disk_bytes = int(max_disk_bytes)
+        self._memory: "OrderedDict[str, CachedSpectrum]" = OrderedDict()
+        self._bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> file size, oldest first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp.npz"):  # left over by a crash mid-write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif name.endswith(".npz"):
+                st = os.stat(path)
+                files.append((st.st_mtime, name[:-len(".npz")], st.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        with self._lock:
+            self._trim_disk()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[CachedSpectrum]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                entry = CachedSpectrum(str(z["analysis_id"]), z["frequencies"], z["magnitudes"], z["phases"])
+            os.utime(path)  # keeps the LRU order across restarts
+        except FileNotFoundError:  # never written, or deleted by a disk eviction
+            with self._lock:
+                self._counters["misses"] += 1
+            return None
+        with self._lock:
+            self._counters["disk_hits"] += 1
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key: str, entry: CachedSpectrum) -> None:
+        tmp = self._path(key) + ".tmp.npz"
+        np.savez(tmp, analysis_id=np.array(entry.analysis_id), frequencies=entry.frequencies,
+                 magnitudes=entry.magnitudes, phases=entry.phases)
+        os.replace(tmp, self._path(key))
+        size = os.path.getsize(self._path(key))
+        with self._lock:
+            self._disk_bytes += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._trim_disk()
+            self._insert(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self._counters)
+            lookups = c["memory_hits"] + c["disk_hits"] + c["misses"]
+            return {**c, "hit_ratio": (lookups - c["misses"]) / lookups if lookups else 0.0,
+                    "entries": len(self._memory), "resident_bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "disk_entries": len(self._disk), "disk_bytes": self._disk_bytes,
+                    "max_disk_bytes": self.max_disk_bytes}
+
+    def _trim_disk(self) -> None:
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _insert(self, key: str, entry: CachedSpectrum) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if entry.nbytes > self.max_bytes:
+            return
+        self._memory[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._counters["evictions"] += 1
@@ -0,0 +1,148 @@
+# Server-side signal store: uploaded signals are kept as contiguous float32 arrays
+# (1-D mono or (channels, samples)), persisted as .npy files, and referenced by
+# signal_id instead of being re-posted. Each one also gets a min/max LOD pyramid
+# (lod.py) for plotting.
+from __future__ import annotations
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+
+from lod import Pyramid, build_pyramid
+
+@dataclass
+class StoredSignal:
+    signal_id: str
+    data: np.ndarray
+    sampling_rate: int
+    filename: Optional[str]
+    timestamp: str
+    digest: Optional[str] = None
+
+    @property
+    def num_samples(self) -> int:
+        return int(self.data.shape[-1])
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.data.ndim == 1 else int(self.data.shape[0])
+
+class SignalStore:
+    '''LRU store of float32 signals bounded by a resident byte budget.
+
+    Every signal is written to `<directory>/<signal_id>.npy` (plus a small JSON
+    sidecar with its metadata). The most recently used signals stay in memory up to
+    max_bytes; evicted or not-yet-loaded ones are reopened memory-mapped, so they
+    cost page cache rather than heap and survive a restart.
+
+    Signals put with a content digest are indexed by it, so an identical upload
+    resolves to the existing signal_id (see find_digest).'''
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self._resident: "OrderedDict[str, StoredSignal]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._digests: Dict[str, str] = {}
+        self._dedup = {"dedup_hits": 0, "dedup_misses": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._load_digests()
+
+    def _load_digests(self) -> None:
+        for name in os.listdir(self.directory):
+            if not name.endswith(".meta.json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    digest = json.load(f).get("digest")
+            except (OSError, ValueError):
+                continue
+            if digest:
+                self._digests[digest] = name[: -len(".meta.json")]
+
+    def _paths(self, signal_id: str):
+        base = os.path.join(self.directory, signal_id)
+        return base + ".npy", base + ".meta.json"
+
+    def _lod_path(self, signal_id: str) -> str:
+        return os.path.join(self.directory, signal_id + ".lod.npy")
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._bytes
+
+    def put(self, signal_id: str, data: np.ndarray, sampling_rate: int, filename: Optional[str],
+            timestamp: str, digest: Optional[str] = None) -> StoredSignal:
+        arr = np.ascontiguousarray(data, dtype=np.float32)
+        arr.setflags(write=False)
+        npy_path, meta_path = self._paths(signal_id)
+        np.save(npy_path, arr)
+        np.save(self._lod_path(signal_id), build_pyramid(arr))
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"sampling_rate": int(sampling_rate), "filename": filename, "timestamp": timestamp,
+                       "digest": digest}, f)
+        entry = StoredSignal(signal_id, arr, int(sampling_rate), filename, timestamp, digest)
+        with self._lock:
+            self._insert(entry)
+            if digest:
+                self._digests[digest] = signal_id
+        return entry
+
+    def find_digest(self, digest: str) -> Optional[StoredSignal]:
+        '''The stored signal uploaded with this content digest, if any (counted as a dedup hit/miss).'''
+        with self._lock:
+            signal_id = self._digests.get(digest)
+        entry = self.get(signal_id) if signal_id else None
+        with self._lock:
+            self._dedup["dedup_hits" if entry is not None else "dedup_misses"] += 1
+        return entry
+
+    def get(self, signal_id: str) -> Optional[StoredSignal]:
+        with self._lock:
+            entry = self._resident.get(signal_id)
+            if entry is not None:
+                self._resident.move_to_end(signal_id)
+                return entry
+        npy_path, meta_path = self._paths(signal_id)
+        if not os.path.exists(npy_path) or not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        data = np.load(npy_path, mmap_mode="r")
+        return StoredSignal(signal_id, data, int(meta["sampling_rate"]), meta.get("filename"), meta.get("timestamp", ""),
+                            meta.get("digest"))
+
+    def pyramid(self, signal_id: str) -> Optional[Pyramid]:
+        '''LOD pyramid of a stored signal (per channel), memory-mapped; signals stored
+        before pyramids existed get theirs built on first use.'''
+        entry = self.get(signal_id)
+        if entry is None:
+            return None
+        path = self._lod_path(signal_id)
+        if not os.path.exists(path):
+            np.save(path, build_pyramid(entry.data))
+        return Pyramid(entry.data, np.load(path, mmap_mode="r"))
+
+    def __contains__(self, signal_id: str) -> bool:
+        return signal_id in self._resident or os.path.exists(self._paths(signal_id)[0])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"resident_signals": len(self._resident), "resident_bytes": self._bytes, "max_bytes": self.max_bytes,
+                    **self._dedup}
+
+    def _insert(self, entry: StoredSignal) -> None:
+        old = self._resident.pop(entry.signal_id, None)
+        if old is not None:
+            self._bytes -= old.data.nbytes
+        if entry.data.nbytes > self.max_bytes:
+            return  # too large to keep resident; get() serves it memory-mapped
+        self._resident[entry.signal_id] = entry
+        self._bytes += entry.data.nbytes
+        while self._bytes > self.max_bytes:
+            _, evicted = self._resident.popitem(last=False)
+            self._bytes -= evicted.data.nbytes
@@ -0,0 +1,83 @@
+# Binary wire formats for signal/spectrum payloads, negotiated by Accept/Content-Type.
+#
+# application/octet-stream
+#   request body:  raw little-endian float32 samples
+#   response body: b"FFTB" | uint32 LE header length | JSON header | arrays
+#                  The header carries the response metadata plus an "arrays" list of
+#                  {"name", "shape"}; the arrays follow in that order as LE float32.
+# application/x-npy
+#   request body:  a 1-D .npy array of samples
+#   response body: the payload's main array as .npy (FFT: rows frequency, magnitude,
+#                  phase); metadata goes in the X-Payload-Meta header as JSON.
+#
+# For binary requests the non-array fields come from the query string.
+from __future__ import annotations
+import io
+import json
+import struct
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+MEDIA_OCTET = "application/octet-stream"
+MEDIA_NPY = "application/x-npy"
+BINARY_MEDIA = (MEDIA_OCTET, MEDIA_NPY)
+MAGIC = b"FFTB"
+META_HEADER = "X-Payload-Meta"
+
+def _media(value: str) -> str:
+    return value.split(";")[0].strip().lower()
+
+def binary_media(content_type: Optional[str]) -> Optional[str]:
+    '''The binary media type of a Content-Type header, or None for anything else.'''
+    media = _media(content_type or "")
+    return media if media in BINARY_MEDIA else None
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    '''Binary media type preferred by an Accept header, or None to answer with JSON.'''
+    for item in (accept or "").split(","):
+        media = _media(item)
+        if media in BINARY_MEDIA:
+            return media
+        if media in ("application/json", "*/*"):
+            return None
+    return None
+
+def decode_samples(body: bytes, media_type: str) -> np.ndarray:
+    '''Samples from a binary request body without per-element parsing.'''
+    if media_type == MEDIA_OCTET:
+        if len(body) % 4:
+            raise ValueError("octet-stream body must be a whole number of float32 samples")
+        return np.frombuffer(body, dtype="<f4")
+    arr = np.load(io.BytesIO(body), allow_pickle=False)
+    if arr.ndim != 1 or arr.dtype.kind not in "iuf":
+        raise ValueError("npy body must be a 1-D numeric array")
+    return arr
+
+def encode_octet(arrays: Dict[str, np.ndarray], meta: Dict) -> bytes:
+    f32 = {name: np.ascontiguousarray(a, dtype="<f4") for name, a in arrays.items()}
+    header = json.dumps({**meta, "arrays": [{"name": n, "shape": list(a.shape)} for n, a in f32.items()]}).encode("utf-8")
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header] + [a.tobytes() for a in f32.values()])
+
+def decode_octet(body: bytes) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    '''Inverse of encode_octet: (metadata, arrays), the arrays viewing body without copying.'''
+    if body[:4] != MAGIC:
+        raise ValueError("not an FFTB payload")
+    (hlen,) = struct.unpack_from("<I", body, 4)
+    meta = json.loads(body[8:8 + hlen].decode("utf-8"))
+    arrays, offset = {}, 8 + hlen
+    for spec in meta.pop("arrays"):
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[spec["name"]] = np.frombuffer(body, dtype="<f4", count=count, offset=offset).reshape(spec["shape"])
+        offset += 4 * count
+    return meta, arrays
+
+def encode_npy(array: np.ndarray) -> bytes:
+    bio = io.BytesIO()
+    np.save(bio, np.ascontiguousarray(array, dtype="<f4"), allow_pickle=False)
+    return bio.getvalue()
+
+def encode(media_type: str, arrays: Dict[str, np.ndarray], meta: Dict, npy_array: np.ndarray) -> Tuple[bytes, Dict[str, str]]:
+    '''Response body and extra headers; an npy response carries npy_array only.'''
+    if media_type == MEDIA_OCTET:
+        return encode_octet(arrays, meta), {}
+    return encode_npy(npy_array), {META_HEADER: json.dumps(meta)}
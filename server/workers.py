@@ -0,0 +1,476 @@
+# CPU-bound steps of the API endpoints as plain module-level functions, so they can
+# run on the DSP executor (threads or processes) instead of the event loop. They
+# only touch their arguments and the files they are given — never server state (the
+# decoded-image and ORB feature caches are per process and keyed by file path).
+from __future__ import annotations
+import io
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import wave
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from PIL import Image
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except Exception:
+    OPENCV_AVAILABLE = False
+
+from dsp.fft import PRECISIONS, precision_of, rfft_real, rfftfreq, get_window
+from dsp.filters import design_lowpass_fir, design_highpass_fir, design_bandpass_fir, apply_fir
+from dsp.zoom import goertzel, zoom_fft
+from dsp.fft2d import PREVIEW_MAX_SIDE, compress_fft, log_magnitude_preview, phase_correlate, psnr
+from metrics import span
+from image_cache import decoded_images, features as feature_cache
+import ingest
+
+class TaskError(Exception):
+    '''A client-facing failure inside a worker; carries the HTTP status to answer with.'''
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def save_wav_int16(path: str, samples: np.ndarray, fs: int, chunk: int = 1 << 18):
+    '''Peak-normalised 16-bit WAV of a mono or (channels, samples) signal, converted
+    chunk by chunk (no full-size temporaries). All channels share one gain.'''
+    samples = samples if samples.ndim == 2 else samples.reshape(1, -1)
+    n = samples.shape[-1]
+    max_abs = 0.0
+    for i in range(0, n, chunk):
+        block = samples[:, i:i + chunk]
+        max_abs = max(max_abs, float(np.max(np.abs(block))) if block.size else 0.0)
+    gain = 32767.0 / max_abs if max_abs > 1e-12 else 32767.0
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(samples.shape[0]); wf.setsampwidth(2); wf.setframerate(fs)
+        for i in range(0, n, chunk):
+            block = np.asarray(samples[:, i:i + chunk], dtype=np.float64).T * gain  # interleave
+            wf.writeframes(np.clip(block, -32768, 32767).astype('<i2').tobytes())
+
+def decode_upload(source: Union[bytes, str], filename: str, mono: bool = True) -> Tuple[int, np.ndarray]:
+    '''(sampling_rate, float32 samples) of an uploaded .wav or .csv, given as bytes or
+    as the path of a spooled upload (decoded streaming, without reading it whole).
+    With mono=False multi-channel files are kept as (channels, samples).'''
+    try:
+        with span("decode"):
+            if isinstance(source, (bytes, bytearray)):
+                return ingest.decode_stream(io.BytesIO(source), filename, mono)
+            with open(source, "rb") as f:
+                return ingest.decode_stream(f, filename, mono)
+    except ingest.IngestError as e:
+        raise TaskError(400, str(e))
+
+def design_filter(filter_type: Optional[str], filter_cutoff: Optional[Sequence[float]], fs: float) -> Optional[np.ndarray]:
+    if not filter_type or not filter_cutoff:
+        return None
+    if filter_type == "lowpass":
+        return design_lowpass_fir(float(filter_cutoff[0]), fs, numtaps=201)
+    if filter_type == "highpass":
+        return design_highpass_fir(float(filter_cutoff[0]), fs, numtaps=201)
+    if filter_type == "bandpass" and len(filter_cutoff) == 2:
+        return design_bandpass_fir(float(filter_cutoff[0]), float(filter_cutoff[1]), fs, numtaps=401)
+    return None
+
+def fft_pipeline(signal_data: np.ndarray, fs: float, window_size: int, window_type: str,
+                 filter_type: Optional[str], filter_cutoff: Optional[Sequence[float]]):
+    '''Filter, window and transform the first window of a signal.
+
+    Returns (frequencies, magnitudes, phases, processed_signal). A (channels, samples)
+    signal is filtered, windowed and transformed in one batched pass, giving
+    (channels, bins) magnitudes and phases. A float32 signal runs in single precision
+    throughout (float32 window and filter, complex64 transform).'''
+    X_pos, signal_data = _spectrum(signal_data, fs, window_size, window_type, filter_type, filter_cutoff)
+    return rfftfreq(int(window_size), 1.0/fs), np.abs(X_pos), np.angle(X_pos), signal_data
+
+def _spectrum(signal_data: np.ndarray, fs: float, window_size: int, window_type: str,
+              filter_type: Optional[str], filter_cutoff: Optional[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    with span("filter"):
+        h = design_filter(filter_type, filter_cutoff, fs)
+        if h is not None:
+            signal_data = apply_fir(signal_data, h)
+    with span("window"):
+        Nw = int(window_size)
+        precision = precision_of(signal_data)
+        w = get_window(window_type, Nw, precision)
+        if signal_data.shape[-1] < Nw:
+            seg = np.zeros(signal_data.shape[:-1] + (Nw,), dtype=PRECISIONS[precision][0])
+            seg[..., : signal_data.shape[-1]] = signal_data
+            seg *= w
+        else:
+            seg = signal_data[..., :Nw] * w
+    with span("rfft"):
+        return rfft_real(seg), signal_data
+
+CHANNEL_MODES = ("per_channel", "mid_side", "cross")
+
+def channel_labels(mode: str, channels: int) -> List[str]:
+    '''Names of the spectra fft_channels returns for a signal with this many channels.'''
+    if mode == "mid_side":
+        return ["mid", "side"]
+    labels = [f"ch{i}" for i in range(channels)]
+    if mode == "cross":
+        labels += [f"cross_0_{i}" for i in range(1, channels)]
+    return labels
+
+def fft_channels(signal_data: np.ndarray, fs: float, window_size: int, window_type: str,
+                 filter_type: Optional[str], filter_cutoff: Optional[Sequence[float]], mode: str = "per_channel"):
+    '''Spectra of a (channels, samples) signal from one batched transform.
+
+    per_channel: one spectrum per channel. mid_side (2 channels): spectra of
+    M = (L + R)/2 and S = (L - R)/2, formed from the channel spectra by linearity.
+    cross: the channel spectra plus the cross-spectrum X0 * conj(Xk) of channel 0
+    with every other one, whose phase is the inter-channel phase difference.
+    Returns (frequencies, labels, magnitudes, phases, processed) with (spectra, bins)
+    arrays; processed holds the filtered time signals of the output channels.'''
+    X, processed = _spectrum(signal_data, fs, window_size, window_type, filter_type, filter_cutoff)
+    with span("channels"):
+        if mode == "mid_side":
+            X = np.stack([(X[0] + X[1]) * 0.5, (X[0] - X[1]) * 0.5])
+            processed = np.stack([(processed[0] + processed[1]) * 0.5, (processed[0] - processed[1]) * 0.5])
+        elif mode == "cross":
+            X = np.concatenate([X, X[:1] * np.conj(X[1:])])
+        labels = channel_labels(mode, signal_data.shape[0])
+        return rfftfreq(int(window_size), 1.0/fs), labels, np.abs(X), np.angle(X), processed
+
+def band_spectrum(signal_data: np.ndarray, fs: float, window_type: str, f_lo: Optional[float] = None,
+                  f_hi: Optional[float] = None, num_bins: int = 512,
+                  frequencies: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''Windowed spectrum of the whole signal at selected frequencies only: the given
+    frequencies (Goertzel) or num_bins bins over [f_lo, f_hi] (chirp-z zoom).
+    Returns (frequencies, magnitudes, phases).'''
+    with span("window"):
+        seg = signal_data * get_window(window_type, signal_data.shape[-1], precision_of(signal_data))
+    try:
+        with span("band"):
+            if frequencies is not None:
+                freqs, X = np.asarray(frequencies, dtype=np.float64), goertzel(seg, fs, frequencies)
+            else:
+                freqs, X = zoom_fft(seg, fs, f_lo, f_hi, num_bins)
+    except ValueError as e:
+        raise TaskError(400, str(e))
+    return freqs, np.abs(X), np.angle(X)
+
+def normalize_image(contents: bytes, out_path: str) -> Tuple[int, int]:
+    '''Decode an uploaded image, store it as a high-quality RGB JPEG; returns (width, height).'''
+    try:
+        with span("decode"):
+            im = Image.open(io.BytesIO(contents)).convert("RGB")
+    except Exception as e:
+        raise TaskError(400, f"Invalid image: {e}")
+    with span("encode"):
+        im.save(out_path, format="JPEG", quality=95, subsampling=0)
+    return im.width, im.height
+
+def _decode_rgb(path: str) -> np.ndarray:
+    with Image.open(path) as im:
+        return np.asarray(im.convert("RGB"))
+
+def load_rgb(path: str) -> np.ndarray:
+    '''Decoded (h, w, 3) uint8 pixels of a stored image, via the decoded-image cache.'''
+    with span("decode"):
+        return decoded_images.get(path, lambda: _decode_rgb(path))
+
+def _encode_jpeg(im: Image.Image, quality: int, subsampling: int) -> bytes:
+    buf = io.BytesIO()
+    im.save(buf, format="JPEG", quality=quality, subsampling=subsampling, optimize=True)
+    return buf.getvalue()
+
+def _jpeg_psnr(img: np.ndarray, encoded: bytes) -> Optional[float]:
+    with Image.open(io.BytesIO(encoded)) as im:
+        value = psnr(img, np.asarray(im.convert("RGB")))
+    return None if value == float("inf") else value
+
+def jpeg_compress(orig_path: str, quality: int, subsampling: int) -> bytes:
+    img = load_rgb(orig_path)
+    with span("encode"):
+        return _encode_jpeg(Image.fromarray(img), quality, subsampling)
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    # PIL and OpenCV release the GIL while encoding/detecting, so fan-out within one
+    # task (quality sweeps, batch registration) runs on a shared thread pool
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="image")
+    return _thread_pool
+
+def jpeg_sweep(orig_path: str, qualities: Sequence[int], subsamplings: Sequence[int]) -> List[Dict[str, Any]]:
+    '''Size and PSNR of every (quality, subsampling) JPEG encoding, smallest first.
+    Nothing is written to disk.'''
+    img = load_rgb(orig_path)
+    im = Image.fromarray(img)
+
+    def one(setting):
+        quality, subsampling = setting
+        encoded = _encode_jpeg(im, quality, subsampling)
+        return {"quality": quality, "subsampling": subsampling, "size_bytes": len(encoded),
+                "psnr": _jpeg_psnr(img, encoded)}
+    with span("sweep"):
+        results = list(_get_thread_pool().map(one, itertools.product(qualities, subsamplings)))
+    return sorted(results, key=lambda r: r["size_bytes"])
+
+def jpeg_target_size(orig_path: str, target_bytes: int, subsampling: int,
+                     min_quality: int = 1, max_quality: int = 95) -> Dict[str, Any]:
+    '''Highest quality whose JPEG fits in target_bytes, found by binary search (size
+    grows with quality). Returns the encoding plus quality, psnr and whether the
+    target was met; if even min_quality is too big, that smallest encoding is used.'''
+    img = load_rgb(orig_path)
+    im = Image.fromarray(img)
+    best, smallest, probes = None, None, 0
+    lo, hi = min_quality, max_quality
+    with span("search"):
+        while lo <= hi:
+            q = (lo + hi) // 2
+            encoded = _encode_jpeg(im, q, subsampling)
+            probes += 1
+            if len(encoded) <= target_bytes:
+                best, lo = (q, encoded), q + 1
+            else:
+                if q == min_quality:
+                    smallest = (q, encoded)
+                hi = q - 1
+    quality, encoded = best or smallest or (min_quality, _encode_jpeg(im, min_quality, subsampling))
+    return {"encoded": encoded, "quality": quality, "psnr": _jpeg_psnr(img, encoded),
+            "target_met": best is not None, "probes": probes}
+
+def fft_compress_image(orig_path: str, keep_ratio: Optional[float], cutoff: Optional[float],
+                       tile: Optional[int], out_path: str, preview_path: str) -> Dict[str, Any]:
+    '''2D-FFT compression of a stored image; writes the reconstruction (PNG, so no JPEG
+    loss is mixed in) and a log-magnitude spectrum preview of its luminance.'''
+    img = load_rgb(orig_path)
+    im = Image.fromarray(img)
+    with span("fft2"):
+        rec, kept = compress_fft(img, keep_ratio, cutoff, tile)
+    with span("encode"):
+        Image.fromarray(rec).save(out_path, format="PNG")
+    with span("preview"):
+        small = im.convert("L")
+        small.thumbnail((PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE))
+        Image.fromarray(log_magnitude_preview(np.asarray(small))).save(preview_path, format="PNG")
+    quality = psnr(img, rec)
+    return {"kept_fraction": kept, "psnr": None if quality == float("inf") else quality}
+
+def _require_opencv():
+    if not OPENCV_AVAILABLE:
+        raise TaskError(503, "OpenCV is not installed on the server")
+
+# Above this many descriptors on both sides, matching goes through a FLANN LSH index
+# instead of brute-force Hamming distances over every pair.
+FLANN_MIN_DESCRIPTORS = 1000
+PHASE_BATCH = 16  # moving images per batched phase-correlation transform
+
+@dataclass
+class OrbFeatures:
+    keypoints: np.ndarray  # (n, 6) float32: x, y, size, angle, response, octave
+    descriptors: Optional[np.ndarray]  # (n, 32) uint8
+
+    @property
+    def nbytes(self) -> int:
+        return self.keypoints.nbytes + (self.descriptors.nbytes if self.descriptors is not None else 0)
+
+    def cv_keypoints(self) -> list:
+        return [cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(resp), int(octave))
+                for x, y, size, angle, resp, octave in self.keypoints]
+
+def _gray(path: str) -> np.ndarray:
+    rgb = load_rgb(path)
+    if OPENCV_AVAILABLE:
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    return (rgb @ np.array([0.299, 0.587, 0.114])).astype(np.uint8)
+
+def _detect_orb(path: str, nfeatures: int) -> OrbFeatures:
+    gray = _gray(path)
+    with span("orb"):
+        kps, des = cv2.ORB_create(nfeatures=nfeatures).detectAndCompute(gray, None)
+    pts = np.array([(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave) for k in kps],
+                   dtype=np.float32).reshape(-1, 6)
+    return OrbFeatures(pts, des)
+
+def orb_features(path: str, nfeatures: int) -> OrbFeatures:
+    '''ORB keypoints and descriptors of a stored image, cached per (path, nfeatures).'''
+    return feature_cache.get((path, nfeatures), lambda: _detect_orb(path, nfeatures))
+
+def _match(d_ref: np.ndarray, d_mov: np.ndarray, good_match_percent: float) -> list:
+    '''Best mov match of each ref descriptor, the closest good_match_percent kept.'''
+    if min(len(d_ref), len(d_mov)) >= FLANN_MIN_DESCRIPTORS:
+        matcher = cv2.FlannBasedMatcher(dict(algorithm=6, table_number=6, key_size=12, multi_probe_level=1),
+                                        dict(checks=50))  # algorithm 6 = LSH
+        matches = [m[0] for m in matcher.knnMatch(d_ref, d_mov, k=1) if m]
+    else:
+        matches = list(cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False).match(d_ref, d_mov))
+    matches.sort(key=lambda m: m.distance)
+    return matches[:max(4, int(len(matches) * good_match_percent))]
+
+def detect_features(orig_path: str, out_path: str, nfeatures: int = 800) -> List[Dict[str, float]]:
+    '''ORB keypoints of an image; writes the rich-keypoint overlay to out_path.'''
+    _require_opencv()
+    feats = orb_features(orig_path, nfeatures)
+    with span("encode"):
+        bgr = np.ascontiguousarray(load_rgb(orig_path)[..., ::-1])
+        out = cv2.drawKeypoints(bgr, feats.cv_keypoints(), None, flags=cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS)
+        cv2.imwrite(out_path, out)
+    return [{"x": float(x), "y": float(y)} for x, y in feats.keypoints[:, :2]]
+
+def _register_orb(ref_path: str, mov_path: str, max_features: int, good_match_percent: float,
+                  out_path: str) -> Dict[str, Any]:
+    f_ref, f_mov = orb_features(ref_path, max_features), orb_features(mov_path, max_features)
+    if f_ref.descriptors is None or f_mov.descriptors is None: raise TaskError(400, "Could not compute descriptors")
+    with span("match"):
+        matches = _match(f_ref.descriptors, f_mov.descriptors, good_match_percent)
+    if len(matches) < 4: raise TaskError(400, "Not enough feature matches")
+    with span("homography"):
+        pts1 = f_ref.keypoints[[m.queryIdx for m in matches], :2].reshape(-1, 1, 2)
+        pts2 = f_mov.keypoints[[m.trainIdx for m in matches], :2].reshape(-1, 1, 2)
+        H, mask = cv2.findHomography(pts2, pts1, cv2.RANSAC)
+    if H is None: raise TaskError(400, "Homography estimation failed")
+    with span("warp"):
+        h, w = load_rgb(ref_path).shape[:2]
+        aligned = cv2.warpPerspective(np.ascontiguousarray(load_rgb(mov_path)[..., ::-1]), H, (w, h))
+    with span("encode"):
+        cv2.imwrite(out_path, aligned)
+    return {"method": "orb", "matches": len(matches), "inliers": int(mask.sum()), "homography": H.tolist()}
+
+def _write_translated(mov_path: str, shift: np.ndarray, out_path: str) -> None:
+    '''Shift the moving image back by (dy, dx) onto the reference frame and save it.'''
+    dy, dx = float(shift[0]), float(shift[1])
+    im = Image.fromarray(load_rgb(mov_path))
+    with span("warp"):
+        aligned = im.transform(im.size, Image.Transform.AFFINE, (1, 0, dx, 0, 1, dy), resample=Image.Resampling.BILINEAR)
+    with span("encode"):
+        aligned.save(out_path, format="JPEG", quality=95)
+
+def _phase_result(shift: np.ndarray, peak: float) -> Dict[str, Any]:
+    return {"method": "phase", "dy": float(shift[0]), "dx": float(shift[1]), "confidence": float(peak)}
+
+def register_images(ref_path: str, mov_path: str, max_features: int, good_match_percent: float, out_path: str,
+                    method: str = "orb") -> Dict[str, Any]:
+    '''Align the moving image onto the reference and write out_path. "orb" fits a RANSAC
+    homography to ORB matches; "phase" finds a pure translation by phase correlation
+    (2D FFT), which needs no OpenCV and both images of the same size.'''
+    if method == "phase":
+        ref, mov = _gray(ref_path), _gray(mov_path)
+        if ref.shape != mov.shape: raise TaskError(400, "Phase correlation needs images of the same size")
+        with span("phase_corr"):
+            shift, peak = phase_correlate(ref, mov)
+        _write_translated(mov_path, shift, out_path)
+        return _phase_result(shift, peak)
+    _require_opencv()
+    return _register_orb(ref_path, mov_path, max_features, good_match_percent, out_path)
+
+def register_batch(ref_path: str, mov_paths: Sequence[str], out_paths: Sequence[str], max_features: int,
+                   good_match_percent: float, method: str = "orb") -> List[Dict[str, Any]]:
+    '''register_images for many moving images against one reference. The reference is
+    decoded and described once; "phase" correlates all same-size images in one batched
+    transform, "orb" matches images in parallel on the thread pool. Per-image failures
+    are reported as {"error": ...} entries instead of failing the batch.'''
+    if method != "phase":
+        _require_opencv()
+        orb_features(ref_path, max_features)  # warm the reference entry before fanning out
+
+        def one(paths):
+            try:
+                return _register_orb(ref_path, paths[0], max_features, good_match_percent, paths[1])
+            except TaskError as e:
+                return {"error": e.detail}
+        return list(_get_thread_pool().map(one, zip(mov_paths, out_paths)))
+    ref = _gray(ref_path)
+    grays = [_gray(p) for p in mov_paths]
+    ok = [i for i, g in enumerate(grays) if g.shape == ref.shape]
+    results: List[Dict[str, Any]] = [{"error": "Phase correlation needs images of the same size"}] * len(mov_paths)
+    for start in range(0, len(ok), PHASE_BATCH):
+        group = ok[start:start + PHASE_BATCH]
+        with span("phase_corr"):
+            shifts, peaks = phase_correlate(ref, np.stack([grays[i] for i in group]))
+        for i, shift, peak in zip(group, shifts, peaks):
+            _write_translated(mov_paths[i], shift, out_paths[i])
+            results[i] = _phase_result(shift, peak)
+    return results
+
+MJPEG_PREFETCH = 4  # frames decoded ahead of the writer; bounds the memory in flight
+MJPEG_BOUNDARY = "mjpegframe"
+MJPEG_QUALITY = 85  # JPEG quality of re-encoded stream frames when none is requested
+
+def frame_size(path: str) -> Tuple[int, int]:
+    '''(width, height) from the image header, without decoding the pixels.'''
+    with Image.open(path) as im:
+        return im.size
+
+def _read_frame(iid: str, path: str, size: Tuple[int, int]) -> np.ndarray:
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None: raise TaskError(400, f"Could not read image: {iid}")
+    if (img.shape[1], img.shape[0]) != size:
+        img = cv2.resize(img, size)
+    return img
+
+def _prefetch(fn, items: Sequence, prefetch: int) -> Iterator[Any]:
+    '''fn(item) for each item, in order, computed on the thread pool with at most
+    `prefetch` results pending; unconsumed work is cancelled if the caller stops early.'''
+    pool, pending = _get_thread_pool(), deque()
+    it = iter(items)
+    try:
+        for item in itertools.islice(it, prefetch):
+            pending.append(pool.submit(fn, item))
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(it, 1):
+                pending.append(pool.submit(fn, item))
+            yield result
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+def iter_frames(frames: Sequence[Tuple[str, str]], size: Tuple[int, int],
+                prefetch: int = MJPEG_PREFETCH) -> Iterator[np.ndarray]:
+    '''BGR frames resized to size (w, h), decoded in parallel but yielded in order.'''
+    return _prefetch(lambda f: _read_frame(f[0], f[1], size), frames, prefetch)
+
+def write_mjpeg(frames: Sequence[Tuple[str, str]], fps: float, out_path: str,
+                prefetch: int = MJPEG_PREFETCH) -> int:
+    '''Encode (image_id, path) frames into an MJPG .avi sized like the first frame.
+    Frames are streamed into the writer, so memory stays O(prefetch) frames however
+    long the sequence. Returns the number of frames written.'''
+    _require_opencv()
+    size = frame_size(frames[0][1])
+    vw = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    count = 0
+    try:
+        with span("encode"):
+            for fr in iter_frames(frames, size, prefetch):
+                vw.write(fr)
+                count += 1
+    finally:
+        vw.release()
+    return count
+
+def _frame_jpeg(iid: str, path: str, size: Tuple[int, int], quality: Optional[int]) -> bytes:
+    # stored images are already JPEG: with no quality requested, pass them through
+    # untouched when no resize is needed
+    if quality is None and frame_size(path) == size and path.lower().endswith((".jpg", ".jpeg")):
+        with open(path, "rb") as f:
+            return f.read()
+    q = MJPEG_QUALITY if quality is None else quality
+    ok, buf = cv2.imencode(".jpg", _read_frame(iid, path, size), [cv2.IMWRITE_JPEG_QUALITY, q])
+    if not ok: raise TaskError(500, f"Could not encode frame: {iid}")
+    return buf.tobytes()
+
+def iter_mjpeg_parts(frames: Sequence[Tuple[str, str]], fps: float, quality: Optional[int] = None, pace: bool = True,
+                     prefetch: int = MJPEG_PREFETCH) -> Iterator[bytes]:
+    '''Body of a multipart/x-mixed-replace MJPEG stream: one JPEG part per frame, sized
+    like the first frame, sent as soon as it is ready (and, with pace, no faster than fps).
+    Every frame is re-encoded at quality if one is given; otherwise stored JPEGs of the
+    right size are sent as they are and the rest are encoded at MJPEG_QUALITY.'''
+    _require_opencv()
+    size = frame_size(frames[0][1])
+    t_next = time.monotonic()
+    for jpeg in _prefetch(lambda f: _frame_jpeg(f[0], f[1], size, quality), frames, prefetch):
+        if pace:
+            time.sleep(max(0.0, t_next - time.monotonic()))
+            t_next = max(t_next, time.monotonic()) + 1.0 / fps
+        yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n").encode("ascii") + jpeg + b"\r\n"
+    yield f"--{MJPEG_BOUNDARY}--\r\n".encode("ascii")
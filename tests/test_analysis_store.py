@@ -0,0 +1,71 @@
+import json
+import numpy as np
+import pytest
+from server.analysis_store import AnalysisRecord, AnalysisStore
+
+def _record(i, **kw):
+    values = dict(id=f"a{i:03d}", timestamp=f"2026-01-01T00:00:{i:02d}", filename=f"take{i % 3}.wav",
+                  signal_id=None, sampling_rate=8000, window_size=256, window_type="hann", filter_type=None,
+                  filter_cutoff=None, num_samples=64, duration=64 / 8000, content_hash=None)
+    values.update(kw)
+    return AnalysisRecord(**values)
+
+def test_save_get_and_memory_mapped_arrays(tmp_path):
+    store = AnalysisStore(str(tmp_path))
+    f = np.arange(5.0); m = f * 2; p = -f; y = np.linspace(-1, 1, 64)
+    store.save(_record(1, filter_type="lowpass", filter_cutoff=[1000.0]), f, m, p, y)
+    rec = store.get("a001")
+    assert rec.filter_cutoff == [1000.0] and rec.filename == "take1.wav"
+    spec = store.spectrum("a001")
+    assert isinstance(spec, np.memmap) and np.array_equal(spec, np.stack([f, m, p]))
+    assert np.allclose(store.processed_signal("a001"), y, atol=1e-7)
+    assert store.get("missing") is None and store.spectrum("missing") is None
+    assert AnalysisStore(str(tmp_path)).count() == 1  # survives a reopen
+
+def test_history_pages_with_cursor_and_filters(tmp_path):
+    store = AnalysisStore(str(tmp_path))
+    for i in range(25):
+        store.save(_record(i, window_size=512 if i % 2 else 256), np.zeros(2), np.zeros(2), np.zeros(2))
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.history(limit=10, cursor=cursor)
+        seen += [r.id for r in page]
+        if cursor is None:
+            break
+    assert seen == [f"a{i:03d}" for i in reversed(range(25))]
+    page, _ = store.history(window_size=512, filename_contains="take1")
+    assert [r.id for r in page] == [f"a{i:03d}" for i in reversed(range(25)) if i % 2 and i % 3 == 1]
+    page, _ = store.history(since="2026-01-01T00:00:05", until="2026-01-01T00:00:08")
+    assert [r.id for r in page] == ["a007", "a006", "a005"]
+    with pytest.raises(ValueError):
+        store.history(cursor="not a cursor!")
+
+def test_import_legacy_json(tmp_path):
+    legacy = {"id": "old", "timestamp": "2025-05-01T12:00:00", "sampling_rate": 100, "window_size": 4,
+              "frequencies": [0, 25, 50], "magnitudes": [1, 2, 3], "phases": [0, 0, 0],
+              "processed_signal": [0.5] * 10, "filter_type": None, "filter_cutoff": None}
+    (tmp_path / "old.json").write_text(json.dumps(legacy))
+    store = AnalysisStore(str(tmp_path))
+    assert store.import_legacy_json(str(tmp_path)) == 1
+    assert not (tmp_path / "old.json").exists()
+    rec = store.get("old")
+    assert rec.num_samples == 10 and rec.duration == pytest.approx(0.1)
+    assert np.array_equal(store.spectrum("old")[1], [1, 2, 3])
+    # the original is kept as a backup, and a restart does not import it again
+    assert json.loads((tmp_path / "legacy" / "old.json").read_text()) == legacy
+    assert AnalysisStore(str(tmp_path)).import_legacy_json(str(tmp_path)) == 0
+
+def test_multichannel_spectra_and_old_catalog_migration(tmp_path):
+    import sqlite3
+    db = sqlite3.connect(str(tmp_path / "catalog.sqlite3"))  # a catalog from before channel_labels
+    db.execute("CREATE TABLE analyses (id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, filename TEXT, signal_id TEXT, "
+               "sampling_rate INTEGER NOT NULL, window_size INTEGER NOT NULL, window_type TEXT, filter_type TEXT, "
+               "filter_cutoff TEXT, num_samples INTEGER NOT NULL, duration REAL NOT NULL, content_hash TEXT)")
+    db.commit(); db.close()
+    store = AnalysisStore(str(tmp_path))
+    f = np.arange(4.0); mags = np.array([[1.0] * 4, [2.0] * 4]); phases = -mags
+    store.save(_record(1, channel_labels=["mid", "side"]), f, mags, phases, np.zeros((2, 64)))
+    assert store.get("a001").channel_labels == ["mid", "side"]
+    spec = store.spectrum("a001")
+    assert spec.shape == (5, 4) and np.array_equal(spec[1:3], mags) and np.array_equal(spec[3:], phases)
+    assert store.processed_signal("a001").shape == (2, 64)
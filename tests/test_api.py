@@ -1,6 +1,7 @@
 
-import io, math
+import io, math, os
 import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 from server.main import app
 
@@ -36,3 +37,383 @@ def test_upload_and_fft():
     assert r2.status_code == 200
     out = r2.json()
     assert "frequencies" in out and len(out["frequencies"]) == 1025
+
+def test_spectrogram_covers_whole_signal():
+    fs = 8000
+    x = np.sin(2*math.pi*500*np.arange(2*fs)/fs)
+    payload = {"signal_data": x.tolist(), "sampling_rate": fs, "window_size": 512, "hop_size": 256, "scale": "db"}
+    r = client.post("/api/spectrogram", json=payload)
+    assert r.status_code == 200
+    out = r.json()
+    assert out["num_frames"] == 1 + (2*fs - 512)//256
+    assert len(out["magnitudes"]) == out["num_frames"] and len(out["magnitudes"][0]) == 257
+
+def test_mic_stream_emits_frame_per_hop():
+    fs = 8000
+    x = 0.5*np.sin(2*math.pi*1000*np.arange(4096)/fs)
+    pcm = np.clip(x*32767, -32768, 32767).astype('<i2').tobytes()
+    with client.websocket_connect(f"/api/mic/stream?sampling_rate={fs}&window_size=1024&hop_size=512") as ws:
+        cfg = ws.receive_json()
+        assert cfg["type"] == "config" and len(cfg["frequencies"]) == 513
+        ws.send_bytes(pcm[:1001]); ws.send_bytes(pcm[1001:])
+        frames = [ws.receive_json() for _ in range(1 + (4096 - 1024)//512)]
+        ws.send_text("stop")
+    assert [f["index"] for f in frames] == list(range(7))
+    peak = int(np.argmax(frames[-1]["magnitudes"]))
+    assert abs(cfg["frequencies"][peak] - 1000) <= fs/1024
+
+def test_mic_stream_runs_stft_off_the_event_loop(monkeypatch):
+    import threading
+    from server import main
+    threads, run = [], main._stream_frames
+    def record(*args):
+        threads.append(threading.current_thread().name)
+        return run(*args)
+    monkeypatch.setattr(main, "_stream_frames", record)
+    with client.websocket_connect("/api/mic/stream?sampling_rate=8000&window_size=256") as ws:
+        ws.receive_json()
+        ws.send_bytes(np.zeros(256, dtype="<i2").tobytes())
+        assert ws.receive_json()["type"] == "frame"
+        ws.send_text("stop")
+    assert threads and all(name.startswith("ThreadPoolExecutor") for name in threads)
+
+def test_fft_by_signal_id_and_range():
+    r = client.post("/api/upload", files={"file": ("ref.wav", _sine_wav_bytes(freq=1000, fs=8000, dur=1.0), "audio/wav")})
+    sig = r.json()
+    r2 = client.post("/api/fft", json={"signal_id": sig["signal_id"], "start_sample": 1000, "end_sample": 3048,
+                                       "window_size": 2048, "window_type": "hann"})
+    assert r2.status_code == 200
+    out = r2.json()
+    assert out["sampling_rate"] == 8000
+    peak = out["frequencies"][int(np.argmax(out["magnitudes"]))]
+    assert abs(peak - 1000) <= 8000/2048
+    assert client.post("/api/fft", json={"signal_id": "missing"}).status_code == 404
+    assert client.post("/api/fft", json={"window_size": 2048}).status_code == 422
+
+def test_binary_wire_formats():
+    from server import wire
+    r = client.post("/api/upload", files={"file": ("b.wav", _sine_wav_bytes(freq=440, fs=8000), "audio/wav")},
+                    headers={"Accept": "application/octet-stream"})
+    assert r.status_code == 200 and r.headers["content-type"] == "application/octet-stream"
+    meta, arrays = wire.decode_octet(r.content)
+    x = arrays["time_domain"]
+    assert meta["num_samples"] == len(x) == 4000 and meta["sampling_rate"] == 8000
+
+    r2 = client.post("/api/fft?sampling_rate=8000&window_size=2048&window_type=hann", content=x.tobytes(),
+                     headers={"Content-Type": "application/octet-stream", "Accept": "application/x-npy"})
+    assert r2.status_code == 200
+    spec = np.load(io.BytesIO(r2.content))
+    assert spec.shape == (3, 1025) and spec.dtype == np.float32
+    assert abs(spec[0][np.argmax(spec[1])] - 440) <= 8000/2048
+    assert "analysis_id" in r2.headers["x-payload-meta"]
+
+    js = client.post("/api/fft", json={"signal_data": x.tolist(), "sampling_rate": 8000, "window_size": 2048}).json()
+    assert np.allclose(spec[1], js["magnitudes"], rtol=1e-4, atol=1e-4)
+    assert client.post("/api/fft", content=b"abc", headers={"Content-Type": "application/octet-stream"}).status_code == 400
+
+def test_jobs_and_backpressure():
+    import time
+    from server import main
+    x = np.sin(2*math.pi*440*np.arange(8000)/8000)
+    payload = {"signal_data": x.tolist(), "sampling_rate": 8000, "window_size": 512, "hop_size": 256}
+    with TestClient(app) as c:  # keeps one event loop alive for the background job
+        r = c.post("/api/spectrogram?as_job=true", json=payload)
+        assert r.status_code == 202
+        job = r.json()
+        for _ in range(200):
+            res = c.get(job["result_url"])
+            if res.status_code != 202: break
+            time.sleep(0.01)
+        assert res.status_code == 200 and res.json()["num_frames"] == 1 + (8000 - 512)//256
+        assert c.get(job["status_url"]).json()["status"] == "done"
+        assert c.get("/api/jobs/missing").status_code == 404
+
+        saved = main.dsp_executor.max_pending
+        main.dsp_executor.max_pending = 0
+        try:
+            r = c.post("/api/spectrogram", json=payload)
+            assert r.status_code == 429 and "retry-after" in r.headers
+        finally:
+            main.dsp_executor.max_pending = saved
+
+        before = set(os.listdir(main.UPLOAD_TMP_DIR))
+        saved, main.job_manager.max_active = main.job_manager.max_active, 0
+        try:
+            r = c.post("/api/upload?as_job=true", files={"file": ("q.wav", _sine_wav_bytes(), "audio/wav")})
+            assert r.status_code == 429
+        finally:
+            main.job_manager.max_active = saved
+        assert set(os.listdir(main.UPLOAD_TMP_DIR)) == before  # the spooled upload is removed
+
+def test_fft_cache_and_upload_dedup():
+    from server import main
+    wav = _sine_wav_bytes(freq=700, fs=8000, dur=0.75).getvalue()
+    ids = [client.post("/api/upload", files={"file": ("d.wav", io.BytesIO(wav), "audio/wav")}).json()["signal_id"]
+           for _ in range(2)]
+    assert ids[0] == ids[1]
+
+    before = main.fft_cache.stats()
+    payload = {"signal_id": ids[0], "window_size": 1024, "window_type": "hamming"}
+    a, b = client.post("/api/fft", json=payload).json(), client.post("/api/fft", json=payload).json()
+    after = main.fft_cache.stats()
+    assert a == b
+    cold = lambda st: st["misses"] + st["disk_hits"]  # disk tier may hold it from an earlier run
+    assert cold(after) == cold(before) + 1 and after["memory_hits"] == before["memory_hits"] + 1
+    c = client.post("/api/fft", json={**payload, "window_type": "hann"}).json()
+    assert c["analysis_id"] != a["analysis_id"]
+    resolve = main._resolve_signal
+    main._resolve_signal = None  # a hit on a stored signal must not touch its samples
+    try:
+        assert client.post("/api/fft", json=payload).json() == a
+    finally:
+        main._resolve_signal = resolve
+    part = client.post("/api/fft", json={**payload, "start_sample": 100}).json()
+    assert part["analysis_id"] != a["analysis_id"]  # a different slice is a different entry
+    stats = client.get("/api/cache/stats").json()
+    assert stats["signals"]["dedup_hits"] >= 1 and stats["fft"]["entries"] >= 2
+
+def test_image_fft_compress():
+    from PIL import Image
+    yy, xx = np.mgrid[0:64, 0:80]
+    img = (127 + 100*np.sin(xx/7.0)*np.cos(yy/5.0)).astype(np.uint8)
+    bio = io.BytesIO(); Image.fromarray(np.stack([img]*3, axis=-1)).save(bio, format="PNG")
+    image_id = client.post("/api/image/upload", files={"file": ("g.png", bio.getvalue(), "image/png")}).json()["image_id"]
+    r = client.post("/api/image/fft-compress", json={"image_id": image_id, "keep_ratio": 0.1})
+    assert r.status_code == 200
+    out = r.json()
+    assert out["kept_fraction"] <= 0.2 and out["psnr"] > 25
+    rec = client.get(out["url"]); spec = client.get(out["spectrum_url"])
+    assert rec.headers["content-type"] == "image/png" and Image.open(io.BytesIO(rec.content)).size == (80, 64)
+    assert spec.status_code == 200
+    assert client.post("/api/image/fft-compress", json={"image_id": image_id}).status_code == 400
+
+def test_psd_endpoint_finds_tone():
+    fs = 8000
+    x = np.sin(2*math.pi*1250*np.arange(3*fs)/fs) + 0.1*np.random.default_rng(2).standard_normal(3*fs)
+    r = client.post("/api/psd", json={"signal_data": x.tolist(), "sampling_rate": fs, "window_size": 1024})
+    assert r.status_code == 200
+    out = r.json()
+    assert out["num_segments"] == 1 + (3*fs - 1024)//512 and out["overlap"] == 512
+    assert abs(out["frequencies"][int(np.argmax(out["psd"]))] - 1250) <= fs/1024
+    assert client.post("/api/psd", json={"signal_data": x.tolist(), "window_size": 256, "overlap": 256}).status_code == 400
+
+def test_server_timing_and_metrics():
+    from server import main
+    if not main.metrics.ENABLED:
+        pytest.skip("started with METRICS_ENABLED=0")
+    x = np.sin(2*math.pi*300*np.arange(4096)/8000) + 1e-3*np.random.default_rng().standard_normal(4096)  # miss the cache
+    r = client.post("/api/fft", json={"signal_data": x.tolist(), "sampling_rate": 8000, "window_size": 1024,
+                                      "filter_type": "lowpass", "filter_cutoff": [1000]})
+    stages = {item.split(";")[0].strip() for item in r.headers["server-timing"].split(",")}
+    assert {"parse", "filter", "window", "rfft", "total"} <= stages
+    text = client.get("/api/metrics").text
+    assert 'fft_stage_duration_seconds_count{route="/api/fft",stage="rfft"}' in text
+    assert 'fft_http_requests_total{method="POST",route="/api/fft",status="200"}' in text
+    assert "fft_result_cache_entries" in text and "# TYPE fft_http_request_duration_seconds histogram" in text
+
+def test_upload_streams_24bit_wav():
+    from test_ingest import _wav, _pcm24
+    from server import main
+    x = 0.5*np.sin(2*math.pi*440*np.arange(8000)/8000)[:, None]
+    r = client.post("/api/upload", files={"file": ("deep.wav", _wav(_pcm24(x), 8000, 1, 24), "audio/wav")})
+    assert r.status_code == 200
+    sig = r.json()
+    assert sig["num_samples"] == 8000 and sig["sampling_rate"] == 8000
+    assert np.abs(np.array(sig["time_domain"]) - x[:, 0]).max() < 1e-4
+    assert client.post("/api/upload", files={"file": ("bad.wav", b"RIFFxxxxWAVE", "audio/wav")}).status_code == 400
+    assert not os.listdir(main.UPLOAD_TMP_DIR)
+
+def test_history_pagination_and_download():
+    r = client.post("/api/upload", files={"file": ("hist.wav", _sine_wav_bytes(330), "audio/wav")})
+    sid = r.json()["signal_id"]
+    ids = []
+    for w in (256, 512, 1024):
+        out = client.post("/api/fft", json={"signal_id": sid, "sampling_rate": 8000, "window_size": w}).json()
+        ids.append(out["analysis_id"])
+    page = client.get("/api/history", params={"signal_id": sid, "limit": 2}).json()
+    assert len(page["items"]) == 2 and page["next_cursor"]
+    rest = client.get("/api/history", params={"signal_id": sid, "limit": 2, "cursor": page["next_cursor"]}).json()
+    got = [a["id"] for a in page["items"] + rest["items"]]
+    assert sorted(got) == sorted(ids) and rest["next_cursor"] is None
+    assert page["items"][0]["filename"] == "hist.wav"
+    assert client.get("/api/history", params={"cursor": "???"}).status_code == 400
+    d = client.get(f"/api/download/{ids[0]}", params={"format": "json"}).json()
+    assert d["window_size"] == 256 and len(d["frequencies"]) == 129
+    assert client.get(f"/api/audio/processed/{ids[0]}").status_code == 200
+
+def test_download_streams_formats():
+    x = np.sin(2*np.pi*50*np.arange(1024)/1000)
+    aid = client.post("/api/fft", json={"signal_data": x.tolist(), "sampling_rate": 1000, "window_size": 1024}).json()["analysis_id"]
+    r = client.get(f"/api/download/{aid}")
+    lines = r.text.splitlines()
+    assert r.headers["content-type"].startswith("text/csv") and lines[0] == "Frequency (Hz),Magnitude,Phase" and len(lines) == 514
+    r = client.get(f"/api/download/{aid}", params={"format": "npy", "columns": "magnitude", "fmin": 40, "fmax": 60})
+    arr = np.load(io.BytesIO(r.content))
+    assert arr.shape[0] == 1 and arr.shape[1] == int(r.headers["x-export-rows"]) > 0
+    j = client.get(f"/api/download/{aid}", params={"format": "json", "columns": "frequency", "fmax": 10}).json()
+    assert "magnitudes" not in j and "processed_signal" not in j and max(j["frequencies"]) <= 10
+    assert client.get(f"/api/download/{aid}", params={"format": "xml"}).status_code == 400
+    assert client.get(f"/api/download/{aid}", params={"columns": "power"}).status_code == 400
+
+def test_image_compress_sweep_and_target_size():
+    from PIL import Image
+    rng = np.random.default_rng(3)
+    img = (rng.random((96, 128, 3)) * 255).astype(np.uint8)
+    bio = io.BytesIO(); Image.fromarray(img).save(bio, format="PNG")
+    image_id = client.post("/api/image/upload", files={"file": ("n.png", bio.getvalue(), "image/png")}).json()["image_id"]
+    r = client.post("/api/image/compress/sweep", json={"image_id": image_id, "qualities": [30, 90], "subsamplings": [0, 2]})
+    results = r.json()["results"]
+    assert len(results) == 4 and results == sorted(results, key=lambda x: x["size_bytes"])
+    by = {(x["quality"], x["subsampling"]): x for x in results}
+    assert by[(90, 0)]["size_bytes"] > by[(30, 0)]["size_bytes"] and by[(90, 0)]["psnr"] > by[(30, 0)]["psnr"]
+    target = (by[(30, 2)]["size_bytes"] + by[(90, 2)]["size_bytes"]) // 2
+    out = client.post("/api/image/compress", json={"image_id": image_id, "target_bytes": target}).json()
+    assert out["target_met"] and out["size_bytes"] <= target and 30 <= out["quality"] < 90
+    assert len(client.get(out["url"]).content) == out["size_bytes"]
+    assert client.post("/api/image/compress/sweep", json={"image_id": image_id, "qualities": [0]}).status_code == 400
+
+def _upload_array(img, name):
+    from PIL import Image
+    bio = io.BytesIO(); Image.fromarray(img).save(bio, format="PNG")
+    return client.post("/api/image/upload", files={"file": (name, bio.getvalue(), "image/png")}).json()["image_id"]
+
+def test_image_register_phase_and_batch():
+    from workers import OPENCV_AVAILABLE
+    rng = np.random.default_rng(11)
+    yy, xx = np.mgrid[0:260, 0:300]
+    base = 127 + 60*np.sin(xx/9.0)*np.cos(yy/13.0) + 40*rng.random((260, 300))
+    crop = lambda dy, dx: np.stack([base[30 - dy:230 - dy, 30 - dx:270 - dx]]*3, axis=-1).astype(np.uint8)
+    ref = _upload_array(crop(0, 0), "ref.png")
+    movs = [_upload_array(crop(dy, dx), f"m{i}.png") for i, (dy, dx) in enumerate([(5, -8), (-3, 11)])]
+    one = client.post("/api/image/register", json={"ref_image_id": ref, "mov_image_id": movs[0], "method": "phase"}).json()
+    assert abs(one["dy"] - 5) < 0.5 and abs(one["dx"] + 8) < 0.5
+    assert client.get(one["url"]).status_code == 200
+    r = client.post("/api/image/register/batch", json={"ref_image_id": ref, "mov_image_ids": movs, "method": "phase"})
+    res = r.json()["results"]
+    assert [round(x["dx"]) for x in res] == [-8, 11]
+    if OPENCV_AVAILABLE:
+        res = client.post("/api/image/register/batch", json={"ref_image_id": ref, "mov_image_ids": movs}).json()["results"]
+        assert all("registered_id" in x and x["inliers"] >= 4 for x in res), res
+        H = np.array(res[0]["homography"])
+        assert abs(H[0, 2] - 8) < 1.5 and abs(H[1, 2] + 5) < 1.5  # maps moving onto reference
+    assert client.post("/api/image/register/batch", json={"ref_image_id": ref, "mov_image_ids": ["nope"]}).status_code == 404
+
+def test_mjpeg_file_and_stream():
+    from workers import OPENCV_AVAILABLE
+    if not OPENCV_AVAILABLE:
+        pytest.skip("OpenCV not installed")
+    rng = np.random.default_rng(2)
+    ids = [_upload_array((rng.random((48, 64, 3)) * 255).astype(np.uint8), f"f{i}.png") for i in range(5)]
+    ids.append(_upload_array(np.zeros((30, 40, 3), dtype=np.uint8), "small.png"))  # resized to the first frame
+    out = client.post("/api/video/mjpeg", json={"image_ids": ids, "fps": 5}).json()
+    assert out["frames"] == 6
+    path = client.get(out["url"])
+    assert path.status_code == 200 and path.content[:4] == b"RIFF"
+    r = client.get("/api/video/mjpeg/stream", params={"image_ids": ids, "fps": 30, "pace": False})
+    assert r.headers["content-type"].startswith("multipart/x-mixed-replace")
+    parts = r.content.split(b"--mjpegframe\r\n")[1:]
+    assert len(parts) == 6 and r.content.endswith(b"--mjpegframe--\r\n")
+    from PIL import Image
+    last = parts[-1].split(b"\r\n\r\n", 1)[1]
+    assert Image.open(io.BytesIO(last)).size == (64, 48)
+    # an explicit quality re-encodes even the stored JPEGs that could pass through
+    low = client.get("/api/video/mjpeg/stream", params={"image_ids": ids, "fps": 30, "pace": False, "quality": 10})
+    low_parts = low.content.split(b"--mjpegframe\r\n")[1:]
+    assert len(low_parts[0]) < len(parts[0])
+    assert client.get("/api/video/mjpeg/stream", params={"image_ids": ids[:1]}).status_code == 400
+
+def test_multichannel_fft_modes():
+    import wave
+    fs, n = 8000, 4096
+    t = np.arange(n) / fs
+    left, right = 0.5*np.sin(2*np.pi*500*t), 0.5*np.sin(2*np.pi*500*t + 0.7) + 0.3*np.sin(2*np.pi*1500*t)
+    bio = io.BytesIO()
+    with wave.open(bio, "wb") as wf:
+        wf.setnchannels(2); wf.setsampwidth(2); wf.setframerate(fs)
+        wf.writeframes((np.stack([left, right], axis=1) * 32767).astype("<i2").tobytes())
+    up = client.post("/api/upload", files={"file": ("stereo.wav", bio.getvalue(), "audio/wav")}).json()
+    assert up["channels"] == 2 and up["num_samples"] == n
+    base = {"signal_id": up["signal_id"], "window_size": 1024}
+    mono = client.post("/api/fft", json=base).json()  # default: mono mix, unchanged response
+    per = client.post("/api/fft", json={**base, "channel_mode": "per_channel"}).json()
+    assert [c["label"] for c in per["channels"]] == ["ch0", "ch1"]
+    single = client.post("/api/fft", json={**base, "channel_mode": "per_channel", "channels": [1]}).json()
+    assert np.allclose(single["channels"][0]["magnitudes"], per["channels"][1]["magnitudes"])
+    ms = client.post("/api/fft", json={**base, "channel_mode": "mid_side"}).json()
+    assert np.allclose(ms["channels"][0]["magnitudes"], mono["magnitudes"], atol=1e-6)
+    cross = client.post("/api/fft", json={**base, "channel_mode": "cross"}).json()
+    k = int(np.argmax(cross["channels"][0]["magnitudes"]))  # the 500 Hz bin
+    assert cross["channels"][2]["label"] == "cross_0_1" and abs(cross["channels"][2]["phases"][k] + 0.7) < 0.05
+    listed = client.post("/api/fft", json={"signal_data": [left.tolist(), right.tolist()], "sampling_rate": fs,
+                                           "window_size": 1024, "channel_mode": "per_channel"}).json()
+    assert np.allclose(listed["channels"][0]["magnitudes"], per["channels"][0]["magnitudes"], atol=0.05)  # int16 rounding
+    csv = client.get(f"/api/download/{cross['analysis_id']}", params={"columns": "frequency,phase"}).text.splitlines()
+    assert csv[0] == "Frequency (Hz),Phase [ch0],Phase [ch1],Phase [cross_0_1]"
+    assert client.get(f"/api/audio/processed/{per['analysis_id']}").content[22:24] == b"\x02\x00"  # stereo WAV
+    assert client.post("/api/fft", json={**base, "channel_mode": "mid_side", "channels": [0]}).status_code == 400
+
+def test_fft_single_precision_close_to_double():
+    x = np.random.default_rng(11).standard_normal(4096).tolist()
+    base = {"signal_data": x, "sampling_rate": 8000, "window_size": 4096, "filter_type": "lowpass", "filter_cutoff": [1000]}
+    double = client.post("/api/fft", json=base).json()
+    single = client.post("/api/fft", json={**base, "precision": "single"}).json()
+    assert single["analysis_id"] != double["analysis_id"]  # cached separately
+    err = np.max(np.abs(np.subtract(single["magnitudes"], double["magnitudes"]))) / np.max(double["magnitudes"])
+    assert 0 < err < 1e-5
+    assert client.post("/api/fft", json={**base, "precision": "half"}).status_code == 422
+    psd = client.post("/api/psd", json={"signal_data": x, "sampling_rate": 8000, "window_size": 256, "precision": "single"})
+    assert psd.status_code == 200
+
+def test_fft_band_zoom_and_goertzel():
+    fs = 8000
+    t = np.arange(8000) / fs
+    x = (np.sin(2*np.pi*1000*t) + 0.5*np.sin(2*np.pi*1250*t)).tolist()
+    zoom = client.post("/api/fft/band", json={"signal_data": x, "sampling_rate": fs, "f_lo": 990, "f_hi": 1010,
+                                              "num_bins": 201}).json()
+    assert zoom["method"] == "czt" and len(zoom["frequencies"]) == 201 and zoom["resolution_hz"] == 1.0
+    assert abs(zoom["frequencies"][int(np.argmax(zoom["magnitudes"]))] - 1000) < 0.2
+    tones = client.post("/api/fft/band", json={"signal_data": x, "sampling_rate": fs,
+                                               "frequencies": [1000, 1250, 1600]}).json()
+    assert tones["method"] == "goertzel"
+    m = tones["magnitudes"]
+    assert abs(m[1] / m[0] - 0.5) < 0.01 and m[2] < 1e-3 * m[0]
+    assert client.post("/api/fft/band", json={"signal_data": x, "f_lo": 100}).status_code == 400
+    assert client.post("/api/fft/band", json={"signal_data": x, "sampling_rate": fs, "f_lo": 100, "f_hi": 5000}).status_code == 400
+
+def test_signal_and_spectrum_lod_views():
+    import wave
+    fs, n = 8000, 200000
+    x = 0.3 * np.sin(2*np.pi*50*np.arange(n)/fs)
+    x[123457] = 0.9  # a single-sample spike must survive decimation
+    bio = io.BytesIO()
+    with wave.open(bio, "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(fs)
+        wf.writeframes((x * 32767).astype("<i2").tobytes())
+    up = client.post("/api/upload", files={"file": ("lod.wav", bio.getvalue(), "audio/wav")}).json()
+    lod = client.get(f"/api/signal/{up['signal_id']}/lod", params={"max_points": 1000}).json()
+    assert 2 * lod["num_buckets"] <= 1000 and lod["bucket_size"] > 1
+    assert abs(max(lod["max"]) - 0.9) < 1e-3 and abs(min(lod["min"]) + 0.3) < 1e-3
+    zoom = client.get(f"/api/signal/{up['signal_id']}/lod", params={"max_points": 1000, "start": 123400, "end": 123500}).json()
+    assert zoom["bucket_size"] == 1 and len(zoom["min"]) == 100 and abs(zoom["times"][0] - 123400 / fs) < 1e-9
+    fft = client.post("/api/fft", json={"signal_id": up["signal_id"], "window_size": 8192}).json()
+    spec = client.get(f"/api/analysis/{fft['analysis_id']}/lod", params={"max_points": 100, "fmin": 0, "fmax": 1000}).json()
+    assert 2 * spec["num_buckets"] <= 100 and spec["frequencies"][0] == 0
+    assert abs(max(spec["max"]) - max(fft["magnitudes"])) < 1e-3 * max(fft["magnitudes"])  # 50 Hz peak kept
+    assert client.get("/api/signal/missing/lod").status_code == 404
+
+def test_failed_spool_removes_partial_file():
+    import asyncio
+    from server import main
+
+    class Broken:
+        def __init__(self): self.calls = 0
+        async def read(self, n):
+            self.calls += 1
+            if self.calls > 1:
+                raise ConnectionResetError("client went away")
+            return b"x" * 100
+
+    before = set(os.listdir(main.UPLOAD_TMP_DIR))
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(main._spool_upload(Broken(), "a.wav"))
+    assert set(os.listdir(main.UPLOAD_TMP_DIR)) == before
@@ -0,0 +1,38 @@
+import json
+import wave
+import numpy as np
+import pytest
+from server import batch
+
+def _write_wav(path, freq, fs=8000, n=4000):
+    x = 0.5 * np.sin(2 * np.pi * freq * np.arange(n) / fs)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(fs)
+        wf.writeframes((x * 32767).astype("<i2").tobytes())
+
+def test_batch_writes_rows_and_manifest_and_resumes(tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    (src / "sub").mkdir(parents=True)
+    for i in range(6):
+        _write_wav(src / ("sub" if i % 2 else "") / f"f{i}.wav", 250.0 * (i + 1))
+    (src / "broken.wav").write_bytes(b"junk")
+    args = [str(src), "--out", str(out), "--window-size", "1024", "--workers", "1", "--chunk", "2"]
+    assert batch.main(args) == 1  # broken.wav is reported, the rest analysed
+    entries = [json.loads(l) for l in (out / "manifest.jsonl").read_text().splitlines()]
+    ok = [e for e in entries if e["status"] == "ok"]
+    assert len(entries) == 7 and len(ok) == 6
+    mags = np.load(out / "magnitudes.npy", mmap_mode="r")
+    assert mags.shape == (6, 513)
+    for e in ok:
+        assert abs(e["peak_hz"] - np.argmax(mags[e["row"]]) * 8000 / 1024) < 1e-9
+    # interrupt after three entries: a torn manifest line and a row the manifest never recorded
+    lines = (out / "manifest.jsonl").read_text().splitlines(keepends=True)
+    (out / "manifest.jsonl").write_text("".join(lines[:3]) + lines[3][:10])
+    with open(out / "magnitudes.npy", "ab") as f:
+        f.write(b"\0" * 4 * 513)
+    assert batch.main(args + ["--resume", "--npz"]) == 0  # broken.wav was recorded before the cut
+    res = np.load(out / "results.npz")
+    assert res["magnitudes"].shape == res["phases"].shape == (6, 513) and len(set(res["path"])) == 6
+    assert np.array_equal(res["magnitudes"], np.load(out / "magnitudes.npy"))
+    with pytest.raises(SystemExit, match="different settings"):
+        batch.main([str(src), "--out", str(out), "--window-size", "2048", "--resume"])
@@ -0,0 +1,14 @@
+from benchmarks.run import compare
+
+def _run(*rows):
+    return {"meta": {}, "results": [dict(group="dsp", name=n, size=s, seconds=t, ratio=r) for n, s, t, r in rows]}
+
+def test_compare_flags_regressions_past_threshold():
+    base = _run(("fft_iterative", 1024, 1.0, 4.0), ("window_hann", 1024, 1.0, None))
+    new = _run(("fft_iterative", 1024, 1.2, 5.0), ("window_hann", 1024, 1.5, None), ("rfft_real", 64, 9.0, None))
+    by_key = {d["key"]: d for d in compare(base, new, threshold=0.25)}
+    assert set(by_key) == {"dsp/fft_iterative@1024", "dsp/window_hann@1024"}
+    assert not by_key["dsp/fft_iterative@1024"]["regressed"] and by_key["dsp/window_hann@1024"]["regressed"]
+    ratio = {d["key"]: d for d in compare(base, new, threshold=0.2, metric="ratio")}
+    assert ratio["dsp/fft_iterative@1024"]["metric"] == "ratio" and ratio["dsp/fft_iterative@1024"]["regressed"]
+    assert ratio["dsp/window_hann@1024"]["metric"] == "seconds"
@@ -0,0 +1,38 @@
+import io, json, struct
+import numpy as np
+import pytest
+from server import export
+
+def _spectrum(n=20000):
+    f = np.linspace(0, 4000, n)
+    return np.stack([f, np.random.default_rng(0).random(n), np.linspace(-3, 3, n)])
+
+def test_csv_streams_lines_that_round_trip():
+    spec = _spectrum()
+    chunks = list(export.iter_csv(spec, ["frequency", "phase"], 0, spec.shape[1], rows=1000))
+    assert len(chunks) == 1 + 20
+    text = b"".join(chunks).decode()
+    lines = text.splitlines()
+    assert lines[0] == "Frequency (Hz),Phase" and len(lines) == 1 + spec.shape[1]
+    back = np.loadtxt(io.StringIO(text), delimiter=",", skiprows=1)
+    assert np.array_equal(back.T, spec[[0, 2]])  # exact: %r is round-trip
+
+def test_npy_and_columnar_match_selection():
+    spec = _spectrum()
+    lo, hi = export.select(spec, 1000.0, 2000.0)
+    assert spec[0, lo] >= 1000.0 and spec[0, hi - 1] <= 2000.0 and spec[0, hi] > 2000.0
+    arr = np.load(io.BytesIO(b"".join(export.iter_npy(spec, ["magnitude"], lo, hi, rows=777))))
+    assert arr.shape == (1, hi - lo) and np.array_equal(arr[0], spec[1, lo:hi])
+    body = b"".join(export.iter_columnar(spec, ["frequency", "magnitude"], lo, hi, {"analysis_id": "x"}))
+    assert body[:4] == b"FFTB"
+    (hlen,) = struct.unpack_from("<I", body, 4)
+    meta = json.loads(body[8:8 + hlen])
+    assert meta["dtype"] == "<f8" and [a["name"] for a in meta["arrays"]] == ["frequency", "magnitude"]
+    cols = np.frombuffer(body, dtype="<f8", offset=8 + hlen).reshape(2, -1)
+    assert np.array_equal(cols, spec[:2, lo:hi])
+
+def test_parse_columns():
+    assert export.parse_columns(None) == list(export.COLUMNS)
+    assert export.parse_columns("phase, frequency") == ["frequency", "phase"]
+    with pytest.raises(ValueError):
+        export.parse_columns("power")
@@ -1,7 +1,7 @@
 
 import math
 import numpy as np
-from server.dsp.fft import fft_iterative, ifft_iterative, rfft_real, rfftfreq
+from server.dsp.fft import fft_iterative, ifft_iterative, rfft_real, irfft_real, rfftfreq, get_plan
 
 def test_fft_ifft_roundtrip():
     fs = 8000
@@ -27,3 +27,66 @@ def test_rfft_detects_peak_freq():
     k = int(np.argmax(mags))
     f_peak = freqs[k]
     assert abs(f_peak - f0) <= fs/N
+
+def test_fft_matches_reference_and_batches():
+    rng = np.random.default_rng(0)
+    for n in (1, 2, 8, 256, 8192):
+        x = rng.standard_normal(n) + 1j*rng.standard_normal(n)
+        ref = np.fft.fft(x)
+        assert np.max(np.abs(fft_iterative(x) - ref)) <= 1e-12 * max(1.0, np.max(np.abs(ref)))
+    batch = rng.standard_normal((3, 512))
+    assert np.allclose(fft_iterative(batch), np.fft.fft(batch, axis=-1))
+
+def test_plan_is_cached_and_reused():
+    p = get_plan(1024)
+    assert get_plan(1024) is p
+    assert len(p.rev) == 1024 and p.radices == [4, 4, 4, 4, 4]
+
+def test_arbitrary_lengths_match_reference():
+    rng = np.random.default_rng(1)
+    # smooth mixed-radix sizes, a 7-smooth audio frame, and primes routed to Bluestein
+    for n in (3, 5, 12, 30, 3000, 4410, 97, 8191):
+        x = rng.standard_normal(n) + 1j*rng.standard_normal(n)
+        ref = np.fft.fft(x)
+        assert np.max(np.abs(fft_iterative(x) - ref)) <= 1e-11 * np.max(np.abs(ref))
+        assert np.allclose(ifft_iterative(ref), x)
+    assert get_plan(8191).bluestein and not get_plan(4410).bluestein
+
+def test_rfft_bins_match_rfftfreq_for_non_power_of_two():
+    x = np.random.default_rng(2).standard_normal(4410)
+    X = rfft_real(x)
+    assert len(X) == len(rfftfreq(4410, 1/44100)) == 2206
+    assert np.allclose(X, np.fft.rfft(x))
+
+def test_real_fft_packing_and_inverse():
+    rng = np.random.default_rng(3)
+    for n in (2, 9, 1024, 4410, 2*8191):
+        x = rng.standard_normal(n)
+        X = rfft_real(x)
+        assert np.allclose(X, np.fft.rfft(x))
+        assert np.allclose(irfft_real(X, n), x)
+    batch = rng.standard_normal((4, 256))
+    assert np.allclose(irfft_real(rfft_real(batch)), batch)
+
+def test_single_precision_matches_double_within_bound():
+    rng = np.random.default_rng(4)
+    for n in (1000, 1024, 4410, 8191, 65536):
+        x = rng.standard_normal(n)
+        X = rfft_real(x)
+        Xs = rfft_real(x.astype(np.float32))
+        assert Xs.dtype == np.complex64
+        assert np.max(np.abs(Xs - X)) / np.max(np.abs(X)) < 2e-6  # ~eps32 * log2(n)
+        xs = irfft_real(Xs, n)
+        assert xs.dtype == np.float32 and np.max(np.abs(xs - x)) < 1e-5
+    z = (rng.standard_normal((3, 8191)) + 1j * rng.standard_normal((3, 8191))).astype(np.complex64)
+    Z = fft_iterative(z)
+    assert Z.dtype == np.complex64 and np.max(np.abs(Z - np.fft.fft(z))) / np.max(np.abs(Z)) < 5e-6
+    assert get_plan(1024, "single") is not get_plan(1024) and get_plan(1024, "single").dtype == np.complex64
+
+def test_empty_input_gives_one_zero_bin():
+    # like the original power-of-two padding, no samples transform as one zero sample
+    assert np.array_equal(rfft_real([]), [0j])
+    assert np.array_equal(fft_iterative([]), [0j])
+    assert np.array_equal(ifft_iterative([]), [0j])  # the inverse pads the same way
+    out = rfft_real(np.zeros((3, 0), dtype=np.float32))
+    assert out.shape == (3, 1) and out.dtype == np.complex64 and not out.any()
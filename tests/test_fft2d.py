@@ -0,0 +1,37 @@
+import numpy as np
+from server.dsp.fft2d import fft2, ifft2, rfft2, irfft2, compress_fft, radial_mask
+
+def test_fft2_matches_numpy_batched_over_channels():
+    x = np.random.default_rng(0).standard_normal((3, 24, 35))
+    assert np.allclose(fft2(x), np.fft.fft2(x), atol=1e-9)
+    assert np.allclose(rfft2(x), np.fft.rfft2(x), atol=1e-9)
+    assert np.allclose(ifft2(fft2(x)).real, x, atol=1e-12)
+    for w in (35, 36):
+        y = x[..., :w] if w <= 35 else np.concatenate([x, x[..., :1]], axis=-1)
+        assert np.allclose(irfft2(rfft2(y), y.shape[-2:]), y, atol=1e-12)
+
+def test_compress_keep_ratio_and_cutoff():
+    rng = np.random.default_rng(1)
+    yy, xx = np.mgrid[0:96, 0:128]
+    smooth = 127 + 100*np.sin(xx/9.0)*np.cos(yy/13.0)
+    img = np.clip(np.stack([smooth, smooth[::-1], 255 - smooth], axis=-1) + rng.normal(0, 3, (96, 128, 3)), 0, 255).astype(np.uint8)
+    full, kept = compress_fft(img, keep_ratio=1.0)
+    assert kept == 1.0 and np.abs(full.astype(int) - img).max() <= 1
+    low, kept = compress_fft(img, keep_ratio=0.05)
+    assert 0.04 < kept < 0.11 and np.abs(low.astype(float) - img).mean() < 8
+    tiled, kept_t = compress_fft(img, cutoff=0.25, tile=32)
+    assert tiled.shape == img.shape and kept_t < 0.1
+    assert radial_mask(8, 8, 0.5).sum() == 9
+
+def test_phase_correlate_recovers_batched_shifts():
+    from server.dsp.fft2d import phase_correlate
+    rng = np.random.default_rng(5)
+    base = rng.random((160, 200))
+    base = (base + np.roll(base, 1, 0) + np.roll(base, 1, 1)) / 3  # a little smoothing
+    ref = base[30:130, 30:170]
+    shifts = [(4, -9), (-12, 7), (0, 0)]
+    movs = np.stack([base[30 - dy:130 - dy, 30 - dx:170 - dx] for dy, dx in shifts])
+    found, peak = phase_correlate(ref, movs)
+    assert np.allclose(found, shifts, atol=0.25) and np.all(peak > 0.3)
+    single, _ = phase_correlate(ref, movs[0], max_side=50)  # downsampled by 3
+    assert np.allclose(single, shifts[0], atol=3)
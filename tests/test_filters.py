@@ -0,0 +1,34 @@
+import numpy as np
+from server.dsp.filters import design_lowpass_fir, design_bandpass_fir, apply_fir, overlap_save_same
+
+def test_overlap_save_matches_direct_same_mode():
+    rng = np.random.default_rng(0)
+    for n, m in ((1000, 201), (4410, 401), (20000, 1501), (513, 64)):
+        x = rng.standard_normal(n); h = rng.standard_normal(m)
+        assert np.allclose(overlap_save_same(x, h), np.convolve(x, h, mode="same"), atol=1e-10)
+    x = rng.standard_normal(50000); h = rng.standard_normal(2001)
+    assert np.allclose(apply_fir(x, h), np.convolve(x, h, mode="same"), atol=1e-10)
+
+def test_fir_designs_are_cached_and_read_only():
+    h = design_lowpass_fir(1000.0, 8000.0, numtaps=201)
+    assert design_lowpass_fir(1000.0, 8000.0, numtaps=201) is h
+    assert not h.flags.writeable
+    assert abs(np.sum(h) - 1.0) < 1e-12 and np.allclose(h, h[::-1])
+    bp = design_bandpass_fir(500.0, 1500.0, 8000.0, numtaps=401)
+    assert len(bp) == 401 and abs(np.sum(bp)) < 1e-8  # no DC gain
+
+def test_fir_filters_channels_in_one_call():
+    h = design_lowpass_fir(2000.0, 44100.0, numtaps=201)
+    x = np.random.default_rng(4).standard_normal((3, 20000))
+    for y in (overlap_save_same(x, h), apply_fir(x, h), apply_fir(x[:, :500], h)):
+        n = y.shape[-1]
+        assert y.shape == (3, n)
+        for c in range(3):
+            assert np.allclose(y[c], np.convolve(x[c, :n], h, mode="same"), atol=1e-12)
+
+def test_fir_single_precision_stays_float32():
+    x = np.random.default_rng(7).standard_normal((2, 50000))
+    h = design_lowpass_fir(1000.0, 44100.0, numtaps=201)
+    y = apply_fir(x, h)
+    ys = apply_fir(x.astype(np.float32), h)
+    assert ys.dtype == np.float32 and np.max(np.abs(ys - y)) < 1e-5
@@ -0,0 +1,26 @@
+import numpy as np
+from server.image_cache import CompressedCache, DecodedImageCache
+
+def test_decoded_cache_hits_and_evicts_by_bytes():
+    loads = []
+    def load(key):
+        return lambda: loads.append(key) or np.zeros((10, 10, 3), dtype=np.uint8)  # 300 bytes
+    cache = DecodedImageCache(max_bytes=700)
+    a = cache.get("a", load("a"))
+    assert cache.get("a", load("x")) is a and not a.flags.writeable
+    cache.get("b", load("b")); cache.get("c", load("c"))  # evicts "a"
+    cache.get("a", load("a"))
+    assert loads == ["a", "b", "c", "a"]
+    s = cache.stats()
+    assert s["hits"] == 1 and s["evictions"] == 2 and s["resident_bytes"] <= 700
+
+def test_compressed_cache_deletes_evicted_files(tmp_path):
+    cache = CompressedCache(max_bytes=250)
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"c{i}.jpg"; p.write_bytes(b"x" * 100); paths.append(p)
+        cache.put(f"c{i}", {"path": str(p), "size_bytes": 100})
+    assert "c0" not in cache and not paths[0].exists()
+    assert paths[1].exists() and paths[2].exists() and len(cache) == 2
+    cache.put("c1", {"path": str(paths[1]), "size_bytes": 100})  # re-put replaces, no double count
+    assert cache.stats()["bytes"] == 200
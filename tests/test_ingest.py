@@ -0,0 +1,57 @@
+import io, struct
+import numpy as np
+import pytest
+from server.ingest import IngestError, decode_csv_stream, decode_stream, decode_wav_stream
+
+def _wav(samples, fs, fmt_tag, bits, extensible=False, data_size=None, extra_chunk=False):
+    '''WAV bytes for interleaved integer/float samples already in their target dtype.'''
+    ch = samples.shape[1]
+    data = samples.tobytes()
+    block = ch * bits // 8
+    if extensible:
+        fmt = struct.pack("<HHIIHHHHI", 0xFFFE, ch, fs, fs * block, block, bits, 22, bits, 0)
+        fmt += struct.pack("<H", fmt_tag) + b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71"
+    else:
+        fmt = struct.pack("<HHIIHH", fmt_tag, ch, fs, fs * block, block, bits)
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    if extra_chunk:
+        body += b"LIST" + struct.pack("<I", 5) + b"abcde\x00"
+    body += b"data" + struct.pack("<I", len(data) if data_size is None else data_size) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+def _pcm24(x):
+    i = np.round(x * (2**23 - 1)).astype("<i4")
+    return i.view(np.uint8).reshape(i.shape + (4,))[..., :3].copy()
+
+def test_wav_formats_decode_and_downmix():
+    t = np.arange(5000) / 8000
+    x = np.stack([0.5 * np.sin(2 * np.pi * 440 * t), 0.25 * np.cos(2 * np.pi * 220 * t)], axis=1)
+    mono = x.mean(axis=1)
+    cases = [
+        _wav(np.round(x * 32767).astype("<i2"), 8000, 1, 16),
+        _wav(_pcm24(x), 8000, 1, 24, extra_chunk=True),
+        _wav(np.round(x * (2**31 - 1)).astype("<i4"), 8000, 1, 32, extensible=True),
+        _wav(x.astype("<f4"), 8000, 3, 32),
+        _wav(x.astype("<f4"), 8000, 3, 32, data_size=0xFFFFFFFF),  # streaming writer: size unknown
+    ]
+    for wav in cases:
+        fs, y = decode_wav_stream(io.BytesIO(wav), chunk_bytes=999)  # chunks split frames
+        assert fs == 8000 and y.dtype == np.float32 and y.shape == (5000,)
+        assert np.abs(y - mono).max() < 1e-4
+        fs, y = decode_wav_stream(io.BytesIO(wav), chunk_bytes=999, mono=False)
+        assert y.shape == (2, 5000) and np.abs(y - x.T).max() < 1e-4
+    fs, y = decode_wav_stream(io.BytesIO(cases[0][:-101]))  # truncated data: keep whole frames present
+    assert y.size == 5000 - 26
+    with pytest.raises(IngestError):
+        decode_wav_stream(io.BytesIO(_wav(np.zeros((4, 1), "<i2"), 8000, 2, 16)))  # ADPCM
+
+def test_csv_one_and_two_columns_with_header():
+    vals = np.linspace(-1, 1, 3001)
+    one = "\n".join(f"{v:.6f}" for v in vals).encode() + b"\n"
+    fs, y = decode_csv_stream(io.BytesIO(one), chunk_bytes=64)
+    assert fs == 44100 and np.allclose(y, vals, atol=1e-6)
+    two = b"time,value\r\n" + "\r\n".join(f"{i / 2000:.6f},{v:.6f}" for i, v in enumerate(vals)).encode()
+    fs, y = decode_csv_stream(io.BytesIO(two), chunk_bytes=100)
+    assert fs == 2000 and y.size == 3001 and np.allclose(y, vals, atol=1e-6)
+    with pytest.raises(IngestError):
+        decode_stream(io.BytesIO(b"1\n2\nthree\n"), "x.csv")
@@ -0,0 +1,24 @@
+import numpy as np
+from server.lod import Pyramid, build_pyramid, level_lengths
+
+def test_pyramid_views_bound_every_sample_and_respect_max_points():
+    x = np.random.default_rng(0).standard_normal(1_000_003).astype(np.float32)
+    p = Pyramid(x, build_pyramid(x))
+    assert build_pyramid(x).shape == (2, sum(level_lengths(len(x))))
+    for start, end, points in ((0, None, 2000), (12345, 567890, 1000), (100, 400, 50), (999000, 1000003, 100)):
+        v = p.view(start, end, points)
+        end = len(x) if end is None else end
+        assert 2 * len(v.positions) <= points and v.positions[0] == start
+        bounds = np.append(v.positions[1:], end)
+        for pos, stop, lo, hi in zip(v.positions, bounds, v.mins, v.maxs):
+            assert lo <= x[pos:stop].min() and hi >= x[pos:stop].max()
+    raw = p.view(100, 130, 50)
+    assert raw.bucket_size == 1 and np.array_equal(raw.mins, x[100:130])
+
+def test_pyramid_batches_rows_and_keeps_bucket_edges_when_panning():
+    x = np.random.default_rng(1).standard_normal((3, 50000))
+    p = Pyramid(x, build_pyramid(x))
+    a, b = p.view(0, 20000, 200), p.view(5000, 25000, 200)
+    assert a.mins.shape[0] == 3 and a.bucket_size == b.bucket_size
+    assert set(a.positions[2:]) & set(b.positions[2:])
+    assert np.allclose(a.maxs[1], Pyramid(x[1], build_pyramid(x[1])).view(0, 20000, 200).maxs)
@@ -0,0 +1,35 @@
+import numpy as np
+from server.dsp.fft import get_window
+from server.dsp.psd import welch, welch_partial, welch_finish, segment_ranges
+
+def _reference(x, fs, nperseg, hop, window_type="hann"):
+    w = get_window(window_type, nperseg)
+    segs = [x[i:i + nperseg] for i in range(0, len(x) - nperseg + 1, hop)]
+    P = np.mean([np.abs(np.fft.rfft((s - s.mean()) * w))**2 for s in segs], axis=0) / (fs * np.sum(w**2))
+    P[1:-1] *= 2
+    return P
+
+def test_welch_matches_reference_and_white_noise_level():
+    rng = np.random.default_rng(0)
+    fs, x = 1000.0, rng.normal(0, 0.5, 20000)
+    freqs, psd, count = welch(x, fs, nperseg=256, window_type="hamming")
+    assert count == 1 + (20000 - 256)//128 and freqs[-1] == fs/2
+    assert np.allclose(psd, _reference(x, fs, 256, 128, "hamming"))
+    assert abs(np.mean(psd[1:-1]) - 0.25 / (fs/2)) < 0.05 * 0.25 / (fs/2)  # variance / (fs/2) per Hz
+
+def test_split_segments_sum_to_single_pass():
+    x = np.random.default_rng(1).standard_normal(400000)
+    nperseg, hop = 512, 384
+    ranges = segment_ranges(len(x), nperseg, hop, parts=4)
+    assert len(ranges) > 1
+    parts = [welch_partial(x[a:b], nperseg, hop) for a, b in ranges]
+    acc, count = sum(p[0] for p in parts), sum(p[1] for p in parts)
+    _, psd = welch_finish(acc, count, 8000.0, nperseg)
+    _, ref, ref_count = welch(x, 8000.0, nperseg, nperseg - hop)
+    assert count == ref_count and np.allclose(psd, ref)
+
+def test_single_precision_welch_matches_double():
+    x = np.random.default_rng(2).standard_normal(50000)
+    _, psd, _ = welch(x, 1000.0, nperseg=1024)
+    _, psd32, _ = welch(x.astype(np.float32), 1000.0, nperseg=1024, precision="single")
+    assert psd32.dtype == np.float64 and np.max(np.abs(psd32 - psd)) / np.max(psd) < 1e-5
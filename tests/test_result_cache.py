@@ -0,0 +1,40 @@
+import numpy as np
+from server.result_cache import CachedSpectrum, ResultCache, fft_cache_key, stored_signal_key
+
+def _entry(i, n=100):
+    return CachedSpectrum(f"a{i}", np.arange(n, dtype=np.float64), np.full(n, i, dtype=np.float64), np.zeros(n))
+
+def test_key_depends_on_samples_and_params():
+    x = np.linspace(-1, 1, 64)
+    p = {"window_size": 64, "filter_cutoff": None}
+    assert fft_cache_key(x, p) == fft_cache_key(x.tolist(), dict(reversed(list(p.items()))))
+    assert fft_cache_key(x, p) != fft_cache_key(x[::-1], p)
+    assert fft_cache_key(x, p) != fft_cache_key(x, {**p, "window_size": 128})
+    assert stored_signal_key("d1", p) == stored_signal_key("d1", dict(reversed(list(p.items()))))
+    assert stored_signal_key("d1", p) != stored_signal_key("d2", p) != stored_signal_key("d2", {**p, "start_sample": 5})
+
+def test_memory_tier_evicts_and_disk_tier_promotes(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=2 * 2400)
+    for i in range(3):
+        cache.put(f"k{i}", _entry(i))
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+    hit = cache.get("k0")  # evicted from memory, reloaded from its .npz
+    assert hit.analysis_id == "a0" and np.all(hit.magnitudes == 0)
+    assert cache.get("k0") is hit and cache.get("missing") is None
+    st = cache.stats()
+    assert (st["disk_hits"], st["memory_hits"], st["misses"]) == (1, 1, 1)
+    assert ResultCache(str(tmp_path)).get("k2").analysis_id == "a2"  # survives a restart
+
+def test_disk_tier_deletes_least_recently_used_files(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    cache.put("k0", _entry(0))
+    size = cache.stats()["disk_bytes"]
+    cache = ResultCache(str(tmp_path), max_bytes=0, max_disk_bytes=2 * size)  # index rebuilt from the files
+    assert cache.stats()["disk_entries"] == 1
+    cache.put("k1", _entry(1))
+    assert cache.get("k0").analysis_id == "a0"  # k1 is now the least recently used
+    cache.put("k2", _entry(2))
+    st = cache.stats()
+    assert (st["disk_entries"], st["disk_evictions"]) == (2, 1) and st["disk_bytes"] <= 2 * size
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["k0.npz", "k2.npz"]
+    assert cache.get("k1") is None
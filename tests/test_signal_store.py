@@ -0,0 +1,13 @@
+import numpy as np
+from server.signal_store import SignalStore
+
+def test_store_evicts_by_bytes_and_reloads_memory_mapped(tmp_path):
+    store = SignalStore(str(tmp_path), max_bytes=3 * 4000)
+    for i in range(4):
+        store.put(f"s{i}", np.full(1000, i, dtype=np.float64), 8000, f"f{i}.wav", "t")
+    stats = store.stats()
+    assert stats["resident_signals"] == 3 and stats["resident_bytes"] == 12000
+    entry = store.get("s0")  # evicted from memory, served from the .npy file
+    assert isinstance(entry.data, np.memmap) and entry.data.dtype == np.float32
+    assert entry.sampling_rate == 8000 and entry.filename == "f0.wav" and np.all(entry.data == 0)
+    assert store.get("s3").data.flags.c_contiguous and store.get("nope") is None
@@ -0,0 +1,33 @@
+import math
+import numpy as np
+from server.dsp.stft import frame_signal, stft_magnitude, StreamingSTFT
+
+def test_frames_are_strided_view():
+    x = np.arange(10000, dtype=np.float64)
+    fr = frame_signal(x, 1024, 256)
+    assert fr.shape == (1 + (10000 - 1024)//256, 1024)
+    assert np.shares_memory(fr, x)
+    assert fr[3, 0] == 3*256
+
+def test_stft_matches_per_frame_reference():
+    fs = 8000
+    t = np.arange(fs)/fs
+    x = np.sin(2*math.pi*1000*t)
+    freqs, times, S = stft_magnitude(x, fs, 512, 128, "hann")
+    assert S.dtype == np.float32 and S.shape == (len(times), 257)
+    ref = np.abs(np.fft.rfft(frame_signal(x, 512, 128)*np.hanning(512), axis=-1))
+    assert np.allclose(S, ref, rtol=1e-5, atol=1e-4)
+    assert np.all(np.abs(freqs[np.argmax(S, axis=1)] - 1000) <= fs/512)
+
+def test_streaming_matches_offline_stft():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(20000)
+    _, times, S = stft_magnitude(x, 8000, 1024, 256)
+    stream = StreamingSTFT(8000, 1024, 256)
+    got_t, got_S = [], []
+    for chunk in np.array_split(x, 37):
+        t, s = stream.push(chunk)
+        got_t.append(t); got_S.append(s)
+        assert len(stream._tail) < 1024
+    assert np.allclose(np.concatenate(got_t), times)
+    assert np.allclose(np.concatenate(got_S), S)
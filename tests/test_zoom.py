@@ -0,0 +1,37 @@
+import numpy as np
+from server.dsp.zoom import czt, zoom_fft, goertzel, band_frequencies
+
+def _dtft(x, fs, freqs):
+    return np.exp(-2j*np.pi*np.outer(freqs, np.arange(x.shape[-1]))/fs) @ x
+
+def test_czt_matches_direct_dtft_and_fft_bins():
+    rng = np.random.default_rng(0)
+    for n, m in ((1000, 3), (4410, 257), (8191, 4096)):
+        x = rng.standard_normal(n)
+        freqs, X = zoom_fft(x, 8000.0, 950.0, 1050.0, m)
+        ref = _dtft(x, 8000.0, freqs)
+        assert np.max(np.abs(X - ref)) < 1e-9 * np.max(np.abs(ref))
+    x = rng.standard_normal(4096)
+    assert np.allclose(zoom_fft(x, 4096.0, 0.0, 2048.0, 2049)[1], np.fft.rfft(x))
+    batch = rng.standard_normal((3, 2000))
+    assert np.allclose(czt(batch, 50, 10.0, 0.5, 1000.0)[2], czt(batch[2], 50, 10.0, 0.5, 1000.0))
+
+def test_zoom_resolves_close_tones():
+    fs = 8000.0
+    t = np.arange(16000) / fs
+    x = (np.sin(2*np.pi*1000*t) + np.sin(2*np.pi*1001.5*t)) * np.hanning(len(t))
+    freqs, X = zoom_fft(x, fs, 995.0, 1005.0, 201)
+    m = np.abs(X)
+    peaks = [freqs[i] for i in range(1, len(m) - 1) if m[i] > m[i-1] and m[i] > m[i+1] and m[i] > 0.3*m.max()]
+    assert np.allclose(peaks, [1000.0, 1001.5])
+    assert np.allclose(band_frequencies(995.0, 1005.0, 201)[[0, -1]], [995.0, 1005.0])
+
+def test_goertzel_matches_dtft_and_single_precision():
+    rng = np.random.default_rng(1)
+    x = rng.standard_normal(100000)
+    freqs = [697.0, 1209.0, 1336.5, 0.0, 4000.0]
+    ref = _dtft(x, 8000.0, freqs)
+    G = goertzel(x, 8000.0, freqs)
+    assert np.max(np.abs(G - ref)) < 1e-8 * np.max(np.abs(ref))
+    G32 = goertzel(x.astype(np.float32), 8000.0, freqs)
+    assert G32.dtype == np.complex64 and np.max(np.abs(G32 - ref)) < 1e-4 * np.max(np.abs(ref))